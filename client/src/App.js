@@ -24,65 +24,32 @@ function App() {
   const [furnaceRecipeResponse, setfurnaceRecipeResponse] = useState([]);
   /**
    * useEffect hook to fetch data from the API when the component mounts.
-   * Multiple API calls are made to retrieve data for recipes, furnace recipes,
-   * blocks, colors, calendar, down reasons, and furnaces.
+   * A single snapshot call retrieves recipes, furnace recipes, blocks, colors,
+   * calendar, down reasons, and furnaces, all read from the same database state.
+   * The calendar is limited to the runs overlapping the year the scheduler displays.
    */
   useEffect(() => {
-    // Gets the recipe_table from the database
+    const formatDate = (date) =>
+      `${date.getFullYear()}-${(date.getMonth() + 1).toString().padStart(2, "0")}-${date
+        .getDate()
+        .toString()
+        .padStart(2, "0")}`;
+    const today = new Date();
+    const lastDay = new Date(today);
+    lastDay.setDate(lastDay.getDate() + 366);
     API({
       method: "GET",
-      url: "/api/recipes",
+      url: "/api/snapshot",
+      params: { start: formatDate(today), end: formatDate(lastDay) },
     }).then((response) => {
       const res = response.data;
-      setApiResponse(res);
-    });
-    API({
-      // Gets the furnace_recipe_table from the database
-      method: "GET",
-      url: "/api/furnaceRecipes",
-    }).then((response) => {
-      const res = response.data;
-      setfurnaceRecipeResponse(res);
-    });
-    API({
-      // Gets the furnace_recipe_table from the database
-      method: "GET",
-      url: "/api/blocks",
-    }).then((response) => {
-      const res = response.data;
-      setBlockResponse(res);
-    });
-    API({
-      // Gets the color_table from the database
-      method: "GET",
-      url: "/api/colors",
-    }).then((response) => {
-      const res = response.data;
-      setColorResponse(res);
-    });
-    API({
-      // Gets the calendar_table from the database
-      method: "GET",
-      url: "/api/calendar",
-    }).then((response) => {
-      const res = response.data;
-      setCalendarResponse(res);
-    });
-    API({
-      // Gets the downreasons_table from the database
-      method: "GET",
-      url: "/api/downreasons",
-    }).then((response) => {
-      const res = response.data;
-      setDownResponse(res);
-    });
-    API({
-      //Gets the furnaces_table from the database
-      method: "GET",
-      url: "/api/furnaces",
-    }).then((response) => {
-      const res = response.data;
-      setfurnaceResponse(res);
+      setApiResponse(res.recipes); // recipe_table
+      setfurnaceRecipeResponse(res.furnaceRecipes); // furnace_recipe_table
+      setBlockResponse(res.blocks); // blockname_table
+      setColorResponse(res.colors); // color_table
+      setCalendarResponse(res.calendar); // calendar_table
+      setDownResponse(res.downreasons); // down_table
+      setfurnaceResponse(res.furnaces); // furnaces_table
     });
   }, []);
   const recipeNames = furnaceResponse.map((recipe) => recipe.recipe_key); // obtain the unique recipe names list
@@ -1,11 +1,16 @@
+import logging
 import sys
 import os
-from flask import current_app, request, jsonify, make_response, Blueprint
+import time
+from flask import current_app, request, jsonify, make_response, Blueprint, Response, stream_with_context
 import json
 current_dir = os.path.dirname(__file__)
 sys.path.append(os.path.join(current_dir,'..','..', 'sqlite'))
+import connection_pool
 import database
-from datetime import datetime
+import events
+import models
+from datetime import datetime, date, timedelta
 
 
 VERSION = "0.1"
@@ -13,6 +18,183 @@ VERSION = "0.1"
 blueprint_ver_str = VERSION.replace(".", "_")  # replace dot with underscore
 url_ver_str = VERSION.replace(".", "-")   # replace dot with dash
 api = Blueprint(f"api_v{blueprint_ver_str}", __name__)  
+logger = logging.getLogger(__name__)
+
+def conditional_json(tables, loader, variant=None):
+    """
+    Build a JSON response that supports conditional GETs through ETags.
+
+    The ETag is derived from the change counters of the tables the endpoint reads (see
+    `database.read_table_versions`). When the client's If-None-Match header already holds
+    that ETag, a bodiless 304 Not Modified is returned without calling `loader` or
+    serializing anything. Responses carry 'Cache-Control: no-cache' so browsers keep the
+    body but revalidate it on every request.
+
+    Args:
+        tables (tuple of str): Tables whose contents determine the response.
+        loader (callable): Zero-argument function returning the data; row records (see
+                           `models`) are sent as JSON objects.
+        variant (str): Added to the ETag when the response also depends on something
+                       other than the tables, such as today's date.
+
+    Returns:
+        Response: A 304 response, or a `jsonify` response of `loader()` with the ETag set.
+    """
+    etag = database.read_table_versions(tables)
+    if etag is not None and variant is not None:
+        etag += "-" + variant
+    if etag is not None and request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = jsonify(models.to_json(loader()))
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def encode_json_array(chunks):
+    """
+    Encode an iterable of row chunks as one JSON array, a chunk at a time.
+
+    Args:
+        chunks (iterable of list): Lists of row records, e.g. from `database.iter_table`.
+
+    Yields:
+        str: Pieces of the JSON text; joined together they form a single array.
+    """
+    yield "["
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        body = json.dumps(models.to_json(chunk), separators=(",", ":"))[1:-1]
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def streamed_json(tables, name):
+    """
+    Like `conditional_json`, but the body is a whole table streamed in chunks (see
+    `database.iter_table`) instead of a list built in memory, so memory use stays bounded
+    and the first bytes go out before the last rows are read.
+
+    Args:
+        tables (tuple of str): Tables whose contents determine the response.
+        name (str): Table to stream, a key of `database.STREAM_QUERIES`.
+
+    Returns:
+        Response: A 304 response, or a streamed JSON array with the ETag set.
+    """
+    etag = database.read_table_versions(tables)
+    if etag is not None and request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = Response(stream_with_context(encode_json_array(database.iter_table(name))), mimetype="application/json")
+    if etag is not None:
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def format_event(bus, event):
+    """Format a change event as one Server-Sent Events message."""
+    return f"id: {bus.format_id(event)}\nevent: {event.type}\ndata: {json.dumps(event.data, separators=(',', ':'))}\n\n"
+
+
+def event_stream(bus, subscription, heartbeat, lifetime):
+    """
+    Yield SSE messages for a subscription until `lifetime` seconds have passed.
+
+    A comment line is sent after `heartbeat` idle seconds so proxies keep the connection
+    open and a closed connection is noticed. Ending the stream after `lifetime` frees the
+    server thread; EventSource reconnects on its own with Last-Event-ID, and the events
+    published in between are replayed.
+
+    Yields:
+        str: 'retry:' advice, then events and keep-alive comments.
+    """
+    deadline = time.monotonic() + lifetime
+    try:
+        yield "retry: 2000\n\n"
+        while not subscription.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            batch = subscription.get(min(heartbeat, remaining))
+            if batch:
+                yield "".join(format_event(bus, event) for event in batch)
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+WINDOW_PARAMS = ("start", "end", "furnace_id", "furnace_name", "block", "after", "limit")
+
+
+def window_args(allowed):
+    """
+    Parse and validate the date-window, filter and paging query parameters.
+
+    Args:
+        allowed (tuple of str): Parameter names the endpoint accepts, from `WINDOW_PARAMS`.
+
+    Returns:
+        dict: Parameter name -> value for the parameters present in the request.
+
+    Raises:
+        ValueError: If a date is not 'YYYY-MM-DD' or 'after'/'limit' is not a non-negative integer.
+    """
+    args = {}
+    for name in allowed:
+        value = request.args.get(name)
+        if value is None or value == "":
+            continue
+        if name in ("start", "end"):
+            value = datetime.strptime(value[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+        elif name in ("after", "limit"):
+            value = int(value)
+            if value < 0:
+                raise ValueError(f"'{name}' must not be negative")
+        args[name] = value
+    return args
+
+
+def columnar_format():
+    """
+    Read the 'format' query parameter of the endpoints that offer a columnar format.
+
+    Returns:
+        bool: True for 'format=columnar', False when the parameter is missing or 'rows'.
+
+    Raises:
+        ValueError: For any other format.
+    """
+    value = request.args.get("format") or "rows"
+    if value not in ("rows", "columnar"):
+        raise ValueError(f"'format' must be 'rows' or 'columnar', not '{value}'")
+    return value == "columnar"
+
+
+def paged_json(tables, loader):
+    """
+    Like `conditional_json`, for loaders returning (items, next cursor). The cursor for the
+    next page is sent in the 'X-Next-Cursor' header, so the body keeps the same list shape
+    as the unpaged endpoint.
+    """
+    page = {}
+
+    def load():
+        items, page["next"] = loader()
+        return items
+
+    response = conditional_json(tables, load)
+    if page.get("next") is not None:
+        response.headers["X-Next-Cursor"] = str(page["next"])
+    return response
+
 
 # ---- API Health ----
 
@@ -37,6 +219,73 @@ def health_check():
     return jsonify(res), res["code"]
 
 
+@api.route("/health-check/db-pool", methods=["GET"])
+def db_pool_stats():
+    """
+    Report the state of the database connection pool.
+
+    Returns:
+        Response: A Flask `jsonify` response with the pool counters:
+            - 'max_size' (int): Upper bound on open connections.
+            - 'open' (int): Connections currently open.
+            - 'idle' (int): Open connections waiting in the pool.
+            - 'in_use' (int): Connections checked out by requests.
+            - 'waiting' (int): Requests blocked waiting for a connection.
+            - 'acquired' (int): Total successful checkouts.
+            - 'timeouts' (int): Total checkouts that gave up waiting.
+    """
+    return jsonify(database.pool_stats())
+
+
+@api.route("/health-check/cache", methods=["GET"])
+def reference_cache_stats():
+    """
+    Report the state of the reference-data cache in front of recipes, colors, down reasons
+    and furnace recipes.
+
+    Returns:
+        Response: A Flask `jsonify` response with 'enabled' (bool), 'entries' (list of cached
+        collections), 'hits' (int) and 'misses' (int).
+    """
+    return jsonify(database.cache_stats())
+
+
+@api.route("/health-check/events", methods=["GET"])
+def event_bus_stats():
+    """
+    Report the state of the change-event bus behind '/api/events'.
+
+    Returns:
+        Response: A Flask `jsonify` response with 'subscribers' (int), 'published' (int)
+        and 'last_event_id' (int).
+    """
+    return jsonify(database.event_stats())
+
+
+@api.route("/health-check/schedule-cache", methods=["GET"])
+def schedule_cache_stats():
+    """
+    Report the state of the cache of furnace timelines behind '/api/schedule'.
+
+    Returns:
+        Response: A Flask `jsonify` response with 'enabled' (bool), 'furnaces' (int),
+        'version' (int), 'hits' (int), 'misses' (int) and 'invalidations' (int).
+    """
+    return jsonify(database.schedule_stats())
+
+
+@api.route("/health-check/interval-index", methods=["GET"])
+def interval_index_stats():
+    """
+    Report the state of the interval index behind '/api/intervals/point' and '/api/intervals/range'.
+
+    Returns:
+        Response: A Flask `jsonify` response with 'built' (bool), 'runs', 'intervals',
+        'pending', 'stale', 'version', 'rebuilds' and 'queries' (int).
+    """
+    return jsonify(database.interval_index_stats())
+
+
 @api.route("/process-recipes", methods=["GET"])
 def get_recipes():
     """
@@ -65,9 +314,10 @@ def api_get_recipes():
     This endpoint retrieves all recipe data from the database and returns it in JSON format.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of recipes.
+        Response: A Flask `jsonify` response containing a list of recipes. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_recipes())
+    return conditional_json(("recipe_table",), database.read_recipes)
 @api.route('/api/furnaceRecipes', methods=['GET'])
 def api_get_furnace_recipes():
     """
@@ -76,33 +326,63 @@ def api_get_furnace_recipes():
     This endpoint retrieves all furnace recipe data from the lookup table furnace_recipe and returns it in JSON format.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of furnace recipes.
+        Response: A Flask `jsonify` response containing a list of furnace recipes. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_furnace_recipes())
+    return conditional_json(("furnace_recipe_table",), database.read_furnace_recipes)
 
 @api.route('/api/furnaces', methods=['GET'])
 def api_get_furnaces():
     """
-    Retrieve all furnaces from the database.
+    Retrieve furnace runs from the database.
+
+    Without query parameters this endpoint streams all furnace data in JSON format. With
+    any of the parameters below it returns only the matching runs (see
+    `database.read_furnaces_window`). Runs without a start date are always included.
 
-    This endpoint retrieves all furnace data from the database and returns it in JSON format.
+    Query parameters (all optional):
+        start (str): Only runs still going on or after this 'YYYY-MM-DD' date.
+        end (str): Only runs starting on or before this 'YYYY-MM-DD' date.
+        furnace_name (str): Only runs on this furnace.
+        limit (int): Page size. When more runs follow, the 'X-Next-Cursor' response
+                     header holds the value to pass as 'after' for the next page.
+        after (int): Cursor from the previous page.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of furnaces.
+        Response: A Flask `jsonify` response containing a list of furnaces. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_furnaces())
+    try:
+        args = window_args(("start", "end", "furnace_name", "after", "limit"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    if not args:
+        return streamed_json(("furnaces_table",), "furnaces")
+    return paged_json(("furnaces_table", "calendar_table", "recipe_table"), lambda: database.read_furnaces_window(**args))
 
 @api.route('/api/blocks', methods=['GET'])
 def api_get_blocks():
     """
     Retrieve all blocks from the database.
 
-    This endpoint retrieves all block data from the database and returns it in JSON format.
+    This endpoint streams all block data from the database in JSON format (see `streamed_json`).
+
+    Query parameters (all optional):
+        format (str): 'columnar' to get one array per field instead of one object per block,
+                      with recipe and block names sent as indexes into tables of names (see
+                      `models.to_columns`). Defaults to 'rows'.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of blocks.
+        Response: A Flask `jsonify` response containing a list of blocks. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_blocks())
+    try:
+        columnar = columnar_format()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    if columnar:
+        return conditional_json(("blockname_table",), lambda: models.to_columns(database.iter_table("blocks"), models.Block, ("recipe_key", "block")))
+    return streamed_json(("blockname_table",), "blocks")
 
 @api.route('/api/colors', methods=['GET'])
 def api_get_colors():
@@ -112,21 +392,53 @@ def api_get_colors():
     This endpoint retrieves all color data from the database and returns it in JSON format.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of colors.
+        Response: A Flask `jsonify` response containing a list of colors. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_colors())
+    return conditional_json(("color_table",), database.read_colors)
 
 @api.route('/api/calendar', methods=['GET'])
 def api_get_calendar():
     """
-    Retrieve all calendar entries from the database.
-
-    This endpoint retrieves all calendar data from the database and returns it in JSON format.
+    Retrieve calendar entries from the database.
+
+    Without query parameters this endpoint streams all calendar data in JSON format. With
+    any of the parameters below it returns only the matching entries (see
+    `database.read_calendar_window`), so the scheduler can fetch just the weeks it displays.
+
+    Query parameters (all optional):
+        start (str): Only runs still going on or after this 'YYYY-MM-DD' date.
+        end (str): Only runs starting on or before this 'YYYY-MM-DD' date.
+        furnace_id (str): Only entries of this furnace run.
+        furnace_name (str): Only entries of runs on this furnace.
+        block (str): Only entries of this block type.
+        limit (int): Page size. When more entries follow, the 'X-Next-Cursor' response
+                     header holds the value to pass as 'after' for the next page.
+        after (int): Cursor from the previous page.
+        format (str): 'columnar' to get one array per field instead of one object per entry,
+                      with block names sent as indexes into a table of names (see
+                      `models.to_columns`). Defaults to 'rows'.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of calendar entries.
+        Response: A Flask `jsonify` response containing a list of calendar entries. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_calendar())
+    try:
+        args = window_args(WINDOW_PARAMS)
+        columnar = columnar_format()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    if columnar:
+        to_columns = lambda chunks: models.to_columns(chunks, models.CalendarEntry, ("block",))
+        if not args:
+            return conditional_json(("calendar_table",), lambda: to_columns(database.iter_table("calendar")))
+        def load_page():
+            entries, next_cursor = database.read_calendar_window(**args)
+            return to_columns([entries]), next_cursor
+        return paged_json(("calendar_table", "furnaces_table"), load_page)
+    if not args:
+        return streamed_json(("calendar_table",), "calendar")
+    return paged_json(("calendar_table", "furnaces_table"), lambda: database.read_calendar_window(**args))
 @api.route('/api/downreasons', methods=['GET'])
 def api_get_down():
     """
@@ -135,10 +447,363 @@ def api_get_down():
     This endpoint retrieves all down reason data from the database and returns it in JSON format.
 
     Returns:
-        Response: A Flask `jsonify` response containing a list of down reasons.
+        Response: A Flask `jsonify` response containing a list of down reasons. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
+    """
+    return conditional_json(("down_table",), database.read_down)
+
+
+@api.route('/api/snapshot', methods=['GET'])
+def api_get_snapshot():
+    """
+    Retrieve several collections from the database in a single request.
+
+    This endpoint replaces the separate GETs the client makes on load (recipes,
+    furnaceRecipes, blocks, colors, calendar, downreasons and furnaces). All collections
+    are read inside one read transaction, so they are consistent with each other even
+    while writes are happening.
+
+    Query parameters:
+        include (str, optional): Comma-separated collection names to return, e.g.
+        'include=calendar,furnaces'. Defaults to all of them.
+        start, end (str, optional): 'YYYY-MM-DD' window limiting the calendar collection to
+        the runs the scheduler displays (see '/api/calendar').
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response with one key per collection, each holding the same
+              list the corresponding endpoint returns. Answers 304 Not Modified when the
+              client's If-None-Match matches the current ETag (see `conditional_json`).
+            - If an unknown collection is requested: A 400 Bad Request response.
+    """
+    include = request.args.get("include")
+    if include:
+        names = [name.strip() for name in include.split(",") if name.strip()]
+        unknown = [name for name in names if name not in database.SNAPSHOT_COLLECTIONS]
+        if unknown:
+            return jsonify({"error": f"Unknown collection(s): {', '.join(unknown)}. "
+                                     f"Choose from: {', '.join(database.SNAPSHOT_COLLECTIONS)}."}), 400
+    else:
+        names = list(database.SNAPSHOT_COLLECTIONS)
+    try:
+        calendar_window = window_args(("start", "end"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    tables = tuple(database.SNAPSHOT_COLLECTIONS[name][0] for name in names)
+    if calendar_window and "furnaces_table" not in tables:
+        tables += ("furnaces_table",)
+    return conditional_json(tables, lambda: database.read_snapshot(names, calendar_window))
+
+
+@api.route('/api/schedule', methods=['GET'])
+def api_get_schedule():
+    """
+    Retrieve the scheduler grid: each furnace's state for every day of a date window.
+
+    Instead of one cell per day, each furnace gets a run-length-encoded timeline: a list of
+    [state, days, primary_id, block_day] items covering the window in order, e.g.
+
+        ["Starting", 3, 17, 0], ["Running", 9, 17, 0], [null, 4, null, null], ...
+
+    where 'state' is the block name ('Aborted' or a Down reason on the day a run was
+    stopped), 'primary_id' the run and 'block_day' how many days of the block came before
+    the item's first day. Days without a run have null state. Timelines are worked out on
+    the server and cached per furnace until that furnace's runs or calendar entries change
+    (see `database.read_schedule_grid`).
+
+    Query parameters (all optional):
+        start (str): First day, 'YYYY-MM-DD'. Defaults to today.
+        end (str): Last day, 'YYYY-MM-DD'. Defaults to a year after 'start', minus a day.
+        furnace_name (str): Only this furnace.
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response with 'start', 'end', 'days' and 'furnaces' (a list
+              of 'furnace_name' and 'timeline'). Answers 304 Not Modified when the client's
+              If-None-Match matches the current ETag (see `conditional_json`).
+            - If a parameter is invalid or 'end' is before 'start': A 400 Bad Request response.
+    """
+    try:
+        args = window_args(("start", "end", "furnace_name"))
+        start = args.get("start") or date.today().isoformat()
+        end = args.get("end") or (date.fromisoformat(start) + timedelta(days=364)).isoformat()
+        if end < start:
+            raise ValueError("'end' must not be before 'start'")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    return conditional_json(("furnaces_table", "calendar_table", "recipe_table", "blockname_table"),
+                            lambda: database.read_schedule_grid(start, end, args.get("furnace_name")),
+                            variant=f"{start}_{end}")
+
+@api.route('/api/schedule/free-slot', methods=['GET'])
+def api_get_free_slot():
+    """
+    Find the earliest start on each candidate furnace where a whole run of a recipe fits.
+
+    Replaces scrolling the calendar for a gap: for every candidate furnace the first day
+    from 'after' on followed by enough idle days for the recipe's 'time' is found from the
+    furnace's cached busy stretches (see `database.find_free_slots`).
+
+    Query parameters:
+        recipe_name (str): The recipe to place.
+        furnace_name (str, optional): A candidate furnace; repeat the parameter for several.
+                                      Defaults to the furnaces assigned the recipe in
+                                      furnaceRecipes, or every furnace if none is.
+        after (str, optional): Earliest start, 'YYYY-MM-DD'. Defaults to today.
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response with 'recipe_name', 'length', 'after', 'blocks' and
+              'slots' (per furnace, earliest first: 'furnace_name', 'start', 'end' and the
+              start day of each block). Answers 304 Not Modified when the client's
+              If-None-Match matches the current ETag (see `conditional_json`).
+            - If 'recipe_name' is missing or 'after' is invalid: A 400 Bad Request response.
+            - If the recipe does not exist: A 404 Not Found response.
+    """
+    recipe_name = request.args.get("recipe_name")
+    try:
+        if not recipe_name:
+            raise ValueError("'recipe_name' is required")
+        after = request.args.get("after")
+        after = datetime.strptime(after[:10], "%Y-%m-%d").strftime("%Y-%m-%d") if after else date.today().isoformat()
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    furnace_names = [name for name in request.args.getlist("furnace_name") if name]
+    result = {}
+
+    def load():
+        result["slots"] = database.find_free_slots(recipe_name, furnace_names, after)
+        return result["slots"]
+
+    response = conditional_json(("furnaces_table", "calendar_table", "recipe_table", "blockname_table", "furnace_recipe_table"),
+                                load, variant=after)
+    if response.status_code == 200 and result.get("slots") is None:
+        return jsonify({"error": f"Recipe '{recipe_name}' not found"}), 404
+    return response
+
+@api.route('/api/schedule/conflicts', methods=['GET'])
+def api_get_schedule_conflicts():
+    """
+    Validate the whole schedule: find every pair of runs that overlap on the same furnace.
+
+    Runs are checked with a sweep line over the in-memory interval index (see
+    `database.find_conflicts`). An overlap where a Down block of one run falls on a
+    'Running' block of the other is reported as 'down_overlaps_running', any other as
+    'runs_overlap'.
+
+    Query parameters:
+        furnace_name (str, optional): Only this furnace.
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response with 'runs' (the number checked) and 'conflicts'
+              ('furnace_name', 'kind', 'first' and 'second' primary_ids, and the overlap's
+              'start' and 'end'). Answers 304 Not Modified when the client's If-None-Match
+              matches the current ETag (see `conditional_json`).
+    """
+    furnace_name = request.args.get("furnace_name") or None
+    return conditional_json(("furnaces_table", "calendar_table", "recipe_table", "blockname_table"),
+                            lambda: database.find_conflicts(furnace_name))
+
+def conflict_check_requested():
+    """
+    Tell whether a furnace write should be checked for conflicts first: the
+    'check_conflicts' query parameter, defaulting to the FURNACE_CONFLICT_CHECK
+    environment variable (off if unset).
+    """
+    value = request.args.get("check_conflicts", os.environ.get("FURNACE_CONFLICT_CHECK", "0"))
+    return value.strip().lower() not in ("", "0", "false", "no", "off")
+
+def conflict_response(furnace, found):
+    """
+    Build the 409 Conflict response of a furnace write refused by the conflict check.
+
+    Args:
+        furnace (dict): The run that was not written.
+        found (list of dict): The conflicts returned by `database.create_furnace` or
+                              `database.update_furnace`.
+
+    Returns:
+        tuple: The response and its status code.
+    """
+    return jsonify({"error": f"The run overlaps {len(found)} other run(s) on furnace '{furnace['furnace_name']}'",
+                    "conflicts": found}), 409
+
+def interval_filters():
+    """
+    Read the 'furnace_name' and 'state' filters of the interval endpoints.
+
+    Returns:
+        dict: `database.query_intervals` keyword arguments.
+    """
+    return {"furnace_name": request.args.get("furnace_name") or None, "state": request.args.get("state") or None}
+
+
+@api.route('/api/intervals/point', methods=['GET'])
+def api_get_intervals_point():
+    """
+    Retrieve what every furnace is doing on one day, e.g. "which block is furnace X in on
+    date D?".
+
+    Answered from an in-memory interval tree of every run's blocks (see
+    `database.query_intervals`) instead of the whole calendar.
+
+    Query parameters:
+        date (str): The day, 'YYYY-MM-DD'.
+        furnace_name (str, optional): Only this furnace.
+        state (str, optional): Only this block, e.g. 'Running'; 'Down' matches every Down reason.
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response containing a list of intervals with 'furnace_name',
+              'primary_id', 'state', 'start' and 'end' (last day). Answers 304 Not Modified
+              when the client's If-None-Match matches the current ETag (see `conditional_json`).
+            - If 'date' is missing or invalid: A 400 Bad Request response.
+    """
+    try:
+        day = datetime.strptime(request.args.get("date", "")[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: 'date' must be 'YYYY-MM-DD' ({e})"}), 400
+    filters = interval_filters()
+    return conditional_json(("furnaces_table", "calendar_table", "recipe_table", "blockname_table"),
+                            lambda: database.query_intervals(day, **filters))
+
+
+@api.route('/api/intervals/range', methods=['GET'])
+def api_get_intervals_range():
+    """
+    Retrieve the blocks overlapping a range of days, e.g. "which furnaces are Down this
+    week?" ('state=Down').
+
+    Answered from an in-memory interval tree of every run's blocks (see
+    `database.query_intervals`) instead of the whole calendar.
+
+    Query parameters:
+        start (str): First day, 'YYYY-MM-DD'.
+        end (str): Last day, 'YYYY-MM-DD'.
+        furnace_name (str, optional): Only this furnace.
+        state (str, optional): Only this block, e.g. 'Running'; 'Down' matches every Down reason.
+
+    Returns:
+        Response:
+            - A Flask `jsonify` response containing a list of intervals with 'furnace_name',
+              'primary_id', 'state', 'start' and 'end' (last day). Answers 304 Not Modified
+              when the client's If-None-Match matches the current ETag (see `conditional_json`).
+            - If 'start' or 'end' is missing or invalid, or 'end' is before 'start': A 400
+              Bad Request response.
+    """
+    try:
+        args = window_args(("start", "end"))
+        if "start" not in args or "end" not in args:
+            raise ValueError("'start' and 'end' are required")
+        if args["end"] < args["start"]:
+            raise ValueError("'end' must not be before 'start'")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    filters = interval_filters()
+    return conditional_json(("furnaces_table", "calendar_table", "recipe_table", "blockname_table"),
+                            lambda: database.query_intervals(args["start"], args["end"], **filters))
+
+@api.route('/api/events', methods=['GET'])
+def api_get_events():
+    """
+    Push change events to the client as Server-Sent Events (text/event-stream).
+
+    After each committed write, database.py publishes a typed event (see the list at the
+    top of 'sqlite/events.py'), e.g.
+
+        id: 1718000000000-42
+        event: calendar.changed
+        data: {"furnace_id":"17","action":"addremove"}
+
+    so an open scheduler can patch its local state instead of reloading every table.
+    A 'resync' event means events were missed and everything should be reloaded.
+
+    Every open stream keeps one server thread busy, so streams are limited to
+    `SSE_MAX_CLIENTS` (default 4) at a time and end after `SSE_MAX_SECONDS` (default 300);
+    the browser's EventSource then reconnects with the Last-Event-ID header and gets the
+    events it missed. A keep-alive comment is sent after `SSE_HEARTBEAT` (default 15)
+    idle seconds. Events only cover writes handled by the server process the client is
+    connected to.
+
+    Query parameters:
+        last_event_id (str, optional): Same as the Last-Event-ID header, for clients that
+        cannot set headers.
+
+    Returns:
+        Response:
+            - A streamed text/event-stream response.
+            - If `SSE_MAX_CLIENTS` streams are already open: A 503 Service Unavailable
+              response with Retry-After.
     """
-    return jsonify(database.read_down())
+    bus = events.get_bus()
+    if bus.stats()["subscribers"] >= int(os.environ.get("SSE_MAX_CLIENTS", 4)):
+        response = jsonify({"error": "Too many open event streams, try again later."})
+        response.headers["Retry-After"] = "30"
+        return response, 503
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    subscription = bus.subscribe(last_event_id)
+    stream = event_stream(bus, subscription,
+                          heartbeat=float(os.environ.get("SSE_HEARTBEAT", 15)),
+                          lifetime=float(os.environ.get("SSE_MAX_SECONDS", 300)))
+    response = Response(stream, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@api.route('/api/changes', methods=['GET'])
+def api_get_changes():
+    """
+    Retrieve only the rows inserted, updated and deleted since the client last synced.
+
+    Triggers log every row change of recipes, blocks, furnaceRecipes, furnaces and
+    calendar with an increasing version (see `database.read_changes`). A client:
+        1. calls '/api/changes' without 'since' and keeps the returned 'version',
+        2. loads the collections (e.g. '/api/snapshot'),
+        3. then calls '/api/changes?since=<version>' (after each '/api/events' event, or
+           on a timer) and applies the changes by 'rowid', continuing from the new 'version'.
+    Changes made between steps 1 and 2 are sent again; applying them twice is harmless.
+    Whenever 'resync' is true the client goes back to step 2 with the returned 'version'.
+
+    Entries older than the newest `CHANGE_LOG_RETAIN` versions are compacted away at
+    most every `CHANGE_LOG_COMPACT_SECONDS`; clients that fell further behind get 'resync'.
+
+    Query parameters:
+        since (int, optional): Version from the previous response.
+        database (str, optional): 'database' from the previous response; a different
+        database (recreated or replaced) answers 'resync'.
+        limit (int, optional): Most change log entries to read (default 10000). When
+        'more' is true, call again with the returned 'version'.
 
+    Returns:
+        Response:
+            - A Flask `jsonify` response with 'database', 'version', 'resync', 'more' and
+              'changes' (collection name -> 'inserted', 'updated' and 'deleted' rowids).
+            - If a parameter is invalid: A 400 Bad Request response.
+            - If the change log cannot be read: A 500 Internal Server Error response.
+    """
+    try:
+        since = request.args.get("since")
+        if since is not None and since != "":
+            since = int(since)
+            if since < 0:
+                raise ValueError("'since' must not be negative")
+        else:
+            since = None
+        limit = window_args(("limit",)).get("limit", 10000)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {e}"}), 400
+    database.maybe_compact_change_log()
+    try:
+        changes = database.read_changes(since, limit=max(1, limit), database_id=request.args.get("database") or None)
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        return jsonify({"error": "An error occurred while reading the changes."}), 500
+    response = jsonify(changes)
+    response.headers["Cache-Control"] = "no-store"
+    return response
 
 @api.route('/api/recipes/<recipe_id>', methods=['GET'])
 def api_get_recipe(recipe_id):
@@ -152,9 +817,10 @@ def api_get_recipe(recipe_id):
         recipe_id (int): The ID of the recipe to retrieve.
 
     Returns:
-        Response: A Flask `jsonify` response containing the recipe data.
+        Response: A Flask `jsonify` response containing the recipe data. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_recipe_by_id(recipe_id))
+    return conditional_json(("recipe_table",), lambda: database.read_recipe_by_id(recipe_id))
 
 
 @api.route('/api/furnaces/<primary_id>', methods=['GET'])
@@ -169,9 +835,10 @@ def api_get_furnace(primary_id):
         primary_id (int): The primary ID of the furnace to retrieve.
 
     Returns:
-        Response: A Flask `jsonify` response containing the furnace data.
+        Response: A Flask `jsonify` response containing the furnace data. Answers 304 Not Modified
+                  when the client's If-None-Match matches the current ETag (see `conditional_json`).
     """
-    return jsonify(database.read_furnace_by_id(primary_id))
+    return conditional_json(("furnaces_table",), lambda: database.read_furnace_by_id(primary_id))
 
 
 @api.route('/api/recipes/add',  methods=['POST'])
@@ -199,8 +866,10 @@ def api_add_recipe():
         return jsonify(database.create_recipe(recipe))
     except TypeError:
         return (jsonify({"error": "Invalid value for time. Must be a float."}), 400)  # HTTP 400 Bad Request
-    except Exception as e:
-        print(f"{e}")
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to add recipe")
         return (jsonify({"error": "An error occurred while adding the recipe."}), 500)
 @api.route('/api/furnaceRecipe/add',  methods=['POST'])
 def api_add_furnace_recipe():
@@ -222,8 +891,10 @@ def api_add_furnace_recipe():
     furnace_recipe = request.get_json()
     try:
         return jsonify(database.create_furnace_recipe(furnace_recipe))
-    except Exception as e:
-        print(f"{e}")
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to add furnace recipe")
         return (jsonify({"error": "An error occurred while adding the furnace recipe."}), 500)
     
     
@@ -256,14 +927,13 @@ def api_add_recipe_blocks(blocks):
     """
     recipe = request.get_json()
     try:
-        print(len(blocks))
+        logger.debug("Adding recipe with blocks", extra={"recipe": recipe, "blocks": blocks})
         new_recipe = jsonify(database.create_recipe(recipe))
         if (len(blocks) == 3):
             block1 = {'recipe_key':recipe['recipe_name'], 'block': 'Starting', 'sequence': blocks[0] }
             block2 = {'recipe_key':recipe['recipe_name'], 'block': 'Running', 'sequence': blocks[1] }
             block3 = {'recipe_key':recipe['recipe_name'], 'block': 'Finishing', 'sequence': blocks[2] }
             block_list = [block1, block2, block3]
-            print(block_list)
             database.create_block(block_list)
      
         elif (len(blocks) == 4):
@@ -277,13 +947,14 @@ def api_add_recipe_blocks(blocks):
             
 
         recipe['time'] = float(recipe['time'])
-        print("printing blocks from add_recipe_blocks")
         # database.print_blocks()
         return new_recipe
     except TypeError:
         return (jsonify({"error": "Invalid value for time. Must be a float."}), 400)  # HTTP 400 Bad Request
-    except Exception as e:
-        print(f"{e}")
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to add recipe with blocks")
         return (jsonify({"error": "An error occurred while adding the recipe."}), 500)
     
 
@@ -305,24 +976,92 @@ def api_add_furnaceRow():
             - 'start_time' (str): The start time associated with the furnace.
         - Calendar entries (list): A list of dictionaries, each representing a calendar entry.
 
+    Query parameters:
+        check_conflicts (str, optional): '1' to refuse a run that would overlap another run
+                                         on the same furnace (see `database.check_run_conflicts`),
+                                         checked in the same transaction as the insert.
+                                         Defaults to the FURNACE_CONFLICT_CHECK environment variable.
+
     Returns:
         Response:
             - A Flask `jsonify` response containing the result of the furnace creation operation.
             - A 201 Created status code upon successful creation.
+            - If the check is on and the run overlaps others: A 409 Conflict response with
+              the 'conflicts', and nothing is written.
     """
     furnace = request.get_json()[0]
-    print(furnace)
+    logger.debug("Adding furnace", extra={"furnace": furnace})
     calendar_list = request.get_json()[1]
 
     # Call the database function to create the furnace entry
-    result = database.create_furnace(furnace)
+    result = database.create_furnace(furnace, check_conflicts=conflict_check_requested())
+    if result:
+        return conflict_response(furnace, result)
     # new_calendar = database.create_calendar(calendar_list, furnace['start_time'], furnace['furnace_name'])
     return jsonify(result), 201  # HTTP 201 Created
 
+@api.route('/api/furnaces/addRows',  methods=['POST'])
+def api_add_furnace_rows():
+    """
+    Add many furnace runs and their calendar entries to the database in one request.
+
+    This is the bulk version of '/api/furnaces/addRow' for onboarding existing schedules:
+    every run and all of its calendar entries are written in a single transaction, so
+    either the whole batch is created or nothing is.
+
+    Expected JSON payload:
+        A list of [furnace, calendar entries] pairs, the same shape '/api/furnaces/addRow' takes:
+            - Furnace details (dict):
+                - 'furnace_name' (str): The name of the furnace.
+                - 'recipe_key' (str): The key representing the associated recipe.
+                - 'start_time' (str, optional): The start date, 'YYYY-MM-DD' (anything after
+                  the first 10 characters is ignored). Leave empty for a row without a date.
+            - Calendar entries (list, optional): Dictionaries with 'block' and 'sequence' keys.
+
+    Returns:
+        Response:
+            - If successful: A 201 Created response with the 'primary_id' of each created run.
+            - If the payload is malformed: A 400 Bad Request response with an error message.
+            - If the database rejects the batch: A 500 Internal Server Error response.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        return jsonify({"error": "Expected a list of [furnace, calendar entries] pairs."}), 400
+    runs = []
+    for index, item in enumerate(payload):
+        if not isinstance(item, list) or not item or not isinstance(item[0], dict):
+            return jsonify({"error": f"Item {index} must be a [furnace, calendar entries] pair."}), 400
+        furnace = dict(item[0])
+        calendar_list = item[1] if len(item) > 1 and item[1] else []
+        if 'furnace_name' not in furnace or 'recipe_key' not in furnace:
+            return jsonify({"error": f"Item {index} is missing 'furnace_name' or 'recipe_key'."}), 400
+        if not all(isinstance(entry, dict) and 'block' in entry and 'sequence' in entry for entry in calendar_list):
+            return jsonify({"error": f"Calendar entries of item {index} need 'block' and 'sequence'."}), 400
+        start_time = furnace.get('start_time')
+        if start_time:
+            try:
+                furnace['start_time'] = datetime.strptime(start_time[:10], "%Y-%m-%d").strftime("%Y-%m-%d")
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Invalid start_time for item {index}. Must be in 'YYYY-MM-DD' format."}), 400
+        else:
+            furnace['start_time'] = None
+        runs.append((furnace, calendar_list))
+
+    try:
+        ids = database.create_furnaces_bulk(runs)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 400
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to add furnace rows")
+        return jsonify({"error": "An error occurred while adding the furnace rows."}), 500
+    return jsonify({"created": ids}), 201  # HTTP 201 Created
+
 @api.route('/api/furnaces/add',  methods=['POST']) #not being used right now
 def api_add_furnace():
     furnace = request.get_json()[0]
-    print(furnace)
+    logger.debug("Adding furnace", extra={"furnace": furnace})
     calendar_list = request.get_json()[1]
     date_formats = ["%Y-%m-%d"]
     parsed = False
@@ -336,19 +1075,17 @@ def api_add_furnace():
             parsed = True
             break
         except Exception as e:
-            print(f"{e}")
+            logger.debug("start_time '%s' does not match %s: %s", furnace['start_time'], date_format, e)
 
             continue
 
     if not parsed:
-        print("Bad Request")
+        logger.warning("Rejected furnace with invalid start_time", extra={"furnace": furnace})
         return jsonify({"error": "Invalid value for start_time. Must be in 'MM-DD-YYYY' or 'MM/DD/YYYY' format."}), 400  # HTTP 400 Bad Request
 
     # Call the database function to create the furnace entry
     result = database.create_furnace(furnace)
-    print(calendar_list)
-    print(furnace['start_time'])
-    print(furnace['furnace_name'])
+    logger.debug("Adding calendar", extra={"calendar": calendar_list, "start_time": furnace['start_time'], "furnace_name": furnace['furnace_name']})
     new_calendar = database.create_calendar(calendar_list, furnace['start_time'], furnace['furnace_name'])
     return jsonify(result), 201  # HTTP 201 Created
 
@@ -370,14 +1107,16 @@ def api_update_recipe():
     Returns:
         Response:
             - If successful: A Flask `jsonify` response containing the updated recipe.
-            - If 'time' is not a valid float: A message is printed indicating the error.
+            - If 'time' is not a valid float: A warning is logged.
     """
     recipe = request.get_json()
     try:
         recipe['time'] = float(recipe['time'])
         return jsonify(database.update_recipe(recipe))
+    except connection_pool.PoolTimeout:
+        raise
     except:
-        print("Time has to be a float ")
+        logger.warning("Rejected recipe update, time has to be a float", extra={"recipe": recipe})
 
 @api.route('/api/calendar/update',  methods=['PUT'])
 def api_update_calendar():
@@ -400,10 +1139,10 @@ def api_update_calendar():
     Returns:
         Response:
             - If successful: A Flask `jsonify` response containing the updated calendar data.
-            - If an error occurs: An error message is printed.
+            - If an error occurs: The error is logged.
     """
     data = request.get_json()
-    print(data)
+    logger.debug("Updating calendar", extra={"payload": data})
   
     number = data[0]
     state = data[1]
@@ -413,14 +1152,15 @@ def api_update_calendar():
         if(data[3] == "abort"):
             return jsonify(database.update_calendar(number, state, id, "abort"))
         elif("Down" in data[3]):
-            print("downnnnnn")
             return jsonify(database.update_calendar(number, state, id, data[3]))
 
             
         else:
             return jsonify(database.update_calendar(number, state, id, "addremove"))
-    except Exception as e:
-        print(f"Failed to update calendar {e}")
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to update calendar")
 
 @api.route('/api/recipes/update/<blocks>',  methods=['PUT'])
 def api_update_recipes(blocks):
@@ -453,7 +1193,6 @@ def api_update_recipes(blocks):
             block2 = {'recipe_key':recipe['recipe_name'], 'block': 'Running', 'sequence': blocks[1] }
             block3 = {'recipe_key':recipe['recipe_name'], 'block': 'Finishing', 'sequence': blocks[2] }
             block_list = [block1, block2, block3]
-            print(block_list)
      
         elif (len(blocks) == 4):
             block1 = {'recipe_key':recipe['recipe_name'], 'block': 'Starting', 'sequence': blocks[0] }
@@ -461,12 +1200,14 @@ def api_update_recipes(blocks):
             block3 = {'recipe_key':recipe['recipe_name'], 'block': 'Running', 'sequence': blocks[2] }
             block4 = {'recipe_key':recipe['recipe_name'], 'block': 'Finishing', 'sequence': blocks[3] }
             block_list = [block1, block2, block3, block4]
-        print("made it to second part")
+        logger.debug("Updating recipe with blocks", extra={"recipe": recipe, "blocks": block_list})
         ret_val = database.update_recipe(recipe)
         database.update_blocks(recipe, block_list)
         return jsonify(ret_val)
-    except Exception as e:
-        print(f"error while updating recipe: {e} ")
+    except connection_pool.PoolTimeout:
+        raise
+    except Exception:
+        logger.exception("Failed to update recipe with blocks")
 
 
 # /api/furnaceRecipes/delete/
@@ -504,7 +1245,7 @@ def api_update_furnace_recipe():
     Returns:
         Response: A Flask `jsonify` response containing the updated furnace recipe data.
     """
-    print(request.get_json())
+    logger.debug("Updating furnace recipe", extra={"payload": request.get_json()})
     furnaceRecipe = request.get_json()[0]
     #print(furnace)
     oldName = request.get_json()[1]
@@ -528,15 +1269,34 @@ def api_update_furnace():
             - 'start_time' (str): The start time associated with the furnace.
         - The second item (list): A list of dictionaries, each representing a calendar entry.
 
+    Query parameters:
+        check_conflicts (str, optional): '1' to refuse a change that would make the run
+                                         overlap another run on the same furnace (see
+                                         `database.check_run_conflicts`), checked in the same
+                                         transaction as the update; the calendar entries are
+                                         then added once the update went through. Defaults
+                                         to the FURNACE_CONFLICT_CHECK environment variable.
+
     Returns:
-        Response: A Flask `jsonify` response containing the updated furnace data.
+        Response:
+            - A Flask `jsonify` response containing the updated furnace data.
+            - If the check is on and the run would overlap others: A 409 Conflict response
+              with the 'conflicts', and nothing is written.
     """
     furnace = request.get_json()[0]
     calendar_list = request.get_json()[1]
-
-    new_calendar = database.create_empty_calendar(calendar_list, furnace)
-
-    return jsonify(database.update_furnace(furnace))
+    check = conflict_check_requested()
+
+    if not check:
+        new_calendar = database.create_empty_calendar(calendar_list, furnace)
+    result = database.update_furnace(furnace, check_conflicts=check)
+    if result:
+        return conflict_response(furnace, result)
+    if check:
+        # Only once the checked update went through, so a refused change writes nothing.
+        new_calendar = database.create_empty_calendar(calendar_list, furnace)
+
+    return jsonify(result)
 # cur.execute("""UPDATE furnace_recipe_table SET furnace = ?, recipe_key = ? WHERE primary = ? """, (furnace['furnace_name'],furnace['recipe_key'], furnace['start_time'][0:10],   furnace['primary_id']))
 
 @api.route('/api/recipes/delete/<recipe_id>',  methods=['DELETE'])
@@ -1,14 +1,42 @@
 from flask import Flask
 from flask_cors import CORS
+import log_setup
+import metrics
 from api.v0_1.routes import api as api_v0_1
+import database  # importable once the routes module has put sqlite/ on sys.path
 
-# from waitress import serve
-print(__name__)
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-app.register_blueprint(api_v0_1, url_prefix="/api/v0-1")
+
+def create_app():
+    """
+    Build the Flask application.
+
+    Logging is configured, the v0.1 API blueprint is registered with CORS, and the
+    database hooks and request metrics are installed. `database.init_app` opens the
+    first pooled connection and applies pending migrations, so a missing or broken
+    database makes this call fail instead of the first request.
+
+    Returns:
+        flask.Flask: The configured application.
+    """
+    log_setup.configure()
+    app = Flask(__name__)
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    app.register_blueprint(api_v0_1, url_prefix="/api/v0-1")
+    database.init_app(app)
+    metrics.init_app(app)
+    return app
+
+
+def __getattr__(name):
+    # Keeps `waitress-serve app:app` and `gunicorn app:app` working: the module-level
+    # app is only built when something asks for it, not on every import of create_app.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
-    # serve(app, host='0.0.0.0', port=5070)
+    import serve
+    serve.main()
@@ -0,0 +1,287 @@
+"""
+ASGI entry point: the same API, with database work kept off the event loop.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5070
+    python serve.py --server uvicorn
+
+`AsgiAdapter` serves the Flask app built by `app.create_app` (so every endpoint,
+payload, ETag, metric and log line is exactly the same as under WSGI) to an ASGI server.
+It is asgiref's `WsgiToAsgi`, which builds the WSGI environ, reads the request body and
+sends the response, with the WSGI app run on one of two bounded executors instead of
+asgiref's single shared thread:
+    - reads (GET, HEAD, OPTIONS) on a pool of `ASGI_READ_THREADS` threads,
+    - writes (POST, PUT, PATCH, DELETE) on `ASGI_WRITE_THREADS` threads, one by default,
+      a dedicated writer thread, since SQLite runs one write transaction at a time anyway.
+A burst of slow writes therefore queues behind the writer thread instead of taking every
+thread away from the reads. Each executor accepts at most `ASGI_MAX_PENDING` requests
+(running or queued); past that the adapter answers 503 with Retry-After instead of
+letting the queue grow without bound.
+
+A request runs start to finish, including a streamed body, on one executor thread, which
+is what the connection pool's per-thread request scope and the SQL tracer expect. Each
+body chunk is sent before the next one is produced, so a slow client slows down the
+thread producing its response rather than buffering the whole table. When the client
+disconnects, the producing thread stops at its next chunk and closes the response, so
+an abandoned stream (such as /api/events) frees its thread.
+
+Needs asgiref (see requirements.txt); an ASGI server (uvicorn or hypercorn) is needed
+to run it.
+
+Environment variables:
+    ASGI_READ_THREADS   Threads for reads (default: DB_POOL_SIZE minus the write threads,
+                        so no thread ever waits for a pooled connection).
+    ASGI_WRITE_THREADS  Threads for writes (default 1).
+    ASGI_MAX_PENDING    Requests each executor accepts before answering 503 (default 256).
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+class Overloaded(Exception):
+    """Raised when an executor already has `max_pending` requests."""
+
+
+class ClientDisconnected(Exception):
+    """Raised while reading a request body the client gave up on."""
+
+
+class BoundedExecutor(ThreadPoolExecutor):
+    """A thread pool that refuses work once `max_pending` submitted calls are unfinished."""
+
+    def __init__(self, threads, max_pending, name):
+        super().__init__(threads, thread_name_prefix=name)
+        self.threads = threads
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def submit(self, function, /, *args, **kwargs):
+        """
+        Run `function(*args, **kwargs)` on the pool.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the function's result.
+
+        Raises:
+            Overloaded: If `max_pending` calls are already unfinished.
+        """
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise Overloaded()
+            self.pending += 1
+        try:
+            future = super().submit(function, *args, **kwargs)
+        except BaseException:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def stats(self):
+        with self._lock:
+            return {"threads": self.threads, "pending": self.pending, "max_pending": self.max_pending, "rejected": self.rejected}
+
+
+def _discard_result(future):
+    if not future.cancelled():
+        future.exception()
+
+
+class BoundedWsgiInstance(WsgiToAsgiInstance):
+    """
+    One request of `AsgiAdapter`: `WsgiToAsgiInstance` running the WSGI app on `executor`,
+    closing the response iterable when done and stopping when the client disconnects.
+    """
+
+    def __init__(self, wsgi_application, executor, duplicate_header_limit=100):
+        super().__init__(wsgi_application, duplicate_header_limit)
+        self.executor = executor
+        self.disconnected = False
+
+    async def __call__(self, scope, receive, send):
+        self.receive = receive
+        self.send = send
+        try:
+            await super().__call__(scope, self.receive_body, send)
+        except ClientDisconnected:
+            pass
+
+    async def receive_body(self):
+        message = await self.receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnected()
+        return message
+
+    async def wait_for_disconnect(self):
+        while (await self.receive())["type"] != "http.disconnect":
+            pass
+        self.disconnected = True
+
+    async def run_wsgi_app(self, body):
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect())
+        handled = asyncio.ensure_future(SyncToAsync(self.handle, thread_sensitive=False, executor=self.executor)(body))
+        try:
+            await asyncio.wait((handled, disconnected), return_when=asyncio.FIRST_COMPLETED)
+            if not handled.done():
+                # The client went away (e.g. closed an event stream): the thread stops at its
+                # next chunk, still counted as pending by its executor.
+                handled.add_done_callback(_discard_result)
+                return
+            handled.result()
+        except Overloaded:
+            await self.send({"type": "http.response.start", "status": 503,
+                             "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")]})
+            await self.send({"type": "http.response.body", "body": b'{"error": "Server busy, try again"}'})
+        except Exception:
+            # Sending to a client that has just gone away may fail; nobody is listening.
+            if not self.disconnected:
+                raise
+        finally:
+            disconnected.cancel()
+
+    def send_response_start(self):
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+
+    def handle(self, body):
+        """Run the WSGI app on an executor thread and send its response chunk by chunk."""
+        try:
+            environ = self.build_environ(self.scope, body)
+        except ValueError:
+            # Too many duplicate headers, answered like `WsgiToAsgiInstance` does.
+            self.sync_send({"type": "http.response.start", "status": 400, "headers": [(b"content-type", b"text/plain")]})
+            self.sync_send({"type": "http.response.body", "body": b"Bad Request: Too many duplicate headers"})
+            return
+        result = self.wsgi_application(environ, self.start_response)
+        try:
+            for chunk in result:
+                if self.disconnected:
+                    return
+                if not chunk:
+                    continue
+                self.send_response_start()
+                self.sync_send({"type": "http.response.body", "body": chunk, "more_body": True})
+            self.send_response_start()
+            self.sync_send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+class AsgiAdapter(WsgiToAsgi):
+    """
+    ASGI application running a WSGI app on bounded read and write executors.
+
+    Args:
+        wsgi_app (callable): The WSGI application, normally the Flask app.
+        read_threads (int): Threads handling GET, HEAD and OPTIONS requests.
+        write_threads (int): Threads handling every other method.
+        max_pending (int): Unfinished requests each executor accepts before answering 503.
+        on_shutdown (callable): Called once the executors have stopped at lifespan
+                                shutdown, e.g. to close the connection pool.
+    """
+
+    def __init__(self, wsgi_app, read_threads=7, write_threads=1, max_pending=256, on_shutdown=None):
+        super().__init__(wsgi_app)
+        self.reads = BoundedExecutor(read_threads, max_pending, "asgi-read")
+        self.writes = BoundedExecutor(write_threads, max_pending, "asgi-write")
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            executor = self.reads if scope["method"] in READ_METHODS else self.writes
+            await BoundedWsgiInstance(self.wsgi_application, executor, self.duplicate_header_limit)(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type '{scope['type']}'")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        """Wait for running requests, stop both executors and run `on_shutdown`."""
+        self.reads.shutdown(wait=True)
+        self.writes.shutdown(wait=True)
+        if self.on_shutdown is not None:
+            self.on_shutdown()
+
+    def stats(self):
+        return {"read": self.reads.stats(), "write": self.writes.stats()}
+
+
+def adapt(application, threads=None, on_shutdown=None, environ=os.environ):
+    """
+    Wrap a Flask app in an `AsgiAdapter` configured from ASGI_READ_THREADS,
+    ASGI_WRITE_THREADS and ASGI_MAX_PENDING.
+
+    Args:
+        application (flask.Flask): The app built by `app.create_app`.
+        threads (int): Read plus write threads when ASGI_READ_THREADS is not set;
+                       the connection pool size if None.
+        on_shutdown (callable): Passed on to `AsgiAdapter`.
+
+    Returns:
+        AsgiAdapter: The ASGI application.
+    """
+    import connection_pool  # importable once the app has put sqlite/ on sys.path
+
+    write_threads = int(environ.get("ASGI_WRITE_THREADS", 1))
+    threads = threads or connection_pool.get_pool().max_size
+    adapter = AsgiAdapter(
+        application.wsgi_app,
+        read_threads=int(environ.get("ASGI_READ_THREADS", max(1, threads - write_threads))),
+        write_threads=write_threads,
+        max_pending=int(environ.get("ASGI_MAX_PENDING", 256)),
+        on_shutdown=on_shutdown,
+    )
+    application.extensions["asgi"] = adapter
+    logger.info("ASGI adapter ready", extra=adapter.stats())
+    return adapter
+
+
+def create_asgi_app():
+    """
+    Build the Flask app (running its database checks) and wrap it with `adapt`. The
+    connection pool is closed and the log flushed at lifespan shutdown.
+
+    Returns:
+        AsgiAdapter: The ASGI application.
+    """
+    import app as app_module
+    import serve
+
+    return adapt(app_module.create_app(), on_shutdown=serve.shutdown)
+
+
+def __getattr__(name):
+    # `uvicorn asgi:app` builds the app on first access, like `app:app`.
+    if name == "app":
+        global app
+        app = create_asgi_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
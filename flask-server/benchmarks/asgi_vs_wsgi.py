@@ -0,0 +1,105 @@
+"""
+Compare the threaded WSGI server with the ASGI variant at high concurrency.
+
+The same synthetic database and the same client workload as benchmarks/load_harness.py
+(page load GETs followed by calendar and furnace edits) are run against:
+    - waitress: `--threads` threads, each handling a request from start to finish,
+    - uvicorn + asgi.py: one event loop, reads on `--threads` minus one threads and writes
+      on one dedicated writer thread.
+Each server gets its own copy of the database and is run at every concurrency level.
+The reads' p95/p99 latency under a write-heavy mix (`--edits`) shows whether slow writes
+starve the reads; 503s from the ASGI executors' bound are counted as server errors.
+
+uvicorn is optional (`pip install uvicorn`); without it only waitress is measured.
+
+Usage:
+    python benchmarks/asgi_vs_wsgi.py [--concurrency 16,64,128] [--seconds 10] [--threads 8]
+                                      [--edits 6] [--furnaces 50] [--years 5] [--json results.json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import load_harness
+import synthetic_data
+
+
+def run_server(server, template, workdir, args, levels, summary):
+    db_path = os.path.join(workdir, f"{server}.db")
+    log_path = os.path.join(workdir, f"{server}.log")
+    shutil.copyfile(template, db_path)
+    args.server = server
+    process = load_harness.start_server(db_path, load_harness.free_port(), args, log_path)
+    port = int(process.args[process.args.index("--port") + 1])
+    workload = load_harness.load_workload(db_path, summary)
+    results = []
+    log_offset = os.path.getsize(log_path)
+    try:
+        for concurrency in levels:
+            result, log_offset = load_harness.run_level(port, workload, args, concurrency, log_path, log_offset)
+            results.append(result)
+            print(f"{server:<10}{concurrency:>6}{result['throughput_rps']:>9.1f}"
+                  f"{result['read']['p50_ms']:>9.1f}{result['read']['p95_ms']:>9.1f}{result['read']['p99_ms']:>9.1f}"
+                  f"{result['write']['p95_ms'] or 0:>11.1f}{result['server_errors'] + result['connection_errors']:>8}"
+                  f"{result['lock_errors']:>7}")
+    finally:
+        load_harness.stop_server(process)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_data.add_arguments(parser)
+    parser.add_argument("--concurrency", default="16,64,128", help="comma-separated numbers of concurrent schedulers")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each concurrency level")
+    parser.add_argument("--threads", type=int, default=8, help="threads per server")
+    parser.add_argument("--bootstrap", choices=("seven", "snapshot"), default="seven")
+    parser.add_argument("--edits", type=int, default=6, help="edits per session")
+    parser.add_argument("--think", type=float, default=0, help="mean seconds a scheduler waits before each edit")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    args.workers = 1
+    levels = [int(level) for level in args.concurrency.split(",")]
+    servers = ["waitress"]
+    if importlib.util.find_spec("uvicorn") is not None:
+        servers.append("uvicorn")
+    else:
+        print("uvicorn is not installed (pip install uvicorn); measuring waitress only")
+
+    workdir = tempfile.mkdtemp(prefix="asgi_vs_wsgi_")
+    template = os.path.join(workdir, "template.db")
+    try:
+        conn = sqlite3.connect(template)
+        try:
+            summary = synthetic_data.generate_from_args(conn, args)
+        finally:
+            conn.close()
+        print(f"{summary['runs']} runs, {summary['calendar_rows']} calendar rows; {args.threads} threads, "
+              f"{args.edits} edits per session, {args.seconds:g}s per level")
+        print(f"{'server':<10}{'users':>6}{'req/s':>9}{'read p50':>9}{'read p95':>9}{'read p99':>9}"
+              f"{'write p95':>11}{'errors':>8}{'locks':>7}")
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "workload": {"bootstrap": args.bootstrap, "edits": args.edits, "think": args.think,
+                         "seconds": args.seconds, "threads": args.threads},
+            "data": {key: summary[key] for key in ("runs", "calendar_rows", "block_rows", "start", "end")},
+            "servers": {},
+        }
+        for server in servers:
+            results["servers"][server] = run_server(server, template, workdir, args, levels, summary)
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump(results, file, indent=4)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
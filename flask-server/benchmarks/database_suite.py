@@ -0,0 +1,247 @@
+"""
+Time every public operation in sqlite/database.py against synthetic data.
+
+A scratch database is generated with benchmarks/synthetic_data.py (50 furnaces x 5 years
+of runs x 4-20 blocks with down/abort events by default) and the app's database module
+is pointed at it through ORGANIZE_DB_PATH, so the operations run with the real
+connection pool, PRAGMA profile and reference cache. Each operation runs `--repeat`
+times; writes get fresh arguments every time so they never hit the same row twice.
+Reads run first, then creates and updates, then deletes.
+
+The results (with the data shape, SQLite version and PRAGMA settings) are written as
+JSON, and `--compare` prints the change against an earlier results file.
+
+Usage:
+    python benchmarks/database_suite.py [--furnaces 50] [--years 5] [--repeat 20]
+                                        [--only read_] [--json results.json] [--compare old.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+workdir = tempfile.mkdtemp(prefix="database_suite_")
+os.environ["ORGANIZE_DB_PATH"] = os.path.join(workdir, "suite.db")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite'))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import connection_pool
+import database
+import schedule_grid
+import synthetic_data
+
+
+class ErrorCounter(logging.Handler):
+    """Counts the errors database.py logs, which it reports instead of raising."""
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def consume(iterator):
+    for _ in iterator:
+        pass
+
+
+def build_operations(data, rng):
+    """
+    Returns:
+        list of tuple: (name, function, make_args) where `make_args(i)` returns the
+        positional arguments of the i-th call; only the call itself is timed.
+    """
+    furnaces = data["furnaces"]
+    recipes = data["recipes"]
+    run_ids = data["run_ids"]
+    start = date.fromisoformat(data["start"])
+    middle = start + (date.fromisoformat(data["end"]) - start) / 2
+    window = {"start": middle.isoformat(), "end": (middle + timedelta(days=90)).isoformat()}
+    blocks_of = data["blocks_of"]
+    pick_run = lambda i: run_ids[rng.randrange(len(run_ids))]
+    new_blocks = lambda name: [{"recipe_key": name, "block": block, "sequence": sequence} for block, sequence in blocks_of[recipes[0]]]
+    calendar_of = lambda recipe: [{"block": block, "sequence": sequence} for block, sequence in blocks_of[recipe]]
+    # Recipes created by the create_recipe benchmark, updated and deleted later on.
+    created_recipe_ids = []
+
+    def create_furnace_and_calendar(name, day, recipe):
+        database.create_furnace({"furnace_name": name, "recipe_key": recipe, "start_time": day})
+        database.create_calendar(calendar_of(recipe), day, name)
+
+    def uncached_schedule_grid():
+        schedule_grid.reset_cache()
+        return database.read_schedule_grid(window["start"], window["end"])
+
+    def created_recipe(i):
+        recipe = database.create_recipe({"recipe_name": f"Suite recipe {i}", "time": 10.0})
+        created_recipe_ids.append(recipe["recipe_id"])
+        return recipe
+
+    operations = [
+        # Reads
+        ("read_recipes (cached)", database.read_recipes, lambda i: ()),
+        ("read_recipes", database.read_recipes.__wrapped__, lambda i: ()),
+        ("read_colors", database.read_colors.__wrapped__, lambda i: ()),
+        ("read_down", database.read_down.__wrapped__, lambda i: ()),
+        ("read_furnace_recipes", database.read_furnace_recipes.__wrapped__, lambda i: ()),
+        ("read_blocks", database.read_blocks, lambda i: ()),
+        ("read_calendar", database.read_calendar, lambda i: ()),
+        ("read_furnaces", database.read_furnaces, lambda i: ()),
+        ("iter_table calendar", lambda: consume(database.iter_table("calendar")), lambda i: ()),
+        ("read_calendar_window 90 days", lambda: database.read_calendar_window(**window), lambda i: ()),
+        ("read_calendar_window page of 500", lambda: database.read_calendar_window(limit=500), lambda i: ()),
+        ("read_calendar_window one furnace", lambda name: database.read_calendar_window(furnace_name=name, **window),
+         lambda i: (furnaces[i % len(furnaces)],)),
+        ("read_furnaces_window 90 days", lambda: database.read_furnaces_window(**window), lambda i: ()),
+        ("read_recipe_by_id", database.read_recipe_by_id, lambda i: (i % len(recipes) + 1,)),
+        ("read_furnace_by_id", database.read_furnace_by_id, lambda i: (pick_run(i),)),
+        ("read_snapshot", database.read_snapshot, lambda i: ()),
+        ("read_snapshot windowed", lambda: database.read_snapshot(calendar_window=window), lambda i: ()),
+        ("read_table_versions", database.read_table_versions, lambda i: (("calendar_table", "furnaces_table"),)),
+        ("read_schedule_grid 90 days (cached)", lambda: database.read_schedule_grid(window["start"], window["end"]), lambda i: ()),
+        ("read_schedule_grid 90 days", uncached_schedule_grid, lambda i: ()),
+        ("find_free_slots", database.find_free_slots, lambda i: (recipes[i % len(recipes)], None, start.isoformat())),
+        ("query_intervals one day", database.query_intervals, lambda i: ((middle + timedelta(days=i)).isoformat(),)),
+        ("query_intervals 7 days Down", lambda day: database.query_intervals(day, (date.fromisoformat(day) + timedelta(days=6)).isoformat(), state="Down"),
+         lambda i: ((middle + timedelta(days=i)).isoformat(),)),
+        ("find_conflicts", database.find_conflicts, lambda i: ()),
+        ("check_run_conflicts", database.check_run_conflicts,
+         lambda i: ({"furnace_name": furnaces[i % len(furnaces)], "recipe_key": recipes[i % len(recipes)],
+                     "start_time": (middle + timedelta(days=i)).isoformat()},)),
+        # Creates
+        ("create_color", database.create_color, lambda i: ({"block_name": f"Suite block {i}", "color": "Grey"},)),
+        ("create_down", database.create_down, lambda i: ({"down_name": f"Suite block {i}"},)),
+        ("create_recipe", created_recipe, lambda i: (i,)),
+        ("create_block", database.create_block, lambda i: (new_blocks(f"Suite recipe {i}"),)),
+        ("create_furnace_recipe", database.create_furnace_recipe,
+         lambda i: ({"furnace_name": f"Suite furnace {i}", "recipe_key": recipes[i % len(recipes)]},)),
+        ("create_furnace", database.create_furnace,
+         lambda i: ({"furnace_name": f"Suite furnace {i}", "recipe_key": recipes[0], "start_time": None},)),
+        ("create_empty_calendar", database.create_empty_calendar,
+         lambda i: (calendar_of(recipes[0]), {"furnace_name": f"Suite furnace {i}"})),
+        ("create_furnace + create_calendar", create_furnace_and_calendar,
+         lambda i: (f"Suite furnace {i}", (middle + timedelta(days=i)).isoformat(), recipes[i % len(recipes)])),
+        ("create_furnaces_bulk 10 runs", database.create_furnaces_bulk,
+         lambda i: ([({"furnace_name": f"Bulk furnace {i}", "recipe_key": recipes[j % len(recipes)],
+                       "start_time": (middle + timedelta(days=j)).isoformat()}, calendar_of(recipes[j % len(recipes)]))
+                     for j in range(10)],)),
+        # Updates
+        ("update_calendar addremove", database.update_calendar, lambda i: (rng.choice([-1, 1, 2]), "Running", pick_run(i), "addremove")),
+        ("update_calendar Down", database.update_calendar, lambda i: (rng.randrange(10), "Running", pick_run(i), "Down (Power)")),
+        ("update_calendar abort", database.update_calendar, lambda i: (rng.randrange(10), "Running", pick_run(i), "abort")),
+        ("update_recipe", database.update_recipe,
+         lambda i: ({"recipe_id": created_recipe_ids[i % len(created_recipe_ids)], "recipe_name": f"Suite recipe {i % len(created_recipe_ids)}", "time": 11.0},)),
+        ("update_blocks", database.update_blocks,
+         lambda i: ({"recipe_name": f"Suite recipe {i}"}, new_blocks(f"Suite recipe {i}"))),
+        ("update_furnace_recipe", database.update_furnace_recipe,
+         lambda i: ({"furnace": f"Suite furnace {i}", "recipe": recipes[(i + 1) % len(recipes)]}, f"Suite furnace {i}")),
+        ("update_furnace", database.update_furnace,
+         lambda i: ({"primary_id": pick_run(i), "furnace_name": furnaces[i % len(furnaces)], "recipe_key": recipes[i % len(recipes)],
+                     "start_time": (middle + timedelta(days=i)).isoformat()},)),
+        # Deletes
+        ("delete_furnace", database.delete_furnace, lambda i: (run_ids.pop(),)),
+        ("delete_recipe", database.delete_recipe, lambda i: (created_recipe_ids.pop(),)),
+        ("delete_furnace_recipe", database.delete_furnace_recipe, lambda i: (f"Suite furnace {i}",)),
+    ]
+    return operations
+
+
+def time_operation(function, make_args, repeat, errors):
+    errors.count = 0
+    timings = []
+    for i in range(repeat):
+        args = make_args(i)
+        start = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "calls": repeat,
+        "min_ms": round(timings[0] * 1000, 4),
+        "median_ms": round(statistics.median(timings) * 1000, 4),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "errors": errors.count,
+    }
+
+
+def print_comparison(results, previous):
+    before = previous["operations"]
+    print(f"\n{'operation':<36}{'before ms':>12}{'after ms':>12}{'change':>10}")
+    for name, result in results["operations"].items():
+        if name not in before:
+            continue
+        old, new = before[name]["median_ms"], result["median_ms"]
+        change = f"{(new - old) / old:+.0%}" if old else "n/a"
+        print(f"{name:<36}{old:>12.3f}{new:>12.3f}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_data.add_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=20, help="calls per operation")
+    parser.add_argument("--only", help="only run operations whose name contains this text")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    try:
+        conn = sqlite3.connect(os.environ["ORGANIZE_DB_PATH"])
+        data = synthetic_data.generate_from_args(conn, args)
+        data["run_ids"] = [row[0] for row in conn.execute("SELECT primary_id FROM furnaces_table ORDER BY primary_id")]
+        data["blocks_of"] = {}
+        for recipe, block, sequence in conn.execute("SELECT recipe_key, block, sequence FROM blockname_table ORDER BY rowid"):
+            data["blocks_of"].setdefault(recipe, []).append((block, sequence))
+        conn.close()
+        settings = connection_pool.configure_database()
+        database.migrate_database()
+
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "pragmas": settings,
+            "data": dict(
+                {key: data[key] for key in ("runs", "calendar_rows", "block_rows", "start", "end")},
+                furnaces=args.furnaces, years=args.years, min_blocks=args.min_blocks, max_blocks=args.max_blocks,
+                recipes=args.recipes, event_rate=args.event_rate, seed=args.seed,
+            ),
+            "operations": {},
+        }
+        print(f"{data['runs']} runs, {data['calendar_rows']} calendar rows, {args.repeat} calls per operation")
+        print(f"{'operation':<36}{'median ms':>12}{'p95 ms':>10}{'min ms':>10}")
+        rng = random.Random(args.seed)
+        errors = ErrorCounter()
+        logging.getLogger("database").addHandler(errors)
+        logging.getLogger("database").propagate = False
+        for name, function, make_args in build_operations(data, rng):
+            if args.only and args.only not in name:
+                continue
+            result = time_operation(function, make_args, args.repeat, errors)
+            results["operations"][name] = result
+            print(f"{name:<36}{result['median_ms']:>12.3f}{result['p95_ms']:>10.3f}{result['min_ms']:>10.3f}"
+                  + (f"  ({result['errors']} errors logged)" if result["errors"] else ""))
+
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump(results, file, indent=4)
+        if args.compare:
+            with open(args.compare) as file:
+                print_comparison(results, json.load(file))
+    finally:
+        connection_pool.reset_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Find how many concurrent schedulers the server handles before it falls over.
+
+A scratch database is generated with benchmarks/synthetic_data.py, then the app is
+started with serve.py (waitress, uvicorn, or gunicorn with `--server gunicorn --workers N`) on a
+free localhost port in its own process, exactly as it is served in production. Every simulated scheduler is a thread with its own keep-alive
+connection that replays what one user of the client does, over and over:
+    - loads the page: the seven GETs of the original client (recipes, furnaceRecipes,
+      furnaces, blocks, colors, calendar, downreasons), or one GET /api/snapshot with
+      `--bootstrap snapshot`,
+    - makes `--edits` edits, alternating PUT /api/calendar/update (shift a run, or mark a
+      down or abort day) and PUT /api/furnaces/update (fill an empty row, which adds a few
+      calendar rows like the client's popover does), waiting `--think` seconds before each.
+
+Concurrency is raised step by step (`--concurrency 1,2,4,8,16,32` by default); each
+level runs for `--seconds`. For every level the harness reports throughput, p50/p95/p99
+latency of reads and writes, HTTP errors (5xx and connection failures) and lock errors.
+database.py logs failed writes instead of raising, so a 'database is locked' write still
+answers 200; lock errors are therefore counted from the server's log, which is written
+as JSON to a file in the scratch directory.
+
+Usage:
+    python benchmarks/load_harness.py [--concurrency 1,2,4,8,16,32] [--seconds 10]
+                                      [--server waitress] [--workers 1] [--threads 8]
+                                      [--bootstrap seven] [--edits 2] [--think 0]
+                                      [--furnaces 50] [--years 5] [--json results.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import synthetic_data
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+PREFIX = "/api/v0-1"
+SEVEN_GETS = ["recipes", "furnaceRecipes", "furnaces", "blocks", "colors", "calendar", "downreasons"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, port, args, log_path):
+    """
+    Start serve.py in a child process and wait until it answers.
+
+    Returns:
+        subprocess.Popen: The server process; its log (JSON lines) goes to `log_path`.
+
+    Raises:
+        RuntimeError: If the server exits or does not answer within 30 seconds.
+    """
+    env = dict(os.environ, ORGANIZE_DB_PATH=db_path, LOG_LEVEL="WARNING", LOG_FORMAT="json")
+    log = open(log_path, 'ab')
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port), "--server", args.server,
+         "--workers", str(args.workers), "--threads", str(args.threads)],
+        cwd=SERVER_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    log.close()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}, see {log_path}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", PREFIX + "/health-check")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return server
+        except OSError:
+            time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError(f"Server did not answer within 30 seconds, see {log_path}")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+class Scheduler(threading.Thread):
+    """One simulated user: loads the schedule, makes a few edits, and starts over."""
+
+    def __init__(self, port, workload, args, seed, deadline):
+        super().__init__(daemon=True)
+        self.port = port
+        self.workload = workload
+        self.args = args
+        self.rng = random.Random(seed)
+        self.deadline = deadline
+        self.conn = None
+        self.samples = []   # (kind, seconds, status); status is None for connection errors
+        self.sessions = 0
+
+    def request(self, kind, method, path, body=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=60)
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, PREFIX + path, body=None if body is None else json.dumps(body), headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            status = None
+        self.samples.append((kind, time.perf_counter() - start, status))
+
+    def calendar_edit(self):
+        run_id = self.rng.choice(self.workload["run_ids"])
+        roll = self.rng.random()
+        if roll < 0.7:
+            body = [self.rng.choice([-1, 1]), "Running", run_id, "addremove"]
+        elif roll < 0.9:
+            body = [self.rng.randrange(10), "Running", run_id, self.rng.choice(synthetic_data.DOWN_REASONS)]
+        else:
+            body = [self.rng.randrange(10), "Running", run_id, "abort"]
+        self.request("write", "PUT", "/api/calendar/update", body)
+
+    def furnace_edit(self):
+        furnace, run_id = self.rng.choice(self.workload["first_runs"])
+        recipe = self.rng.choice(self.workload["recipes"])
+        start = self.workload["start"] + timedelta(days=self.rng.randrange(self.workload["days"]))
+        blocks = ["Starting", "Preparing", "Running", "Finishing"][:self.rng.choice([3, 4])]
+        items = [{"furnace_id": -1, "block": block, "sequence": float(i)} for i, block in enumerate(blocks)]
+        body = [{"primary_id": run_id, "furnace_name": furnace, "recipe_key": recipe, "start_time": start.isoformat()}, items]
+        self.request("write", "PUT", "/api/furnaces/update", body)
+
+    def run(self):
+        try:
+            while time.monotonic() < self.deadline:
+                if self.args.bootstrap == "snapshot":
+                    self.request("read", "GET", "/api/snapshot")
+                else:
+                    for name in SEVEN_GETS:
+                        self.request("read", "GET", "/api/" + name)
+                for i in range(self.args.edits):
+                    if time.monotonic() >= self.deadline:
+                        break
+                    if self.args.think:
+                        time.sleep(self.rng.uniform(0, 2 * self.args.think))
+                    if i % 2 == 0:
+                        self.calendar_edit()
+                    else:
+                        self.furnace_edit()
+                self.sessions += 1
+        finally:
+            if self.conn is not None:
+                self.conn.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latency_summary(seconds):
+    seconds = sorted(seconds)
+    summary = {"requests": len(seconds)}
+    for name, fraction in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+        value = percentile(seconds, fraction)
+        summary[name] = None if value is None else round(value * 1000, 2)
+    return summary
+
+
+def count_lock_errors(log_path, offset):
+    """
+    Returns:
+        tuple: (lock errors, other errors) logged since `offset`, and the new offset.
+    """
+    locks = others = 0
+    with open(log_path, 'rb') as log:
+        log.seek(offset)
+        for line in log:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("level") not in ("ERROR", "CRITICAL"):
+                continue
+            if "locked" in entry.get("message", "") or "locked" in entry.get("exception", ""):
+                locks += 1
+            else:
+                others += 1
+        return locks, others, log.tell()
+
+
+def run_level(port, workload, args, concurrency, log_path, log_offset):
+    deadline = time.monotonic() + args.seconds
+    schedulers = [Scheduler(port, workload, args, args.seed * 1000 + i, deadline) for i in range(concurrency)]
+    start = time.perf_counter()
+    for scheduler in schedulers:
+        scheduler.start()
+    for scheduler in schedulers:
+        scheduler.join()
+    elapsed = time.perf_counter() - start
+    # The server logs through a background thread; give it a moment to flush.
+    time.sleep(0.5)
+    lock_errors, other_errors, log_offset = count_lock_errors(log_path, log_offset)
+
+    samples = [sample for scheduler in schedulers for sample in scheduler.samples]
+    writes = sum(1 for kind, _, _ in samples if kind == "write")
+    result = {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "sessions": sum(scheduler.sessions for scheduler in schedulers),
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "all": latency_summary(seconds for _, seconds, _ in samples),
+        "read": latency_summary(seconds for kind, seconds, _ in samples if kind == "read"),
+        "write": latency_summary(seconds for kind, seconds, _ in samples if kind == "write"),
+        "server_errors": sum(1 for _, _, status in samples if status is not None and status >= 500),
+        "connection_errors": sum(1 for _, _, status in samples if status is None),
+        "lock_errors": lock_errors,
+        "other_logged_errors": other_errors,
+    }
+    result["error_rate"] = round((result["server_errors"] + result["connection_errors"]) / max(len(samples), 1), 4)
+    result["lock_error_rate"] = round(lock_errors / max(writes, 1), 4)
+    return result, log_offset
+
+
+def load_workload(db_path, summary):
+    conn = sqlite3.connect(db_path)
+    try:
+        run_ids = [row[0] for row in conn.execute("SELECT primary_id FROM furnaces_table")]
+        first_runs = conn.execute("SELECT furnace_name, MIN(primary_id) FROM furnaces_table GROUP BY furnace_name").fetchall()
+    finally:
+        conn.close()
+    start = date.fromisoformat(summary["start"])
+    return {
+        "run_ids": run_ids,
+        "first_runs": first_runs,
+        "recipes": summary["recipes"],
+        "start": start,
+        "days": (date.fromisoformat(summary["end"]) - start).days,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    synthetic_data.add_arguments(parser)
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32", help="comma-separated numbers of concurrent schedulers")
+    parser.add_argument("--seconds", type=float, default=10, help="duration of each concurrency level")
+    parser.add_argument("--server", choices=("waitress", "gunicorn", "uvicorn"), default="waitress")
+    parser.add_argument("--workers", type=int, default=1, help="server processes (gunicorn only)")
+    parser.add_argument("--threads", type=int, default=8, help="server threads per process")
+    parser.add_argument("--bootstrap", choices=("seven", "snapshot"), default="seven",
+                        help="load the page with the seven GETs of the original client or one GET /api/snapshot")
+    parser.add_argument("--edits", type=int, default=2, help="edits per session, alternating calendar and furnace updates")
+    parser.add_argument("--think", type=float, default=0, help="mean seconds a scheduler waits before each edit")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database and server log")
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    workdir = tempfile.mkdtemp(prefix="load_harness_")
+    db_path = os.path.join(workdir, "load.db")
+    log_path = os.path.join(workdir, "server.log")
+    server = None
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            summary = synthetic_data.generate_from_args(conn, args)
+        finally:
+            conn.close()
+        workload = load_workload(db_path, summary)
+        port = free_port()
+        server = start_server(db_path, port, args, log_path)
+        log_offset = os.path.getsize(log_path)
+
+        results = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "server": {"name": args.server, "workers": args.workers, "threads": args.threads},
+            "workload": {"bootstrap": args.bootstrap, "edits": args.edits, "think": args.think, "seconds": args.seconds},
+            "data": dict(
+                {key: summary[key] for key in ("runs", "calendar_rows", "block_rows", "start", "end")},
+                furnaces=args.furnaces, years=args.years, seed=args.seed,
+            ),
+            "levels": [],
+        }
+        print(f"{summary['runs']} runs, {summary['calendar_rows']} calendar rows; {args.server} with {args.workers} "
+              f"process(es) x {args.threads} threads on port {port}; {args.seconds:g}s per level")
+        print(f"{'users':>6}{'req/s':>9}{'sessions':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+              f"{'write p95':>11}{'errors':>8}{'locks':>7}")
+        for concurrency in levels:
+            result, log_offset = run_level(port, workload, args, concurrency, log_path, log_offset)
+            results["levels"].append(result)
+            print(f"{concurrency:>6}{result['throughput_rps']:>9.1f}{result['sessions']:>10}"
+                  f"{result['all']['p50_ms']:>9.1f}{result['all']['p95_ms']:>9.1f}{result['all']['p99_ms']:>9.1f}"
+                  f"{result['write']['p95_ms'] or 0:>11.1f}"
+                  f"{result['server_errors'] + result['connection_errors']:>8}{result['lock_errors']:>7}")
+            if server.poll() is not None:
+                print(f"Server exited with code {server.returncode}, see {log_path}")
+                break
+
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump(results, file, indent=4)
+    finally:
+        if server is not None:
+            stop_server(server)
+        if args.keep:
+            print(f"Scratch files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
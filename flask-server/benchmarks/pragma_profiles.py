@@ -0,0 +1,131 @@
+"""
+Compare read/write throughput of every PRAGMA profile in 'config_files/database.json'.
+
+Each profile runs against its own copy of 'sqlite/recipe_table.db' (the original file is
+never modified): reader threads repeatedly load calendar_table and furnaces_table the way
+GET /api/calendar and GET /api/furnaces do, while writer threads apply small calendar
+updates the way PUT /api/calendar/update does.
+
+Usage:
+    python benchmarks/pragma_profiles.py [--seconds 5] [--readers 4] [--writers 1] [--json out.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite'))
+import db_config
+
+SOURCE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite', 'recipe_table.db')
+
+
+def reader(path, settings, stop, counts):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    db_config.apply_pragmas(conn, settings)
+    try:
+        while not stop.is_set():
+            try:
+                conn.execute("SELECT * FROM calendar_table").fetchall()
+                conn.execute("SELECT * FROM furnaces_table").fetchall()
+                counts["reads"] += 1
+            except sqlite3.OperationalError:
+                counts["read_errors"] += 1
+    finally:
+        conn.close()
+
+
+def writer(path, settings, stop, counts):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    db_config.apply_pragmas(conn, settings)
+    furnace_ids = [row[0] for row in conn.execute("SELECT DISTINCT furnace_id FROM calendar_table")] or ["0"]
+    i = 0
+    try:
+        while not stop.is_set():
+            furnace_id = furnace_ids[i % len(furnace_ids)]
+            delta = 1 if i % 2 == 0 else -1
+            i += 1
+            try:
+                conn.execute("UPDATE calendar_table SET end_time = end_time + ? WHERE furnace_id = ?", (delta, furnace_id))
+                conn.commit()
+                counts["writes"] += 1
+            except sqlite3.OperationalError:
+                conn.rollback()
+                counts["write_errors"] += 1
+    finally:
+        conn.close()
+
+
+def run_profile(name, settings, seconds, readers, writers):
+    """
+    Run the mixed workload for one profile.
+
+    Returns:
+        dict: Throughput (operations per second) and error counts for the profile.
+    """
+    workdir = tempfile.mkdtemp(prefix=f"pragma_{name}_")
+    path = os.path.join(workdir, "recipe_table.db")
+    shutil.copy(SOURCE_DB, path)
+    try:
+        stop = threading.Event()
+        reader_counts = [{"reads": 0, "read_errors": 0} for _ in range(readers)]
+        writer_counts = [{"writes": 0, "write_errors": 0} for _ in range(writers)]
+        # journal_mode is persistent, so set it once before the workers connect.
+        setup = sqlite3.connect(path)
+        db_config.apply_pragmas(setup, settings)
+        setup.close()
+        threads = [threading.Thread(target=reader, args=(path, settings, stop, c)) for c in reader_counts]
+        threads += [threading.Thread(target=writer, args=(path, settings, stop, c)) for c in writer_counts]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    reads = sum(c["reads"] for c in reader_counts)
+    writes = sum(c["writes"] for c in writer_counts)
+    return {
+        "profile": name,
+        "settings": settings,
+        "reads_per_sec": round(reads / elapsed, 1),
+        "writes_per_sec": round(writes / elapsed, 1),
+        "read_errors": sum(c["read_errors"] for c in reader_counts),
+        "write_errors": sum(c["write_errors"] for c in writer_counts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0, help="duration of each profile run")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent reader threads")
+    parser.add_argument("--writers", type=int, default=1, help="concurrent writer threads")
+    parser.add_argument("--profile", action="append", help="only run the named profile (repeatable)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    _, profiles = db_config.load_profiles()
+    names = args.profile or list(profiles)
+    results = []
+    print(f"{'profile':<16}{'reads/s':>12}{'writes/s':>12}{'read err':>10}{'write err':>11}")
+    for name in names:
+        settings = db_config.load_settings(profile=name, environ={})
+        result = run_profile(name, settings, args.seconds, args.readers, args.writers)
+        results.append(result)
+        print(f"{name:<16}{result['reads_per_sec']:>12}{result['writes_per_sec']:>12}"
+              f"{result['read_errors']:>10}{result['write_errors']:>11}")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
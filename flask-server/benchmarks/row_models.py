@@ -0,0 +1,115 @@
+"""
+Compare building calendar rows as hand-filled dicts from sqlite3.Row (the old read_*
+code) with building `models.CalendarEntry` records, per 100k rows.
+
+Each variant reads the same in-memory calendar_table. Time is the best of `--repeat`
+runs; allocations are the number of memory blocks and bytes still held by the result
+list, measured with tracemalloc. "to_json" adds the conversion done before a response
+is encoded.
+
+Usage:
+    python benchmarks/row_models.py [--rows 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite'))
+import migrate
+import models
+
+
+def legacy_dicts(conn):
+    """The body of read_calendar before the models were introduced."""
+    cur = conn.cursor()
+    cur.row_factory = sqlite3.Row
+    cur.execute("SELECT * FROM calendar_table")
+    rows = cur.fetchall()
+    calendar_items = []
+    for i in rows:
+        calendar = {}
+        calendar["furnace_id"] = i["furnace_id"]
+        calendar["block"] = i["block"]
+        calendar["sequence"] = i["sequence"]
+        calendar["end_time"] = i["end_time"]
+        calendar_items.append(calendar)
+    return calendar_items
+
+
+def python_row_factory(conn):
+    """Records built by a per-row Python row_factory callback."""
+    cur = conn.cursor()
+    cur.row_factory = lambda cursor, row: models.CalendarEntry(*row)
+    cur.execute(models.QUERIES[models.CalendarEntry])
+    return cur.fetchall()
+
+
+def model_records(conn):
+    """What read_calendar does now."""
+    return models.fetch_all(conn.cursor(), models.CalendarEntry)
+
+
+def model_records_to_json(conn):
+    return models.to_json(model_records(conn))
+
+
+VARIANTS = [
+    ("sqlite3.Row -> dict", legacy_dicts),
+    ("row_factory lambda", python_row_factory),
+    ("models.fetch_all", model_records),
+    ("fetch_all + to_json", model_records_to_json),
+]
+
+
+def build_database(rows):
+    conn = sqlite3.connect(":memory:")
+    migrate.migrate(conn)
+    blocks = ["Starting", "Preparing", "Running", "Finishing"]
+    conn.executemany(
+        "INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)",
+        ((str(i // 40), blocks[i % 4], float(i % 40), 40.0) for i in range(rows)),
+    )
+    conn.commit()
+    return conn
+
+
+def measure(conn, function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(conn)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = function(conn)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    del result
+    return best, blocks, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="calendar rows to read")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per variant")
+    args = parser.parse_args()
+
+    conn = build_database(args.rows)
+    scale = 100000 / args.rows
+    print(f"{args.rows} rows, figures per 100k rows")
+    print(f"{'variant':<24}{'ms':>10}{'blocks':>12}{'MB held':>10}")
+    for name, function in VARIANTS:
+        seconds, blocks, size = measure(conn, function, args.repeat)
+        print(f"{name:<24}{seconds * 1000 * scale:>10.1f}{blocks * scale:>12.0f}{size * scale / 1e6:>10.1f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Fill a database with a synthetic, realistically shaped schedule.
+
+The generated data follows what the client writes:
+    - recipes with 4 to 20 blocks ('Starting', 'Preparing', 'Running', 'Finishing' plus
+      extra 'Stage N' blocks for long recipes), each with a color,
+    - one furnace_recipe_table entry per furnace,
+    - back-to-back runs on every furnace over the requested number of years, each run
+      copying its recipe's blocks into calendar_table with the recipe length as end_time,
+    - random down and abort events, stored like update_calendar stores them: an extra
+      calendar row whose sequence is the day of the event.
+
+Usage:
+    python benchmarks/synthetic_data.py out.db [--furnaces 50] [--years 5] [--min-blocks 4] [--max-blocks 20]
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite'))
+import migrate
+
+STANDARD_COLORS = [
+    ("Starting", "Yellow"),
+    ("Preparing", "Orange"),
+    ("Running", "Green"),
+    ("Finishing", "Blue"),
+    ("Down (Power)", "Purple"),
+    ("Down (Maintenance)", "Brown"),
+    ("Aborted", "Red"),
+]
+DOWN_REASONS = ["Down (Power)", "Down (Maintenance)"]
+
+
+def recipe_blocks(count):
+    """Block names of a recipe with `count` blocks, in order."""
+    if count <= 4:
+        return ["Starting", "Preparing", "Running", "Finishing"][:count]
+    return ["Starting", "Preparing"] + [f"Stage {i}" for i in range(1, count - 3)] + ["Running", "Finishing"]
+
+
+def generate(conn, furnaces=50, years=5, min_blocks=4, max_blocks=20, recipes=20, event_rate=0.15,
+             start=date(2021, 1, 1), seed=1):
+    """
+    Migrate `conn` to the current schema and fill it with synthetic data.
+
+    Args:
+        conn (sqlite3.Connection): Connection to an empty database.
+        furnaces (int): Number of furnaces, each running back-to-back runs.
+        years (int): Length of the schedule, starting at `start`.
+        min_blocks (int): Fewest blocks in a recipe.
+        max_blocks (int): Most blocks in a recipe.
+        recipes (int): Number of recipes.
+        event_rate (float): Chance that a run gets a down event; a quarter of those
+                            runs are aborted too.
+        start (date): Start date of the first runs.
+        seed (int): Seed of the random generator, so runs are reproducible.
+
+    Returns:
+        dict: Row counts and the names of the generated furnaces and recipes.
+    """
+    rng = random.Random(seed)
+    migrate.migrate(conn)
+    longest = recipe_blocks(max_blocks)
+    colors = STANDARD_COLORS + [(name, f"#{rng.randrange(0x1000000):06x}") for name in longest if name.startswith("Stage")]
+    conn.executemany("INSERT OR IGNORE INTO color_table (block_name, color) VALUES (?, ?)", colors)
+    conn.executemany("INSERT INTO down_table (down_name) VALUES (?)", [(name,) for name in DOWN_REASONS])
+
+    recipe_specs = {}
+    for i in range(recipes):
+        name = f"Recipe {i + 1}"
+        blocks = recipe_blocks(rng.randint(min_blocks, max_blocks))
+        # Each block lasts 1-3 days; the recipe is as long as its blocks.
+        sequences = []
+        day = 0.0
+        for _ in blocks:
+            sequences.append(day)
+            day += rng.randint(1, 3)
+        recipe_specs[name] = (day, list(zip(blocks, sequences)))
+        conn.execute("INSERT INTO recipe_table (recipe_name, time) VALUES (?, ?)", (name, day))
+        conn.executemany(
+            "INSERT INTO blockname_table (recipe_key, block, sequence) VALUES (?, ?, ?)",
+            [(name, block, sequence) for block, sequence in zip(blocks, sequences)],
+        )
+
+    furnace_names = [f"Furnace {i + 1:02d}" for i in range(furnaces)]
+    recipe_names = list(recipe_specs)
+    conn.executemany(
+        "INSERT INTO furnace_recipe_table (furnace, recipe) VALUES (?, ?)",
+        [(name, rng.choice(recipe_names)) for name in furnace_names],
+    )
+
+    end = start + timedelta(days=365 * years)
+    calendar_rows = []
+    runs = 0
+    for furnace in furnace_names:
+        # Runs mostly use the furnace's own recipe, sometimes another one.
+        own = conn.execute("SELECT recipe FROM furnace_recipe_table WHERE furnace = ?", (furnace,)).fetchone()[0]
+        day = start + timedelta(days=rng.randint(0, 6))
+        while day < end:
+            recipe = own if rng.random() < 0.8 else rng.choice(recipe_names)
+            time, blocks = recipe_specs[recipe]
+            cur = conn.execute(
+                "INSERT INTO furnaces_table (furnace_name, start_time, recipe_key) VALUES (?, ?, ?)",
+                (furnace, day.isoformat(), recipe),
+            )
+            run_id = str(cur.lastrowid)
+            runs += 1
+            calendar_rows.extend((run_id, block, sequence, time) for block, sequence in blocks)
+            if rng.random() < event_rate:
+                calendar_rows.append((run_id, rng.choice(DOWN_REASONS), float(rng.randrange(int(time))), time))
+                if rng.random() < 0.25:
+                    calendar_rows.append((run_id, "Aborted", float(rng.randrange(int(time))), time))
+            day += timedelta(days=int(time) + rng.randint(0, 3))
+    conn.executemany(
+        "INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)",
+        calendar_rows,
+    )
+    # The generated rows are the starting state, not changes to sync: empty the change log.
+    conn.execute("DELETE FROM change_log")
+    conn.execute("UPDATE change_log_floor SET floor = (SELECT seq FROM sqlite_sequence WHERE name = 'change_log')")
+    conn.commit()
+    return {
+        "furnaces": furnace_names,
+        "recipes": recipe_names,
+        "runs": runs,
+        "calendar_rows": len(calendar_rows),
+        "block_rows": conn.execute("SELECT COUNT(*) FROM blockname_table").fetchone()[0],
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+    }
+
+
+def add_arguments(parser):
+    """Add the data-shape options shared by the scripts that generate data."""
+    parser.add_argument("--furnaces", type=int, default=50, help="number of furnaces")
+    parser.add_argument("--years", type=int, default=5, help="years of back-to-back runs per furnace")
+    parser.add_argument("--min-blocks", type=int, default=4, help="fewest blocks per recipe")
+    parser.add_argument("--max-blocks", type=int, default=20, help="most blocks per recipe")
+    parser.add_argument("--recipes", type=int, default=20, help="number of recipes")
+    parser.add_argument("--event-rate", type=float, default=0.15, help="chance of a down event per run")
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def generate_from_args(conn, args):
+    return generate(conn, furnaces=args.furnaces, years=args.years, min_blocks=args.min_blocks,
+                    max_blocks=args.max_blocks, recipes=args.recipes, event_rate=args.event_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="database file to create")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} already exists")
+    conn = sqlite3.connect(args.path)
+    try:
+        summary = generate_from_args(conn, args)
+    finally:
+        conn.close()
+    print(f"{len(summary['furnaces'])} furnaces, {len(summary['recipes'])} recipes, {summary['runs']} runs, "
+          f"{summary['calendar_rows']} calendar rows from {summary['start']} to {summary['end']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark the "addremove" branch of database.update_calendar against the row-by-row
+loop it replaced, and check that both leave calendar_table in the same state.
+
+A scratch database is filled with furnace runs of `--blocks` blocks each (with repeated
+block names, like runs that were downed or aborted more than once). Every furnace is
+shifted once by each implementation on identical copies of that database.
+
+Usage:
+    python benchmarks/update_calendar_shift.py [--furnaces 50] [--blocks 500] [--repeated 0.2] [--drop-index]
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+workdir = tempfile.mkdtemp(prefix="calendar_shift_")
+os.environ["ORGANIZE_DB_PATH"] = os.path.join(workdir, "set_based.db")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sqlite'))
+import connection_pool
+import database
+import db_config
+import migrate
+
+BLOCK_NAMES = ["Starting", "Preparing", "Running", "Finishing", "Down (Power)", "Down (Maintenance)", "Aborted"]
+
+
+def legacy_shift(conn, number, state, id):
+    """The original row-by-row "addremove" loop, kept here as the reference behaviour."""
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM calendar_table WHERE furnace_id = ? ORDER BY rowid", (id,))
+    rows = cur.fetchall()
+    updated = False
+    for row in rows:
+        block = row[1]
+        if not updated:
+            if block == state:
+                cur.execute("UPDATE calendar_table SET end_time = ? WHERE block = ? AND furnace_id = ?", (row[3] + int(number), state, id))
+                updated = True
+            else:
+                cur.execute("UPDATE calendar_table SET end_time = ? WHERE block = ? AND furnace_id = ?", (row[3] + int(number), row[1], id))
+        else:
+            cur.execute("UPDATE calendar_table SET sequence = ?,  end_time = ? WHERE block = ? AND furnace_id = ?", (int(number) + row[2], row[3] + int(number), row[1], id))
+    conn.commit()
+
+
+def build_database(path, furnaces, blocks, repeated, drop_index, rng):
+    conn = sqlite3.connect(path)
+    migrate.migrate(conn)
+    if drop_index:
+        conn.execute("DROP INDEX idx_calendar_furnace_block")
+    rows = []
+    for furnace_id in range(1, furnaces + 1):
+        end_time = float(blocks * 2)
+        for sequence in range(blocks):
+            # Mostly unique names so runs really have hundreds of distinct blocks, plus some
+            # repeated standard names to exercise the duplicate-name behaviour.
+            name = rng.choice(BLOCK_NAMES) if rng.random() < repeated else f"Block {sequence}"
+            rows.append((str(furnace_id), name, float(sequence * 2), end_time))
+    conn.executemany("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT rowid, furnace_id, block, sequence, end_time FROM calendar_table ORDER BY rowid").fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--furnaces", type=int, default=50, help="number of furnace runs to shift")
+    parser.add_argument("--blocks", type=int, default=500, help="calendar blocks per run")
+    parser.add_argument("--repeated", type=float, default=0.2,
+                        help="fraction of blocks that reuse a standard block name")
+    parser.add_argument("--drop-index", action="store_true",
+                        help="drop the calendar_table (furnace_id, block) index, as before migration 0002")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    set_based_path = os.environ["ORGANIZE_DB_PATH"]
+    legacy_path = os.path.join(workdir, "legacy.db")
+    try:
+        build_database(set_based_path, args.furnaces, args.blocks, args.repeated, args.drop_index, rng)
+        shutil.copy(set_based_path, legacy_path)
+        states = {fid: rng.choice(BLOCK_NAMES + ["Block 3", "Missing"]) for fid in range(1, args.furnaces + 1)}
+        numbers = {fid: rng.choice([-3, -1, 1, 2, 5]) for fid in states}
+
+        # Same PRAGMA profile for both sides so only the statement strategy differs.
+        legacy_conn = sqlite3.connect(legacy_path)
+        db_config.apply_pragmas(legacy_conn, connection_pool.get_pool().settings)
+        start = time.perf_counter()
+        for fid in states:
+            legacy_shift(legacy_conn, numbers[fid], states[fid], fid)
+        legacy_time = time.perf_counter() - start
+        legacy_conn.close()
+
+        connection_pool.configure_database()  # open the pool and apply its PRAGMAs outside the timed loop
+        start = time.perf_counter()
+        for fid in states:
+            database.update_calendar(numbers[fid], states[fid], fid, "addremove")
+        set_time = time.perf_counter() - start
+        connection_pool.reset_pool()
+
+        same = dump(legacy_path) == dump(set_based_path)
+        print(f"{args.furnaces} runs x {args.blocks} blocks, {args.repeated:.0%} repeated names")
+        print(f"row-by-row loop: {legacy_time * 1000 / args.furnaces:8.2f} ms per shift")
+        print(f"set-based:       {set_time * 1000 / args.furnaces:8.2f} ms per shift")
+        print(f"speedup:         {legacy_time / set_time:8.1f}x")
+        print(f"identical results: {same}")
+        if not same:
+            sys.exit(1)
+    finally:
+        connection_pool.reset_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Logging configuration for the server.
+
+database.py and the API routes log through the standard `logging` module
+(`logging.getLogger(__name__)`) and never write to stdout themselves. `configure()` wires
+the root logger so that:
+    - request threads only put records on an in-memory queue (`QueueHandler`); a
+      background `QueueListener` thread formats them and does the actual I/O,
+    - records below `LOG_LEVEL` are dropped before any formatting happens,
+    - DEBUG and INFO records can be sampled with `LOG_SAMPLE_RATE`; warnings and errors
+      are always kept,
+    - output is one JSON object per line (`LOG_FORMAT=json`, the default) or plain text
+      (`LOG_FORMAT=text`).
+
+Environment variables:
+    LOG_LEVEL        DEBUG, INFO (default), WARNING, ERROR or CRITICAL.
+    LOG_FORMAT       json (default) or text.
+    LOG_SAMPLE_RATE  Fraction of DEBUG/INFO records to keep, between 0 and 1 (default 1).
+
+Structured fields are passed with `extra`, e.g.
+`logger.info("recipe created", extra={"recipe_name": name})`.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+
+# Attributes every LogRecord has; anything else on a record came from `extra`.
+RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one line of JSON, including its `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random `rate` fraction of records below WARNING and every record at or above it."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    `QueueHandler` that keeps `extra` fields and the traceback as separate attributes.
+
+    The stock handler formats the record into its message before queueing it, which
+    would fold the traceback into the message text. Here the message is only rendered
+    (arguments merged in) and the traceback turned into text, so the listener's
+    formatter still sees every part of the record.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure(environ=os.environ, stream=None):
+    """
+    Set up the root logger as described in the module docstring. Calling it again
+    replaces the previous configuration.
+
+    Args:
+        environ (dict): Where to read LOG_LEVEL, LOG_FORMAT and LOG_SAMPLE_RATE from.
+        stream (file): Where log lines go; stderr if None.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+
+    Raises:
+        ValueError: If LOG_LEVEL, LOG_FORMAT or LOG_SAMPLE_RATE is invalid.
+    """
+    global _listener
+    level_name = environ.get("LOG_LEVEL", "INFO").upper()
+    level = logging.getLevelName(level_name)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{level_name}'")
+    log_format = environ.get("LOG_FORMAT", "json").lower()
+    if log_format not in ("json", "text"):
+        raise ValueError(f"LOG_FORMAT must be 'json' or 'text', not '{log_format}'")
+    rate = float(environ.get("LOG_SAMPLE_RATE", "1"))
+    if not 0 <= rate <= 1:
+        raise ValueError("LOG_SAMPLE_RATE must be between 0 and 1")
+
+    shutdown()
+    output = logging.StreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records = queue.SimpleQueue()
+    handler = StructuredQueueHandler(records)
+    if rate < 1:
+        handler.addFilter(SamplingFilter(rate))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown():
+    """Stop the listener thread after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,148 @@
+"""
+Per-endpoint request metrics in the Prometheus text format.
+
+`init_app(app)` adds request hooks that record, for every Flask endpoint:
+    - http_requests_total: requests handled, by endpoint, method and status code,
+    - http_request_duration_seconds: a latency histogram by endpoint and method,
+    - http_requests_in_flight: requests currently being handled, by endpoint,
+and serves them at GET /metrics. Recording an observation is a few dictionary updates
+and a `bisect` under one lock, so it can stay on in production. Set `METRICS=0` to turn
+it off.
+
+The endpoint label is the Flask endpoint name (e.g. 'api_v0_1.api_get_recipes'), which
+keeps the number of series bounded; requests that match no route are counted as
+'unmatched'. Latency runs until the response has been sent, including streamed bodies.
+Counters are kept per process, so with several worker processes each one reports its
+own numbers.
+"""
+import bisect
+import os
+import threading
+import time
+
+from flask import Response, g, request
+
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metrics:
+    """Thread-safe request counters, latency histograms and in-flight gauges."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._requests = {}     # (endpoint, method, status) -> count
+        self._histograms = {}   # (endpoint, method) -> [bucket counts..., +Inf count, sum]
+        self._in_flight = {}    # endpoint -> count
+
+    def started(self, endpoint):
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def finished(self, endpoint, method, status, seconds):
+        """Record one handled request that took `seconds`."""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            key = (endpoint, method, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+            histogram = self._histograms.get((endpoint, method))
+            if histogram is None:
+                histogram = self._histograms[(endpoint, method)] = [0] * (len(self.buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def render(self):
+        """
+        Returns:
+            str: Every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            requests = sorted(self._requests.items())
+            histograms = sorted((key, list(value)) for key, value in self._histograms.items())
+            in_flight = sorted(self._in_flight.items())
+        lines = [
+            "# HELP http_requests_total Requests handled, by endpoint, method and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (endpoint, method, status), count in requests:
+            lines.append(f"http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}")
+        lines += [
+            "# HELP http_request_duration_seconds Time from receiving a request to sending the last byte of its response.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), histogram in histograms:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), histogram):
+                cumulative += count
+                labels = _labels(endpoint=endpoint, method=method, le=bound)
+                lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+            labels = _labels(endpoint=endpoint, method=method)
+            lines.append(f"http_request_duration_seconds_sum{labels} {histogram[-1]!r}")
+            lines.append(f"http_request_duration_seconds_count{labels} {cumulative}")
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being handled.",
+            "# TYPE http_requests_in_flight gauge",
+        ]
+        for endpoint, count in in_flight:
+            lines.append(f"http_requests_in_flight{_labels(endpoint=endpoint)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(**labels):
+    """Format label pairs as '{name="value",...}', escaping as the text format requires."""
+    pairs = (
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def init_app(app, registry=None):
+    """
+    Record metrics for every request to `app` and serve them at GET /metrics.
+
+    Does nothing when the METRICS environment variable is '0'.
+
+    Args:
+        app (flask.Flask): The application serving the API.
+        registry (Metrics): Where to record; a new `Metrics` if None.
+
+    Returns:
+        Metrics: The registry in use, or None when metrics are disabled.
+    """
+    if os.environ.get("METRICS", "1") == "0":
+        return None
+    registry = registry or Metrics()
+
+    @app.before_request
+    def start_timer():
+        if request.endpoint == "metrics":
+            return
+        g.metrics_endpoint = request.endpoint or "unmatched"
+        g.metrics_start = time.perf_counter()
+        registry.started(g.metrics_endpoint)
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def stop_timer(exc):
+        start = g.pop("metrics_start", None)
+        if start is None:
+            return
+        status = 500 if exc is not None else g.pop("metrics_status", 500)
+        registry.finished(g.metrics_endpoint, request.method, status, time.perf_counter() - start)
+
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics, methods=["GET"])
+    app.extensions["metrics"] = registry
+    return registry
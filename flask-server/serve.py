@@ -0,0 +1,254 @@
+"""
+Production entry point for the API server.
+
+    python serve.py                                   # waitress, one process, 8 threads
+    python serve.py --server gunicorn --workers 4     # pre-fork processes with threads each
+    python serve.py --server uvicorn                  # ASGI, database work on bounded executors
+    python serve.py --dev                             # Flask's debug server with the reloader
+
+Three servers are supported:
+    - waitress (default, in requirements.txt): one process with a pool of worker threads.
+      Works everywhere, including Windows.
+    - gunicorn (in requirements.txt, Linux and macOS only): a master process
+      that forks `--workers` processes, each serving requests on `--threads` threads
+      (gthread workers).
+    - uvicorn (in requirements.txt): one process running an asyncio event
+      loop; requests run on the bounded read and write executors of asgi.py, `--threads`
+      of them in total, so slow writes cannot take every thread away from the reads.
+
+The app is always built once before serving starts, so the database checks run up front:
+the PRAGMA profile is applied, pending migrations run, and a missing or unreadable
+database stops the server before it listens. With gunicorn the app is built in the
+master and the pooled SQLite connections are closed before the workers are forked;
+each worker opens its own connections.
+
+SQLite allows one writer at a time, so more processes mostly add read throughput.
+Each request holds one pooled connection, so `--threads` above DB_POOL_SIZE only adds
+requests waiting for a connection; a warning is logged when that is the case.
+
+Shutdown is graceful. On SIGTERM or SIGINT the server stops accepting connections,
+lets in-flight requests finish for up to `--graceful-timeout` seconds, then closes the
+database connections and flushes the log.
+
+Environment variables (defaults for the options of the same name):
+    SERVER                   waitress (default), gunicorn or uvicorn.
+    SERVER_HOST              Interface to listen on (default 0.0.0.0).
+    SERVER_PORT              Port to listen on (default 5070).
+    SERVER_WORKERS           gunicorn worker processes (default: CPU count, at most 4).
+    SERVER_THREADS           Threads per process (default 8).
+    SERVER_GRACEFUL_TIMEOUT  Seconds to wait for in-flight requests on shutdown (default 30).
+"""
+import argparse
+import logging
+import os
+import signal
+import sys
+import time
+
+import log_setup
+
+logger = logging.getLogger(__name__)
+
+SERVERS = ("waitress", "gunicorn", "uvicorn")
+
+
+def parse_args(argv=None, environ=os.environ):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=SERVERS, default=environ.get("SERVER", "waitress"))
+    parser.add_argument("--host", default=environ.get("SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(environ.get("SERVER_PORT", 5070)))
+    parser.add_argument("--workers", type=int, default=environ.get("SERVER_WORKERS") and int(environ["SERVER_WORKERS"]),
+                        help="worker processes (gunicorn only)")
+    parser.add_argument("--threads", type=int, default=int(environ.get("SERVER_THREADS", 8)), help="threads per process")
+    parser.add_argument("--graceful-timeout", type=float, default=float(environ.get("SERVER_GRACEFUL_TIMEOUT", 30)),
+                        help="seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--dev", action="store_true", help="run Flask's debug server with the reloader instead")
+    options = parser.parse_args(argv)
+    if options.workers is None:
+        options.workers = min(4, os.cpu_count() or 1) if options.server == "gunicorn" else 1
+    if options.server != "gunicorn" and options.workers != 1:
+        parser.error(f"{options.server} runs a single process; use --server gunicorn for several workers")
+    if options.workers < 1 or options.threads < 1:
+        parser.error("--workers and --threads must be at least 1")
+    return options
+
+
+def preload():
+    """
+    Build the app in this process, running the database checks of `app.create_app`.
+
+    Returns:
+        flask.Flask: The application to serve.
+    """
+    import app as app_module
+
+    return app_module.create_app()
+
+
+def shutdown():
+    """End open event streams, close the pooled database connections and flush the log."""
+    import connection_pool  # importable once the app has put sqlite/ on sys.path
+    import events
+
+    events.reset_bus()
+    connection_pool.reset_pool()
+    log_setup.shutdown()
+
+
+def serve_waitress(application, options):
+    """
+    Serve with waitress until SIGTERM or SIGINT, then drain in-flight requests.
+
+    waitress' own `serve()` stops its worker threads as soon as it is interrupted, and
+    responses are only written to the sockets by the main loop, so requests still being
+    handled would be cut off. Here the loop keeps running after the signal, with the
+    listening socket closed, until no connection has a request in progress or the
+    graceful timeout has passed. Open event streams are ended right away.
+    """
+    from waitress.server import create_server
+    import events
+
+    server = create_server(application, host=options.host, port=options.port, threads=options.threads)
+    deadline = []
+
+    def stop(signum, frame):
+        # Only note the request here: the loop may be inside select() on the listening
+        # socket, which must not be closed under it.
+        if not deadline:
+            logger.info("Shutting down", extra={"signal": signal.Signals(signum).name})
+            deadline.append(time.monotonic() + options.graceful_timeout)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    logger.info("Serving", extra={"server": "waitress", "host": server.effective_host,
+                                  "port": server.effective_port, "threads": options.threads})
+
+    def busy():
+        return any(channel.requests or channel.total_outbufs_len for channel in list(server.active_channels.values()))
+
+    listening = True
+    while True:
+        server.asyncore.loop(timeout=server.adj.asyncore_loop_timeout, map=server._map,
+                             use_poll=server.adj.asyncore_use_poll, count=1)
+        if not deadline:
+            continue
+        if listening:
+            # Stop listening only; `server.close()` would also close the trigger the
+            # worker threads use to wake the loop when a response is ready.
+            server.asyncore.dispatcher.close(server)
+            events.get_bus().close()
+            listening = False
+        if not busy() or time.monotonic() >= deadline[0]:
+            break
+    server.task_dispatcher.shutdown(cancel_pending=True, timeout=max(0.0, deadline[0] - time.monotonic()))
+    for channel in list(server.active_channels.values()):
+        channel.close()
+    server.trigger.close()
+
+
+def serve_gunicorn(application, options):
+    """
+    Serve with gunicorn gthread workers forked from this (already preloaded) process.
+
+    Raises:
+        SystemExit: If gunicorn is not installed.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("gunicorn is not installed: pip install -r requirements.txt (gunicorn runs on "
+                         "Linux and macOS only), or use --server waitress")
+    import connection_pool
+
+    # SQLite connections must not be shared with forked children.
+    connection_pool.reset_pool()
+
+    def post_fork(server, worker):
+        # The log listener thread of the master does not exist in the worker.
+        log_setup.configure()
+
+    def worker_exit(server, worker):
+        shutdown()
+
+    settings = {
+        "bind": f"{options.host}:{options.port}",
+        "workers": options.workers,
+        "threads": options.threads,
+        "worker_class": "gthread",
+        "preload_app": True,
+        "graceful_timeout": max(1, round(options.graceful_timeout)),
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    logger.info("Serving", extra={"server": "gunicorn", "host": options.host, "port": options.port,
+                                  "workers": options.workers, "threads": options.threads})
+    Application().run()
+
+
+def serve_uvicorn(application, options):
+    """
+    Serve the app through `asgi.AsgiAdapter` with uvicorn, which handles SIGTERM and
+    SIGINT itself: it stops accepting connections and waits for in-flight requests.
+    uvicorn re-raises the signal once it has stopped, so the pool and the log are
+    closed at lifespan shutdown rather than after `run()` returns.
+
+    Raises:
+        SystemExit: If uvicorn is not installed.
+    """
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is not installed: pip install -r requirements.txt, or use --server waitress")
+    import asgi
+
+    adapter = asgi.adapt(application, threads=options.threads, on_shutdown=shutdown)
+    config = uvicorn.Config(adapter, host=options.host, port=options.port, lifespan="on", log_config=None,
+                            timeout_graceful_shutdown=options.graceful_timeout)
+    logger.info("Serving", extra={"server": "uvicorn", "host": options.host, "port": options.port,
+                                  "threads": options.threads})
+    uvicorn.Server(config).run()
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    log_setup.configure()
+    if options.dev:
+        import app as app_module
+
+        app_module.create_app().run(host=options.host, port=options.port, debug=True)
+        return
+
+    try:
+        application = preload()
+    except Exception:
+        logger.exception("Startup checks failed, not serving")
+        log_setup.shutdown()
+        sys.exit(1)
+    import connection_pool
+
+    pool_size = connection_pool.get_pool().max_size
+    if options.threads > pool_size:
+        logger.warning("More threads than pooled database connections; the extra threads wait for a connection",
+                       extra={"threads": options.threads, "pool_size": pool_size})
+    try:
+        if options.server == "gunicorn":
+            serve_gunicorn(application, options)
+        elif options.server == "uvicorn":
+            serve_uvicorn(application, options)
+        else:
+            serve_waitress(application, options)
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Overlap and conflict detection between furnace runs.
+
+A furnace runs one recipe at a time, but nothing in the tables stops two runs on the same
+'furnace_name' from overlapping. Runs are compared as the day intervals worked out by
+`schedule_grid.run_segments` (a stopped run ends the day after its Aborted/Down entry),
+and an overlap is reported as one of:
+    - 'down_overlaps_running': a Down day of one run falls on a 'Running' day of the other,
+    - 'runs_overlap': any other overlap.
+
+`sweep` checks a whole schedule with a sweep line: the runs of each furnace are visited in
+start order while a heap holds those still going, so the cost is O(n log n) for n runs
+plus the number of conflicts. `classify` compares two overlapping runs block by block.
+"""
+import collections
+import heapq
+
+
+RUNS_OVERLAP = "runs_overlap"
+DOWN_OVERLAPS_RUNNING = "down_overlaps_running"
+
+# Runs `first` and `second` (primary_ids; None for a run not saved yet) of `furnace_name`
+# both occupy days [start, end).
+Conflict = collections.namedtuple("Conflict", ["furnace_name", "kind", "first", "second", "start", "end"])
+
+
+def _down_on_running(down_side, running_side):
+    # Both lists are sorted and non-overlapping, so one merge pass finds every overlap.
+    i = j = 0
+    while i < len(down_side) and j < len(running_side):
+        a, b = down_side[i], running_side[j]
+        if a.start < b.end and b.start < a.end and a.state and "Down" in a.state and b.state == "Running":
+            return True
+        if a.end <= b.end:
+            i += 1
+        else:
+            j += 1
+    return False
+
+
+def classify(first, second):
+    """
+    Tell how two overlapping runs conflict.
+
+    Args:
+        first, second (list): The runs' intervals in day order, with 'start', 'end' and
+                              'state' attributes (e.g. `schedule_grid.Segment`).
+
+    Returns:
+        str: DOWN_OVERLAPS_RUNNING or RUNS_OVERLAP.
+    """
+    if _down_on_running(first, second) or _down_on_running(second, first):
+        return DOWN_OVERLAPS_RUNNING
+    return RUNS_OVERLAP
+
+
+def sweep(runs):
+    """
+    Find every pair of overlapping runs on the same furnace.
+
+    Args:
+        runs (iterable of tuple): (furnace_name, primary_id, intervals) with `intervals`
+                                  non-empty and in day order, as for `classify`.
+
+    Returns:
+        list of Conflict: Ordered by furnace and day, the earlier run first.
+    """
+    ordered = sorted(((name, intervals[0].start, intervals[-1].end, primary_id, intervals)
+                      for name, primary_id, intervals in runs),
+                     key=lambda run: (run[0], run[1], run[3]))
+    conflicts = []
+    active = []
+    furnace = None
+    for name, start, end, primary_id, intervals in ordered:
+        if name != furnace:
+            furnace, active = name, []
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        # Every run still active started earlier and ends after `start`.
+        for other_end, other_start, other_id, other_intervals in sorted(active, key=lambda run: (run[1], run[2])):
+            conflicts.append(Conflict(name, classify(other_intervals, intervals), other_id, primary_id,
+                                      start, min(end, other_end)))
+        heapq.heappush(active, (end, start, primary_id, intervals))
+    return conflicts
+
+
+def conflicts_with(furnace_name, primary_id, intervals, others):
+    """
+    Find the conflicts of one run with the given other runs of its furnace.
+
+    Args:
+        furnace_name (str): The run's furnace.
+        primary_id (int): The run's id; None for a run not saved yet.
+        intervals (list): The run's intervals in day order, as for `classify`.
+        others (dict): primary_id -> intervals of other runs on the furnace.
+
+    Returns:
+        list of Conflict: With the given run as `first`, ordered by day.
+    """
+    if not intervals:
+        return []
+    start, end = intervals[0].start, intervals[-1].end
+    conflicts = []
+    for other_id, other in others.items():
+        if other_id == primary_id or not other:
+            continue
+        overlap_start, overlap_end = max(start, other[0].start), min(end, other[-1].end)
+        if overlap_start < overlap_end:
+            conflicts.append(Conflict(furnace_name, classify(intervals, other), primary_id, other_id, overlap_start, overlap_end))
+    conflicts.sort(key=lambda conflict: (conflict.start, conflict.second))
+    return conflicts
@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+import db_config
+import sql_trace
+
+
+DEFAULT_POOL_SIZE = 8
+DEFAULT_POOL_TIMEOUT = 10.0
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """
+    A bounded pool of reusable SQLite connections.
+
+    Connections are opened lazily up to `max_size` and handed out one per scope.
+    A scope is the current thread, optionally pinned for the lifetime of a Flask
+    request (see `begin_scope` / `end_scope`), so every database function called
+    while handling one request shares a single connection instead of opening its own.
+
+    Counters for open, idle, in-use and waiting connections are available through
+    `stats()`.
+    """
+
+    def __init__(self, database, max_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_POOL_TIMEOUT, on_connect=None, factory=sqlite3.Connection):
+        """
+        Args:
+            database (str): Path to the SQLite database file.
+            max_size (int): Maximum number of connections the pool will open.
+            timeout (float): Seconds to wait for a free connection before raising `PoolTimeout`.
+            on_connect (callable): Optional hook called with every newly opened connection.
+            factory (type): `sqlite3.Connection` subclass to open, e.g. `sql_trace.TracingConnection`.
+        """
+        self.database = database
+        self.max_size = max(1, int(max_size))
+        self.timeout = float(timeout)
+        self.on_connect = on_connect
+        self.factory = factory
+        self.settings = {}
+        self._idle = deque()
+        self._cond = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._open = 0
+        self._waiting = 0
+        self._acquired = 0
+        self._timeouts = 0
+        self._closed = False
+
+    # ---- Raw checkout/checkin ----
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False, factory=self.factory)
+        if self.on_connect is not None:
+            self.on_connect(conn)
+        return conn
+
+    def acquire(self):
+        """
+        Check a connection out of the pool, opening a new one if the pool is not full.
+
+        Blocks for up to `timeout` seconds while every connection is in use.
+
+        Returns:
+            sqlite3.Connection: A connection owned by the caller until `release` is called.
+
+        Raises:
+            PoolTimeout: If no connection became free in time.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    self._acquired += 1
+                    return self._idle.pop()
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+        # Open outside the lock so a slow connect does not stall other threads.
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._acquired += 1
+        return conn
+
+    def release(self, conn):
+        """
+        Return a connection to the pool.
+
+        Any transaction left open by the caller is rolled back so the next user
+        starts from a clean state. Connections that cannot be reset are discarded.
+        """
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._cond:
+            if self._closed:
+                self._open -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    # ---- Scoped (per request / per thread) access ----
+
+    def acquire_scoped(self):
+        """
+        Return the connection bound to the current scope, checking one out if needed.
+
+        Nested calls within the same scope get the same connection; each call must be
+        matched by `release_scoped`.
+
+        Returns:
+            tuple: (sqlite3.Connection, bool) where the bool is True for the outermost
+            call of the scope, i.e. the first database function to run in it.
+        """
+        state = self._local
+        conn = getattr(state, "conn", None)
+        if conn is None:
+            conn = self.acquire()
+            state.conn = conn
+            state.depth = 0
+        state.depth += 1
+        return conn, state.depth == 1
+
+    def release_scoped(self, conn):
+        """
+        Undo one `acquire_scoped` call. The connection goes back to the pool once the
+        outermost caller is done, unless the scope is pinned to a request.
+        """
+        state = self._local
+        if getattr(state, "conn", None) is not conn:
+            # Not a scoped connection (or the scope was already torn down).
+            return
+        state.depth -= 1
+        if state.depth <= 0 and not getattr(state, "pinned", False):
+            state.conn = None
+            state.depth = 0
+            self.release(conn)
+
+    def begin_scope(self):
+        """Pin the current thread's connection until `end_scope` (called before each request)."""
+        self._local.pinned = True
+
+    def end_scope(self, exc=None):
+        """Release the connection pinned to the current thread (called on request teardown)."""
+        state = self._local
+        state.pinned = False
+        conn = getattr(state, "conn", None)
+        state.conn = None
+        state.depth = 0
+        if conn is not None:
+            self.release(conn)
+
+    # ---- Bookkeeping ----
+
+    def stats(self):
+        """
+        Returns:
+            dict: Counters describing the pool:
+                - 'max_size' (int): Upper bound on open connections.
+                - 'open' (int): Connections currently open.
+                - 'idle' (int): Open connections waiting in the pool.
+                - 'in_use' (int): Open connections checked out by a scope.
+                - 'waiting' (int): Threads blocked waiting for a connection.
+                - 'acquired' (int): Total successful checkouts.
+                - 'timeouts' (int): Total checkouts that gave up waiting.
+        """
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "waiting": self._waiting,
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+            }
+
+    def close(self):
+        """Close every idle connection and stop handing out new ones."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+            self._cond.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def default_database_path():
+    """
+    Returns:
+        str: The database file used by the app: `ORGANIZE_DB_PATH` if set, otherwise
+        'recipe_table.db' next to this module.
+    """
+    path = os.environ.get("ORGANIZE_DB_PATH")
+    if path:
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipe_table.db")
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use.
+
+    Size and wait timeout come from the `DB_POOL_SIZE` and `DB_POOL_TIMEOUT`
+    environment variables. Every connection the pool opens gets the PRAGMA profile
+    resolved by `db_config.load_settings`. With `SQL_TRACE=1` the connections are
+    `sql_trace.TracingConnection`s.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                settings = db_config.load_settings()
+                _pool = ConnectionPool(
+                    default_database_path(),
+                    max_size=int(os.environ.get("DB_POOL_SIZE", DEFAULT_POOL_SIZE)),
+                    timeout=float(os.environ.get("DB_POOL_TIMEOUT", DEFAULT_POOL_TIMEOUT)),
+                    on_connect=lambda conn: db_config.apply_pragmas(conn, settings),
+                    factory=sql_trace.TracingConnection if sql_trace.enabled() else sqlite3.Connection,
+                )
+                _pool.settings = settings
+    return _pool
+
+
+def reset_pool():
+    """Close the process-wide pool so the next `get_pool` call builds a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+def configure_database():
+    """
+    Open the first pooled connection at startup so the PRAGMA profile (in particular
+    the persistent journal_mode=WAL switch) is applied before any request arrives,
+    and configuration errors surface immediately instead of on the first request.
+
+    Returns:
+        dict: The PRAGMA values SQLite reports for the configured database.
+    """
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        return db_config.read_pragmas(conn)
+    finally:
+        pool.release(conn)
+
+
+def pool_timeout_response(error):
+    """Answer a request that found no free connection with 503 and Retry-After."""
+    from flask import jsonify
+
+    return jsonify({"error": "Database busy, try again"}), 503, {"Retry-After": "1"}
+
+
+def init_app(app):
+    """
+    Bind the pool to a Flask app: each request gets one connection, returned to the
+    pool when the app context is torn down. A request that gets no connection within
+    the pool timeout is answered 503 (see `pool_timeout_response`).
+    """
+    app.before_request(lambda: get_pool().begin_scope())
+    app.teardown_appcontext(lambda exc: get_pool().end_scope(exc))
+    app.register_error_handler(PoolTimeout, pool_timeout_response)
@@ -1,231 +1,141 @@
+import logging
+import math
 import sqlite3
 import sys
 import os
+import threading
+import time
+from datetime import date, timedelta
+import conflicts
+import connection_pool
+import events
+import interval_index
+import migrate
+import reference_cache
+import schedule_grid
+import sql_trace
+import models
+
+logger = logging.getLogger(__name__)
 
 def connect_to_db():
     """
-    Establish a connection to the SQLite database.
+    Borrow a connection to the SQLite database from the connection pool.
 
-    This function locates the 'recipe_table.db' file in the same directory as the 
-    current script and establishes a connection to it.
+    The pool hands out one connection per request (or per thread outside of a request),
+    so nested calls made while handling the same request share a single connection
+    instead of each opening their own. Every call must be paired with `release_db`.
+
+    The first call in a scope resets per-connection settings such as foreign key
+    enforcement, so each database function starts from SQLite's defaults exactly as
+    it did with a freshly opened connection.
+
+    Call it before the `try` whose `finally` releases the connection, so a failure to
+    get one is not hidden by the cleanup.
 
     Returns:
         sqlite3.Connection: An active connection object to the SQLite database.
+
+    Raises:
+        connection_pool.PoolTimeout: If no connection became free within the pool
+        timeout; the app answers 503 (see `connection_pool.init_app`).
     """
-    path = os.path.dirname(os.path.abspath(__file__))
-    db = os.path.join(path, 'recipe_table.db')    
-    conn = sqlite3.connect(db)
+    conn, outermost = connection_pool.get_pool().acquire_scoped()
+    if outermost:
+        conn.execute("PRAGMA foreign_keys=OFF")
     return conn
 
+def release_db(conn):
+    """
+    Hand a connection obtained from `connect_to_db` back to the pool.
 
+    Outside of a request the connection is returned as soon as the outermost caller
+    releases it. During a request it stays bound to the request and is returned on
+    app teardown.
 
-def create_color_table():
+    Args:
+        conn (sqlite3.Connection): The connection returned by `connect_to_db`.
     """
-    Create the 'color_table' in the SQLite database. Currently, color table is not being used.
+    connection_pool.get_pool().release_scoped(conn)
 
-    This function connects to the SQLite database and attempts to create a table named 
-    'color_table' with two columns:
-        - block_name (text): The name of the block (Starting, Preparing, etc.), which must be unique.
-        - color (text): The color associated with the block.
+def init_app(app):
+    """
+    Register the connection pool's per-request hooks (and the SQL tracer's, when
+    SQL_TRACE=1) on the Flask app.
 
-    If the table creation is successful, a success message is printed. If it fails, 
-    an error message is printed.
+    Args:
+        app (flask.Flask): The application serving the API.
+    """
+    connection_pool.init_app(app)
+    sql_trace.init_app(app)
+    logger.info("Database configured", extra={"pragmas": connection_pool.configure_database()})
+    applied = migrate_database()
+    if applied:
+        logger.info("Applied schema migrations", extra={"versions": applied})
 
-    Exceptions:
-        If an error occurs during table creation, the exception is caught and 
-        an error message is printed.
+def pool_stats():
+    """
+    Report the connection pool counters.
 
-    The database connection is closed in the 'finally' block, ensuring that it is 
-    always closed after the operation is complete.
+    Returns:
+        dict: Open, idle, in-use and waiting connection counts, see `ConnectionPool.stats`.
     """
-    try:
-        conn = connect_to_db()
-        conn.execute(
-            '''
-            CREATE TABLE color_table (
-                block_name text UNIQUE,
-                color text
-            );
-        '''
-        )
-        conn.commit()
-        print("Color table created successfully")
-    except:
-        print("Color table creation failed")
-    finally:
-        conn.close()
+    return connection_pool.get_pool().stats()
 
-def create_calendar_table():
+def cache_stats():
     """
-    Create the 'calendar_table' in the SQLite database. The table contains 
-    information on the blocks that will be shown on the calendar, so adding/removing,
-    aborting, or downing processes all reflect in calendar, where edits and rows are linked
-    through furnace_id.
+    Report the reference-data cache counters.
 
-    This function connects to the SQLite database and attempts to create a table named 
-    'calendar_table' with the following columns:
-        - furnace_id (text): Identifier for the furnace, which references 'primary_id' 
-          in the 'furnaces_table'.
-        - block (text): Identifier for the block, which references 'block_name' 
-          in the 'color_table'.
-        - sequence (real): Represents the sequence index for scheduling.
-        - end_time (real): Represents the length of the recipe
+    Returns:
+        dict: 'enabled', 'entries', 'hits' and 'misses', see `ReferenceCache.stats`.
     """
-    try:
-        conn = connect_to_db()
-        conn.execute(
-            '''
-            CREATE TABLE calendar_table (
-                furnace_id text,
-                block text,
-                sequence real,
-                end_time real,
-                FOREIGN KEY (furnace_id) REFERENCES furnaces_table (primary_id),
-                FOREIGN KEY (block) REFERENCES color_table (block_name)
-            );
-        '''
-        )
-        conn.commit()
-        print("Calendar table created successfully")
-    except Exception as e:
-        print(f"block table creation failed: {e}")
-    finally:
-        conn.close()
-def create_blockname_table():
+    return reference_cache.get_cache().stats()
+
+def event_stats():
     """
-    Create the 'blockname_table' in the SQLite database. The blockname table contains 
-    the information for each recipe before any in-row modifications are made to the 
-    recipe.
+    Report the change-event bus counters.
 
-    This function connects to the SQLite database and attempts to create a table named 
-    'blockname_table' with the following columns:
-        - recipe_key (text): A reference key for the recipe, which references 'recipe_name'
-          in the 'recipe_table'.
-        - block (text): Identifier for the block, which references 'block_name' 
-          in the 'color_table'.
-        - sequence (real): Represents the sequence number for this block in the recipe.
+    Returns:
+        dict: 'subscribers', 'published' and 'last_event_id', see `EventBus.stats`.
     """
-    try:
-        conn = connect_to_db()
-        conn.execute(
-            '''
-            CREATE TABLE blockname_table (
-                recipe_key text,
-                block text,
-                sequence real,
-                FOREIGN KEY (recipe_key) REFERENCES recipe_table (recipe_name),
-                FOREIGN KEY (block) REFERENCES color_table (block_name)
-            );
-        '''
-        )
-        conn.commit()
-        print("Block table created successfully")
-    except Exception as e:
-        print(f"block table creation failed: {e}")
-    finally:
-        conn.close()
-def create_db_table():
+    return events.get_bus().stats()
+
+def schedule_stats():
     """
-    Create the 'recipe_table' in the SQLite database. This table contains all the
-    recipes, their names, and their lengths.
+    Report the schedule grid cache counters.
 
-    This table includes the following columns:
-        - recipe_id (INTEGER PRIMARY KEY NOT NULL): A unique identifier for each recipe.
-        - recipe_name (text): The name of the recipe, which must be unique.
-        - time (real): Represents the length of the recipe.
+    Returns:
+        dict: 'enabled', 'furnaces', 'version', 'hits', 'misses' and 'invalidations', see `ScheduleCache.stats`.
     """
-    try:
-        conn = connect_to_db()
-        
-        conn.execute('''
-            CREATE TABLE recipe_table (
-                recipe_id INTEGER PRIMARY KEY NOT NULL,
-                recipe_name text UNIQUE,
-                time real
-            );
-        ''')
-        conn.commit()
-        print("Recipe table created successfully")
-    except:
-        print("Recipe table creation failed - Maybe table")
-    finally:
-        conn.close()
+    return schedule_grid.get_cache().stats()
 
-def create_down_table():
+def interval_index_stats():
     """
-    Create the 'down_table' in the SQLite database. Down reasons correspond to a color in the color table
+    Report the interval index counters.
 
-    This table includes the following column:
-        - down_name (text): A down reason that has a reference to 'block_name' in the 'color_table'.
+    Returns:
+        dict: 'built', 'runs', 'intervals', 'pending', 'stale', 'version', 'rebuilds' and 'queries', see `IntervalIndex.stats`.
     """
-    try: 
-        conn = connect_to_db()
-        conn.execute('''
-                CREATE TABLE down_table (
-                    down_name text,
-                    FOREIGN KEY (down_name) REFERENCES color_table (block_name) 
-                     );
-                     ''')
-        conn.commit()
-        print("down_table created successfully")
-    except Exception as e:
-        print(f"Down table creation failed - Maybe table {e}")
-    finally:
-        conn.close()
-
-def create_furnace_recipe_table():
-    """
-    Create the 'furnace_recipe_table' in the SQLite database. This is a lookup table
-    with a one to one connection between furnace and recipe.
-
-    This table includes the following columns:
-        - furnace (text UNIQUE): The name of the furnace, which must be unique.
-        - recipe (text): A reference to 'recipe_name' in the 'recipe_table'.
-    """
-    try: 
-        conn = connect_to_db()
-        conn.execute('''
-                CREATE TABLE furnace_recipe_table (
-                    furnace text UNIQUE,
-                    recipe text,
-                    FOREIGN KEY (recipe) REFERENCES recipe_table (recipe_name) 
-                     );
-                     ''')
-        conn.commit()
-        print("furnace_recipe_table created successfully")
-    except Exception as e:
-        print(f"Furnace Recipe table creation failed - {e}")
-    finally:
-        conn.close()
-    
-def create_furnace_table():
+    return interval_index.get_index().stats()
+
+
+def migrate_database():
     """
-    Create the 'furnaces_table' in the SQLite database.
+    Bring the database schema up to date.
+
+    Tables and indexes are defined by the numbered scripts in 'sqlite/migrations' and
+    applied in order by `migrate.migrate`, which records each applied version in the
+    'schema_version' table. This replaces the old per-table create_*_table functions.
 
-    This table includes the following columns:
-        - primary_id (INTEGER PRIMARY KEY NOT NULL): A unique identifier for each furnace entry.
-        - furnace_name (text): The name of the furnace.
-        - start_time (DATE): The start time associated with the furnace.
-        - recipe_key (text): A reference to 'recipe_name' in the 'recipe_table'.
+    Returns:
+        list of int: The migration versions applied by this call.
     """
+    pool = connection_pool.get_pool()
+    conn = pool.acquire()
     try:
-        conn = connect_to_db()
-        conn.execute('''
-            CREATE TABLE furnaces_table (
-                primary_id INTEGER PRIMARY KEY NOT NULL,
-                furnace_name text,
-                start_time DATE,
-                recipe_key text,
-                FOREIGN KEY (recipe_key) REFERENCES recipe_table (recipe_name)
-            );
-        ''')
-        conn.commit()
-        print("Furnace table created successfully")
-    except Exception as e:
-        print(f"Furnace table creation failed - Maybe table{e}")
+        return migrate.migrate(conn)
     finally:
-        conn.close()
-
+        pool.release(conn)
 
 
 def create_recipe(recipe):
@@ -247,24 +157,25 @@ def create_recipe(recipe):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
     The database connection is closed after the operation is complete.
     """
     added_recipe = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
-        # print(recipe['time'])
         cur.execute("INSERT INTO recipe_table (recipe_name, time) VALUES (?, ?)", (recipe['recipe_name'], recipe['time']))
         conn.commit()
+        reference_cache.invalidate("recipes")
+        events.publish("recipe.created", {"recipe_id": cur.lastrowid, "recipe_name": recipe['recipe_name']})
         added_recipe = read_recipe_by_id(cur.lastrowid)
         print_database()
     except Exception as e:
-        print(f"An error has occurred while creating recipe: {e}")
+        logger.error("An error has occurred while creating recipe: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
     return added_recipe
 def create_furnace_recipe(furnace_recipe):
     """
@@ -281,22 +192,23 @@ def create_furnace_recipe(furnace_recipe):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
     The database connection is closed after the operation is complete.
     """
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
-        # print(recipe['time'])
         cur.execute("INSERT INTO furnace_recipe_table (furnace, recipe ) VALUES (?, ?)", (furnace_recipe['furnace_name'], furnace_recipe['recipe_key']))
         conn.commit()
+        reference_cache.invalidate("furnace_recipes")
+        events.publish("furnace_recipe.changed", {"furnace": furnace_recipe['furnace_name']})
         print_database()
     except Exception as e:
-        print(f"An error has occurred while creating recipe: {e}")
+        logger.error("An error has occurred while creating recipe: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
     return
 def create_color(color):
     """
@@ -312,22 +224,23 @@ def create_color(color):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
     The database connection is closed after the operation is complete.
     """
     added_color = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
-        # print(recipe['time'])
         cur.execute("INSERT INTO color_table (block_name, color) VALUES (?, ?)", (color['block_name'], color['color']))
         conn.commit()
+        reference_cache.invalidate("colors")
+        events.publish("color.created", {"block_name": color['block_name']})
     except Exception as e:
-        print(f"An error has occurred while creating color: {e}")
+        logger.error("An error has occurred while creating color: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
 def create_down(down):
     """
     Add a new entry to the 'down_table' in the SQLite database.
@@ -341,21 +254,22 @@ def create_down(down):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
     The database connection is closed after the operation is complete.
     """
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
-        # print(recipe['time'])
         cur.execute("INSERT INTO down_table (down_name) VALUES (?)", (down['down_name'],))
         conn.commit()
+        reference_cache.invalidate("down")
+        events.publish("down_reason.created", {"down_name": down['down_name']})
     except Exception as e:
-        print(f"An error has occurred while creating down_block: {e}")
+        logger.error("An error has occurred while creating down_block: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
 
 def create_block(blocks):
     """
@@ -375,28 +289,38 @@ def create_block(blocks):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
     The database connection is closed after the operation is complete.
     """
     # added_furnace = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
-        # print(recipe['time'])
         cur.execute("PRAGMA foreign_keys=ON")
         
         for i in range(len(blocks)):
-            print(blocks[i])
+            logger.debug("Inserting block", extra={"block": blocks[i]})
             cur.execute("INSERT INTO blockname_table (recipe_key, block, sequence) VALUES (?, ?, ?)", (blocks[i]['recipe_key'], blocks[i]['block'], blocks[i]['sequence']))
             conn.commit()
+        if blocks:
+            events.publish("recipe.updated", {"recipe_name": blocks[0]['recipe_key']})
        
     except Exception as e:
-        print(f"An error has occurred while creating blocks: {e}")
+        logger.error("An error has occurred while creating blocks: %s", e)
         conn.rollback()
     finally:
-        conn.close()
-def create_furnace(furnace):
+        release_db(conn)
+def _furnace_event(primary_id, furnace):
+    """Data of a furnace.added / furnace.updated event for the run `primary_id`."""
+    return {
+        "primary_id": primary_id,
+        "furnace_name": furnace['furnace_name'],
+        "recipe_key": furnace['recipe_key'],
+        "start_time": furnace['start_time'],
+    }
+
+def create_furnace(furnace, check_conflicts=False):
     """
     Add a new furnace entry to the 'furnaces_table' in the SQLite database.
 
@@ -409,27 +333,85 @@ def create_furnace(furnace):
             - 'furnace_name' (str): The name of the furnace.
             - 'recipe_key' (str): The key representing the associated recipe.
             - 'start_time' (str): The start time associated with the furnace.
+        check_conflicts (bool): Refuse the run if it would overlap another run on the same
+                                furnace (see `check_run_conflicts`). The check runs in the
+                                same write transaction as the insert, so a concurrent write
+                                cannot slip in between.
+
+    Returns:
+        list of dict: The conflicts that kept the run from being added, when
+        `check_conflicts` is set; None otherwise.
     """
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
         cur.execute("PRAGMA foreign_keys=ON")
+        if check_conflicts:
+            cur.execute("BEGIN IMMEDIATE")
+            found = _run_conflicts(cur, furnace)
+            if found:
+                conn.rollback()
+                return found
 
         cur.execute("INSERT INTO furnaces_table (furnace_name, recipe_key, start_time) VALUES (?, ?, ?)", (furnace['furnace_name'], furnace['recipe_key'], furnace['start_time']))
         conn.commit()
+        events.publish("furnace.added", _furnace_event(cur.lastrowid, furnace))
     except Exception as e:
-        print(f"An error has occurred while creating furnace: {e}")
+        logger.error("An error has occurred while creating furnace: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
+def _find_run_and_recipe_time(cur, where, params):
+    """
+    Look up a furnace run and the length of its recipe in a single query.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the caller's transaction.
+        where (str): SQL condition on 'furnaces_table' selecting the run.
+        params (tuple): Parameters for `where`.
+
+    Returns:
+        tuple: (primary_id, recipe time) of the first matching run.
+
+    Raises:
+        LookupError: If no run matches or its recipe does not exist.
+    """
+    cur.execute(
+        f"""SELECT furnaces_table.primary_id, recipe_table.recipe_id, recipe_table.time
+            FROM furnaces_table LEFT JOIN recipe_table ON recipe_table.recipe_name = furnaces_table.recipe_key
+            WHERE {where} ORDER BY furnaces_table.rowid LIMIT 1""",
+        params,
+    )
+    row = cur.fetchone()
+    if row is None:
+        raise LookupError(f"no furnace run matches {params}")
+    if row[1] is None:
+        raise LookupError(f"furnace run {row[0]} references a recipe that does not exist")
+    return row[0], row[2]
+
+def _insert_calendar_rows(cur, calendars, furnace_id, time):
+    """
+    Insert the calendar blocks of one furnace run with a single executemany.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the caller's transaction.
+        calendars (list of dict): Blocks with 'block' and 'sequence' keys.
+        furnace_id (int): 'primary_id' of the run in 'furnaces_table'.
+        time (float): Length of the run's recipe, stored as each block's end_time.
+    """
+    cur.executemany(
+        "INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)",
+        [(furnace_id, calendar['block'], calendar['sequence'], time) for calendar in calendars],
+    )
+
 def create_calendar(calendars, start, furnace_name):
     """
     Add calendar entries to the 'calendar_table' in the SQLite database.
 
     This function inserts multiple records into the 'calendar_table' based on the provided
     list of calendar entries, the start time, and the furnace name, basically inserting the default
-    recipe in block format. It retrieves the furnace and recipe details from the database to
-      calculate the end time for each calendar entry.
+    recipe in block format. The furnace run and the length of its recipe are looked up once,
+    and all entries are inserted with one executemany in a single transaction.
 
     Args:
         calendars (list of dict): A list of dictionaries, each containing the calendar entry details.
@@ -439,37 +421,29 @@ def create_calendar(calendars, start, furnace_name):
         start (str): The start time associated with the furnace.
         furnace_name (str): The name of the furnace.
     """
+    if not calendars:
+        return
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
         cur.execute("PRAGMA foreign_keys=ON")
-        print("entering loop")
-        for i in range(len(calendars)):
-            cur.execute("SELECT * FROM furnaces_table WHERE start_time =  ? AND furnace_name = ?", (start, furnace_name))
-            row = cur.fetchone()
-            print("row")
-            print(row)
-            id = row[0]
-            recipe = row[3]
-            cur.execute("SELECT * FROM recipe_table WHERE recipe_name =  ?", (recipe,))
-            recipe_row = cur.fetchone()
-            time = recipe_row[2]
-            cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, calendars[i]['block'], calendars[i]['sequence'], time))
+        id, time = _find_run_and_recipe_time(cur, "furnaces_table.start_time = ? AND furnaces_table.furnace_name = ?", (start, furnace_name))
+        _insert_calendar_rows(cur, calendars, id, time)
         conn.commit()
-        # added_recipe = read_recipe_by_id(cur.lastrowid)
+        events.publish("calendar.changed", {"furnace_id": str(id), "action": "created"})
     except Exception as e:
-        print(f"An error has occurred while creating calendar: {e}")
+        logger.error("An error has occurred while creating calendar: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
 def create_empty_calendar(calendars, furnace):
     """
     Add empty calendar entries to the 'calendar_table' in the SQLite database. This function is used 
     when the start time is not known yet. 
 
     This function inserts multiple records into the 'calendar_table' based on the provided
-    list of calendar entries and furnace details. It retrieves the furnace and associated
-    recipe details from the database to calculate the end time for each calendar entry.
+    list of calendar entries and furnace details. The first run of the furnace and the length
+    of its recipe are looked up once, and all entries are inserted with one executemany.
 
     Args:
         calendars (list of dict): A list of dictionaries, each containing the calendar entry details.
@@ -481,66 +455,100 @@ def create_empty_calendar(calendars, furnace):
 
     Exceptions:
         If an error occurs during the insertion, the transaction is rolled back and 
-        an error message is printed.
+        an error is logged.
 
-    The database connection is closed after the operation is complete.
+    The database connection is returned to the pool after the operation is complete.
     """
+    if not calendars:
+        return
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
         cur.execute("PRAGMA foreign_keys=ON")
-        for i in range(len(calendars)):
-            cur.execute("SELECT * FROM furnaces_table WHERE furnace_name = ?", ( furnace['furnace_name'],))
-
-            row = cur.fetchone()
-            print("row")
-            print(row)
-          
-            id = row[0]
-            recipe = row[3]
-            cur.execute("SELECT * FROM recipe_table WHERE recipe_name =  ?", (recipe,))
-            recipe_row = cur.fetchone()
-            time = recipe_row[2]
-            cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, calendars[i]['block'], calendars[i]['sequence'], time))
+        id, time = _find_run_and_recipe_time(cur, "furnaces_table.furnace_name = ?", (furnace['furnace_name'],))
+        _insert_calendar_rows(cur, calendars, id, time)
         conn.commit()
-        # added_recipe = read_recipe_by_id(cur.lastrowid)
+        events.publish("calendar.changed", {"furnace_id": str(id), "action": "created"})
     except Exception as e:
-        print(f"An error has occurred while creating empty calendar: {e}")
+        logger.error("An error has occurred while creating empty calendar: %s", e)
+        conn.rollback()
+    finally:
+        release_db(conn)
+def create_furnaces_bulk(runs):
+    """
+    Add many furnace runs and their calendar entries in one transaction.
+
+    Every run is inserted into 'furnaces_table'; the calendar blocks of all runs are then
+    inserted into 'calendar_table' with a single executemany. Recipe lengths are read once
+    for the whole batch. If anything fails, nothing is written.
+
+    Args:
+        runs (list of tuple): (furnace, calendars) pairs where
+            - furnace (dict): 'furnace_name' (str), 'recipe_key' (str) and 'start_time' (str or None).
+            - calendars (list of dict): Blocks with 'block' and 'sequence' keys; may be empty.
+
+    Returns:
+        list of int: The 'primary_id' of each created run, in input order.
+
+    Raises:
+        LookupError: If a run references a recipe that does not exist.
+        sqlite3.Error: If the inserts fail; the transaction is rolled back first.
+    """
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.execute("SELECT recipe_name, time FROM recipe_table")
+        recipe_times = dict(cur.fetchall())
+        ids = []
+        calendar_rows = []
+        for furnace, calendars in runs:
+            if furnace['recipe_key'] not in recipe_times and (calendars or furnace['recipe_key'] is not None):
+                raise LookupError(f"recipe {furnace['recipe_key']!r} does not exist")
+            cur.execute("INSERT INTO furnaces_table (furnace_name, recipe_key, start_time) VALUES (?, ?, ?)", (furnace['furnace_name'], furnace['recipe_key'], furnace['start_time']))
+            ids.append(cur.lastrowid)
+            if calendars:
+                time = recipe_times[furnace['recipe_key']]
+                calendar_rows.extend((cur.lastrowid, calendar['block'], calendar['sequence'], time) for calendar in calendars)
+        cur.executemany("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", calendar_rows)
+        conn.commit()
+        for id, (furnace, calendars) in zip(ids, runs):
+            events.publish("furnace.added", _furnace_event(id, furnace))
+            if calendars:
+                events.publish("calendar.changed", {"furnace_id": str(id), "action": "created"})
+        return ids
+    except Exception:
         conn.rollback()
+        raise
     finally:
-        conn.close()
+        release_db(conn)
+@reference_cache.cached("recipes")
 def read_recipes():
     """
     Retrieve all recipes from the 'recipe_table' in the SQLite database. Used by the GET api call.
 
     This function queries the 'recipe_table' and retrieves all the recipe records. Each
-    record is represented as a dictionary with the following keys:
+    record is represented as a `models.Recipe` record with the following fields:
         - 'recipe_id' (int): The unique identifier for the recipe.
         - 'recipe_name' (str): The name of the recipe.
         - 'time' (float): The time associated with the recipe.
 
     Returns:
-        list of dict: A list of dictionaries representing the recipes. If an error occurs,
+        list of models.Recipe: A list of records representing the recipes. If an error occurs,
         an empty list is returned.
     
     Exceptions:
         If an error occurs during the query, an empty list is returned.
     """
     recipes = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM recipe_table")
-        rows = cur.fetchall()
-        for i in rows:
-            recipe = {}
-            recipe["recipe_id"] = i["recipe_id"]
-            recipe["recipe_name"] = i["recipe_name"]
-            recipe["time"] = i["time"]
-            recipes.append(recipe)
+        recipes = models.fetch_all(cur, models.Recipe)
     except Exception as e:
         recipes = []
+    finally:
+        release_db(conn)
     return recipes
 
 def read_blocks():
@@ -548,206 +556,377 @@ def read_blocks():
     Retrieve all blocks from the 'blockname_table' in the SQLite database.
 
     This function queries the 'blockname_table' and retrieves all the block records. 
-    Each record is represented as a dictionary with the following keys:
+    Each record is represented as a `models.Block` record with the following fields:
         - 'recipe_key' (str): The key representing the associated recipe.
         - 'block' (str): The name of the block.
         - 'sequence' (float): The sequence number for the block.
 
     Returns:
-        list of dict: A list of dictionaries representing the blocks. If an error occurs,
+        list of models.Block: A list of records representing the blocks. If an error occurs,
         an empty list is returned.
     
     Exceptions:
-        If an error occurs during the query, an error message is printed and an empty 
+        If an error occurs during the query, an error is logged and an empty 
         list is returned.
     """
     blocks = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM blockname_table")
-        rows = cur.fetchall()
-        for i in rows:
-            block = {}
-            block["recipe_key"] = i["recipe_key"]
-            block["block"] = i["block"]
-            block["sequence"] = i["sequence"]
-            blocks.append(block)
+        blocks = models.fetch_all(cur, models.Block)
     except Exception as e:
-        print(f"Error while reading blocks: {e}")
+        logger.error("Error while reading blocks: %s", e)
         blocks = []
+    finally:
+        release_db(conn)
     return blocks
+@reference_cache.cached("colors")
 def read_colors():
     """
     Retrieve all colors from the 'color_table' in the SQLite database.
 
     This function queries the 'color_table' and retrieves all the color records. 
-    Each record is represented as a dictionary with the following keys:
+    Each record is represented as a `models.Color` record with the following fields:
         - 'block_name' (str): The name of the block.
         - 'color' (str): The color associated with the block.
 
     Returns:
-        list of dict: A list of dictionaries representing the colors. If an error occurs,
+        list of models.Color: A list of records representing the colors. If an error occurs,
         an empty list is returned.
     
     Exceptions:
-        If an error occurs during the query, an error message is printed and an empty 
+        If an error occurs during the query, an error is logged and an empty 
         list is returned.
     """
     colors = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM color_table")
-        rows = cur.fetchall()
-        for i in rows:
-            color = {}
-            color["block_name"] = i["block_name"]
-            color["color"] = i["color"]
-            colors.append(color)
+        colors = models.fetch_all(cur, models.Color)
     except Exception as e:
-        print(f"Error while reading colors {e}")
+        logger.error("Error while reading colors: %s", e)
         colors = []
+    finally:
+        release_db(conn)
     return colors
+@reference_cache.cached("down")
 def read_down():
     """
     Retrieve all entries from the 'down_table' in the SQLite database.
 
     This function queries the 'down_table' and retrieves all the down records. 
-    Each record is represented as a dictionary with the following key:
+    Each record is represented as a `models.DownReason` record with the following field:
         - 'down_name' (str): The name of the down reason.
 
     Returns:
-        list of dict: A list of dictionaries representing the down entries. If an error occurs,
+        list of models.DownReason: A list of records representing the down entries. If an error occurs,
         an empty list is returned.
     
     Exceptions:
-        If an error occurs during the query, an error message is printed and an empty 
+        If an error occurs during the query, an error is logged and an empty 
         list is returned.
     """
     downs = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM down_table")
-        rows = cur.fetchall()
-        for i in rows:
-            down = {}
-            down["down_name"] = i["down_name"]
-            downs.append(down)
+        downs = models.fetch_all(cur, models.DownReason)
     except Exception as e:
-        print(f"Error while reading downreasons {e}")
+        logger.error("Error while reading downreasons: %s", e)
         downs = []
+    finally:
+        release_db(conn)
     return downs
 def read_calendar():
     """
     Retrieve all calendar entries from the 'calendar_table' in the SQLite database.
 
     This function queries the 'calendar_table' and retrieves all the calendar records. 
-    Each record is represented as a dictionary with the following keys:
+    Each record is represented as a `models.CalendarEntry` record with the following fields:
         - 'furnace_id' (int): The ID of the furnace associated with the calendar entry.
         - 'block' (str): The name of the block associated with the calendar entry.
         - 'sequence' (float): The sequence number for the calendar entry.
         - 'end_time' (float): The end time for the calendar entry.
 
     Returns:
-        list of dict: A list of dictionaries representing the calendar entries. 
+        list of models.CalendarEntry: A list of records representing the calendar entries. 
         If an error occurs, an empty list is returned.
 
     Exceptions:
-        If an error occurs during the query, an error message is printed, and an empty 
+        If an error occurs during the query, an error is logged, and an empty 
         list is returned.
     """
     calendar_items = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM calendar_table")
-        rows = cur.fetchall()
-        for i in rows:
-            calendar = {}
-            calendar["furnace_id"] = i["furnace_id"]
-            calendar["block"] = i["block"]
-            calendar["sequence"] = i["sequence"]
-            calendar["end_time"] = i["end_time"]
-
-            calendar_items.append(calendar)
+        calendar_items = models.fetch_all(cur, models.CalendarEntry)
     except Exception as e:
-        print(f"Error while reading calendar {e}")
+        logger.error("Error while reading calendar: %s", e)
         calendar_items = []
+    finally:
+        release_db(conn)
     return calendar_items
 def read_furnaces():
     """
     Retrieve all furnaces from the 'furnaces_table' in the SQLite database.
 
     This function queries the 'furnaces_table' and retrieves all the furnace records.
-    Each record is represented as a dictionary with the following keys:
+    Each record is represented as a `models.Furnace` record with the following fields:
         - 'primary_id' (int): The unique identifier for the furnace entry.
         - 'furnace_name' (str): The name of the furnace.
         - 'recipe_key' (str): The key representing the associated recipe.
         - 'start_time' (str): The start time associated with the furnace.
 
     Returns:
-        list of dict: A list of dictionaries representing the furnaces. If an error occurs,
+        list of models.Furnace: A list of records representing the furnaces. If an error occurs,
         an empty list is returned.
 
     Exceptions:
         If an error occurs during the query, an empty list is returned.
     """
     furnaces = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM furnaces_table")
-        rows = cur.fetchall()
-        for i in rows:
-            furnace = {}
-            furnace["primary_id"] = i["primary_id"]
-            furnace["furnace_name"] = i["furnace_name"]
-            furnace["recipe_key"] = i["recipe_key"]
-            furnace["start_time"] = i["start_time"]
-            furnaces.append(furnace)
+        furnaces = models.fetch_all(cur, models.Furnace)
     except Exception as e:
         furnaces = []
+    finally:
+        release_db(conn)
     return furnaces
+@reference_cache.cached("furnace_recipes")
 def read_furnace_recipes():
     """
     Retrieve all furnace recipe entries from the 'furnace_recipe_table' lookup table in the SQLite database.
 
     This function queries the 'furnace_recipe_table' and retrieves all the furnace recipe records.
-    Each record is represented as a dictionary with the following keys:
+    Each record is represented as a `models.FurnaceRecipe` record with the following fields:
         - 'furnace' (str): The name of the furnace.
         - 'recipe' (str): The name of the associated recipe.
 
     Returns:
-        list of dict: A list of dictionaries representing the furnace recipe entries. 
+        list of models.FurnaceRecipe: A list of records representing the furnace recipe entries. 
         If an error occurs, an empty list is returned.
 
     Exceptions:
         If an error occurs during the query, an empty list is returned.
     """
     furnace_recipes = []
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
-        cur.execute("SELECT * FROM furnace_recipe_table")
-        rows = cur.fetchall()
-        for i in rows:
-            furnace_recipe = {}
-            furnace_recipe["furnace"] = i["furnace"]
-            furnace_recipe["recipe"] = i["recipe"]
-        
-            furnace_recipes.append(furnace_recipe)
+        furnace_recipes = models.fetch_all(cur, models.FurnaceRecipe)
     except Exception as e:
         furnace_recipes = []
+    finally:
+        release_db(conn)
     return furnace_recipes
 
+# Full-table reads that can be streamed: name -> model of their rows.
+STREAM_QUERIES = {
+    "calendar": models.CalendarEntry,
+    "blocks": models.Block,
+    "furnaces": models.Furnace,
+}
+
+def iter_table(name, chunk_size=1000):
+    """
+    Stream a whole table in chunks instead of loading it with fetchall().
+
+    The cursor is advanced with fetchmany(), so at most `chunk_size` rows are held in
+    memory at a time however large the table is. The pooled connection is held until the
+    generator is exhausted or closed.
+
+    Args:
+        name (str): Key of `STREAM_QUERIES` ('calendar', 'blocks' or 'furnaces').
+        chunk_size (int): Number of rows per chunk.
+
+    Yields:
+        list: The next chunk of rows, as records of the `STREAM_QUERIES` model.
+    """
+    model = STREAM_QUERIES[name]
+    build = models.row_builder(model)
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        cur.execute(models.QUERIES[model])
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield list(map(build, rows))
+    finally:
+        release_db(conn)
+
+def _window_lower_bound(cur, start):
+    """
+    Earliest start date a run can have and still reach `start`.
+
+    Runs last at most MAX(end_time) days (read through the end_time index), so only runs
+    starting after `start` minus that many days need to be checked exactly. This keeps
+    window queries to an index range scan however much history the tables hold.
+    """
+    cur.execute("SELECT MAX(end_time) FROM calendar_table")
+    longest = cur.fetchone()[0] or 0
+    return (date.fromisoformat(start) - timedelta(days=math.ceil(longest))).isoformat()
+
+def read_calendar_window(start=None, end=None, furnace_id=None, furnace_name=None, block=None, after=None, limit=None):
+    """
+    Retrieve the calendar entries matching a date window and filters, one page at a time.
+
+    A calendar entry belongs to the furnace run it references; the run covers the days from
+    its 'start_time' for 'end_time' days. Entries are returned in insertion order and paged
+    with a keyset cursor (the rowid of the last entry returned), so fetching any page costs
+    the same no matter how far into the results it is.
+
+    Args:
+        start (str): Only runs still going on or after this 'YYYY-MM-DD' date.
+        end (str): Only runs starting on or before this 'YYYY-MM-DD' date.
+        furnace_id (str): Only entries of this run ('primary_id' in 'furnaces_table').
+        furnace_name (str): Only entries of runs on this furnace.
+        block (str): Only entries of this block type, e.g. 'Running' or 'Aborted'.
+        after (int): Cursor returned with the previous page.
+        limit (int): Maximum number of entries to return; all of them if None.
+
+    Returns:
+        tuple: (entries, next cursor) where entries is a list of `models.CalendarEntry`
+        records, and the cursor is None when there are no more pages.
+
+    Exceptions:
+        If an error occurs during the query, an error is logged and an empty page
+        is returned.
+    """
+    calendar_items = []
+    next_cursor = None
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        conditions = []
+        params = []
+        join_runs = start is not None or end is not None or furnace_name is not None
+        if start is not None:
+            conditions.append("furnaces_table.start_time >= ?")
+            params.append(_window_lower_bound(cur, start))
+            conditions.append("julianday(furnaces_table.start_time) + calendar_table.end_time > julianday(?)")
+            params.append(start)
+        if end is not None:
+            conditions.append("furnaces_table.start_time <= ?")
+            params.append(end + "T99")  # include runs stored with a time after the date
+        if join_runs:
+            conditions.append("furnaces_table.start_time IS NOT NULL AND furnaces_table.start_time != ''")
+        if furnace_name is not None:
+            conditions.append("furnaces_table.furnace_name = ?")
+            params.append(furnace_name)
+        if furnace_id is not None:
+            conditions.append("calendar_table.furnace_id = ?")
+            params.append(str(furnace_id))
+        if block is not None:
+            conditions.append("calendar_table.block = ?")
+            params.append(block)
+        if after is not None:
+            conditions.append("calendar_table.rowid > ?")
+            params.append(int(after))
+        sql = "SELECT calendar_table.rowid, calendar_table.furnace_id, calendar_table.block, calendar_table.sequence, calendar_table.end_time FROM calendar_table"
+        if join_runs:
+            # CAST keeps the comparison in calendar_table.furnace_id's TEXT affinity so its index is used.
+            sql += " JOIN furnaces_table ON calendar_table.furnace_id = CAST(furnaces_table.primary_id AS TEXT)"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY calendar_table.rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit) + 1)  # one extra row tells whether another page exists
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        if limit is not None and len(rows) > int(limit):
+            rows = rows[:int(limit)]
+            next_cursor = rows[-1][0] if rows else None
+        calendar_items = [models.CalendarEntry._make(row[1:]) for row in rows]
+    except Exception as e:
+        logger.error("Error while reading calendar window: %s", e)
+        calendar_items = []
+        next_cursor = None
+    finally:
+        release_db(conn)
+    return calendar_items, next_cursor
+
+def read_furnaces_window(start=None, end=None, furnace_name=None, after=None, limit=None):
+    """
+    Retrieve the furnace runs overlapping a date window, one page at a time.
+
+    A run overlaps the window when it starts on or before `end` and its calendar (or, if it
+    has none, its recipe) makes it last until `start` or later. Runs without a start date
+    are always included so newly added furnaces still show up. Runs are paged with a keyset
+    cursor on 'primary_id'.
+
+    Args:
+        start (str): Only runs still going on or after this 'YYYY-MM-DD' date.
+        end (str): Only runs starting on or before this 'YYYY-MM-DD' date.
+        furnace_name (str): Only runs on this furnace.
+        after (int): Cursor returned with the previous page.
+        limit (int): Maximum number of runs to return; all of them if None.
+
+    Returns:
+        tuple: (furnaces, next cursor) where furnaces is a list of `models.Furnace` records,
+        and the cursor is None when there are no more pages.
+
+    Exceptions:
+        If an error occurs during the query, an error is logged and an empty page
+        is returned.
+    """
+    furnaces = []
+    next_cursor = None
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        window = []
+        params = []
+        if start is not None:
+            window.append("furnaces_table.start_time >= ?")
+            params.append(_window_lower_bound(cur, start))
+            window.append(
+                """julianday(furnaces_table.start_time) + COALESCE(
+                    (SELECT calendar_table.end_time FROM calendar_table
+                     WHERE calendar_table.furnace_id = CAST(furnaces_table.primary_id AS TEXT)
+                     ORDER BY calendar_table.rowid LIMIT 1),
+                    (SELECT recipe_table.time FROM recipe_table WHERE recipe_table.recipe_name = furnaces_table.recipe_key),
+                    0) > julianday(?)"""
+            )
+            params.append(start)
+        if end is not None:
+            window.append("furnaces_table.start_time <= ?")
+            params.append(end + "T99")
+        conditions = []
+        if window:
+            conditions.append("((" + " AND ".join(window) + ") OR furnaces_table.start_time IS NULL OR furnaces_table.start_time = '')")
+        if furnace_name is not None:
+            conditions.append("furnaces_table.furnace_name = ?")
+            params.append(furnace_name)
+        if after is not None:
+            conditions.append("furnaces_table.primary_id > ?")
+            params.append(int(after))
+        sql = "SELECT primary_id, furnace_name, recipe_key, start_time FROM furnaces_table"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY primary_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit) + 1)
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        if limit is not None and len(rows) > int(limit):
+            rows = rows[:int(limit)]
+            next_cursor = rows[-1][0] if rows else None
+        furnaces = list(map(models.row_builder(models.Furnace), rows))
+    except Exception as e:
+        logger.error("Error while reading furnaces window: %s", e)
+        furnaces = []
+        next_cursor = None
+    finally:
+        release_db(conn)
+    return furnaces, next_cursor
+
 def read_recipe_by_id(recipe_id):
     """
     Retrieve a specific recipe by its ID from the 'recipe_table' in the SQLite database. Not being used
@@ -765,24 +944,26 @@ def read_recipe_by_id(recipe_id):
         dict: A dictionary representing the recipe. If an error occurs, an empty dictionary is returned.
 
     Exceptions:
-        If an error occurs during the query, an error message is printed and an empty dictionary is returned.
+        If an error occurs during the query, an error is logged and an empty dictionary is returned.
     """
     recipe = {}
     # furnacebase()
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
         #furnacebase()
         cur.execute("SELECT * FROM recipe_table WHERE recipe_id = ?", (recipe_id,))
         row = cur.fetchone()
         recipe["recipe_id"] = row["recipe_id"]
         recipe["recipe_name"] = row["recipe_name"]
         recipe["time"] = row["time"]
-        print("Successfully read")
+        logger.debug("Successfully read", extra={"recipe_id": recipe_id})
     except Exception as e:
-        print(f"failed to read recipe by id: {e}")
+        logger.error("failed to read recipe by id: %s", e)
         recipe = {}
+    finally:
+        release_db(conn)
     return recipe
 def read_furnace_by_id(primary_id):
     """
@@ -801,23 +982,891 @@ def read_furnace_by_id(primary_id):
         dict: A dictionary representing the furnace. If an error occurs, an empty dictionary is returned.
 
     Exceptions:
-        If an error occurs during the query, an error message is printed and an empty dictionary is returned.
+        If an error occurs during the query, an error is logged and an empty dictionary is returned.
     """
     furnace = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
-        conn.row_factory = sqlite3.Row
         cur = conn.cursor()
+        cur.row_factory = sqlite3.Row
         cur.execute("SELECT * FROM furnaces_table WHERE primary_id = ?", (primary_id,))
         row = cur.fetchone()
         furnace["primary_id"] = row["primary_id"]
         furnace["recipe_name"] = row["furnace_name"]
         furnace["start_time"] = row["start_time"]
-        print("Successfully read")
+        logger.debug("Successfully read", extra={"primary_id": primary_id})
     except Exception as e:
-        print(f"failed to read furnace by id: {e}")
+        logger.error("failed to read furnace by id: %s", e)
         furnace = {}
+    finally:
+        release_db(conn)
     return furnace
+# Collections served by `read_snapshot`, keyed by the names of their GET endpoints:
+# name -> (table, read function without the reference cache)
+SNAPSHOT_COLLECTIONS = {
+    "recipes": ("recipe_table", lambda: read_recipes.__wrapped__()),
+    "furnaceRecipes": ("furnace_recipe_table", lambda: read_furnace_recipes.__wrapped__()),
+    "blocks": ("blockname_table", lambda: read_blocks()),
+    "colors": ("color_table", lambda: read_colors.__wrapped__()),
+    "calendar": ("calendar_table", lambda: read_calendar()),
+    "downreasons": ("down_table", lambda: read_down.__wrapped__()),
+    "furnaces": ("furnaces_table", lambda: read_furnaces()),
+}
+
+def read_snapshot(collections=None, calendar_window=None):
+    """
+    Read several collections in one consistent view of the database.
+
+    All reads share one pooled connection inside a single read transaction, so the result
+    reflects one committed state even while writes are happening (in WAL mode writers are
+    not blocked meanwhile). The reference cache is bypassed so every collection comes from
+    the same transaction.
+
+    Args:
+        collections (list of str): Names from `SNAPSHOT_COLLECTIONS` to include; all of them
+        if None.
+        calendar_window (dict): Optional `read_calendar_window` arguments ('start', 'end');
+        when given, the calendar collection only holds the entries of runs in that window.
+
+    Returns:
+        dict: Collection name -> list of records, as returned by the corresponding
+        read_* function.
+    """
+    names = list(SNAPSHOT_COLLECTIONS) if collections is None else list(collections)
+    snapshot = {}
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        for name in names:
+            if name == "calendar" and calendar_window:
+                snapshot[name] = read_calendar_window(**calendar_window)[0]
+            else:
+                snapshot[name] = SNAPSHOT_COLLECTIONS[name][1]()
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while reading snapshot: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    return snapshot
+
+def read_table_versions(tables):
+    """
+    Read the change counters of the given tables from 'table_version'.
+
+    Triggers bump a table's counter on every INSERT, UPDATE and DELETE, from any process,
+    so the counters change exactly when the table's contents may have changed. This is a
+    single primary-key lookup and is much cheaper than reading the tables themselves.
+
+    Args:
+        tables (iterable of str): Table names, e.g. ('calendar_table',).
+
+    Returns:
+        str: A token combining the database id and the versions of `tables`, suitable as an
+        HTTP ETag. Returns None if the counters are unavailable (schema not migrated).
+    """
+    tables = list(tables)
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        names = ["__database__"] + tables
+        cur.execute(f"SELECT table_name, version FROM table_version WHERE table_name IN ({', '.join('?' * len(names))})", names)
+        versions = dict(cur.fetchall())
+        if len(versions) != len(names):
+            return None
+        return "-".join(str(versions[name]) for name in names)
+    except Exception as e:
+        logger.error("Error while reading table versions: %s", e)
+        return None
+    finally:
+        release_db(conn)
+
+
+# Tables recorded in 'change_log' (migration 0005): table -> (collection name, model).
+CHANGE_LOG_TABLES = {
+    "recipe_table": ("recipes", models.Recipe),
+    "blockname_table": ("blocks", models.Block),
+    "furnace_recipe_table": ("furnaceRecipes", models.FurnaceRecipe),
+    "furnaces_table": ("furnaces", models.Furnace),
+    "calendar_table": ("calendar", models.CalendarEntry),
+}
+
+# Largest number of rowids bound in one "rowid IN (...)" query.
+ROWID_CHUNK = 500
+
+def _select_in(cur, sql, ids):
+    """
+    Run a query for many ids, ROWID_CHUNK at a time.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor to run the query on.
+        sql (str): Query whose '{ids}' placeholder is replaced by one parameter per id.
+        ids (iterable): The ids.
+
+    Returns:
+        list of tuple: The rows of every chunk.
+    """
+    ids = list(ids)
+    rows = []
+    for i in range(0, len(ids), ROWID_CHUNK):
+        chunk = ids[i:i + ROWID_CHUNK]
+        cur.execute(sql.format(ids=", ".join("?" * len(chunk))), chunk)
+        rows.extend(cur.fetchall())
+    return rows
+
+def _change_log_position(cur):
+    """Return (database id, latest change version, compaction floor) as of the current transaction."""
+    cur.execute("SELECT version FROM table_version WHERE table_name = '__database__'")
+    database_id = cur.fetchone()[0]
+    cur.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+    row = cur.fetchone()
+    cur.execute("SELECT floor FROM change_log_floor")
+    return database_id, row[0] if row else 0, cur.fetchone()[0]
+
+def read_changes(since=None, limit=None, database_id=None):
+    """
+    Read the rows inserted, updated and deleted since a change log version.
+
+    Triggers record every row change of the tables in `CHANGE_LOG_TABLES` in 'change_log'
+    with an increasing version. The entries after `since` are found through the version
+    primary key, and only the rows they name are read, so catching up costs time in
+    proportion to what changed rather than to the size of the tables. A row changed
+    several times is reported once, with its current contents; a row inserted and
+    deleted again since `since` is not reported at all. Everything is read in one
+    read transaction, so the rows match the returned version.
+
+    Rows are identified by rowid, and VACUUM may renumber the rowids of the tables
+    without an INTEGER PRIMARY KEY ('calendar_table', 'blockname_table' and
+    'furnace_recipe_table'). Vacuum the database with `vacuum_database`, which makes
+    every client resync, never with a plain VACUUM.
+
+    Args:
+        since (int): Version the client is in sync with; None to only get the current version.
+        limit (int): Most change log entries to read. When more are left, 'more' is True
+                     and 'version' is the version to ask from next.
+        database_id (str): Database id from the client's previous sync, if any.
+
+    Returns:
+        dict:
+            - 'database' (str): Id of the database, unique to every recreated database.
+            - 'version' (int): Version the result brings the client up to.
+            - 'resync' (bool): True when the changes are not available because `since` is
+              None, older than the last compaction, newer than the log or from another
+              database; the client must then reload every table and continue from 'version'.
+            - 'more' (bool): True if `limit` cut the changes short.
+            - 'changes' (dict): Collection name (see `CHANGE_LOG_TABLES`) -> {'inserted': [...],
+              'updated': [...], 'deleted': [rowid, ...]} for the collections with changes.
+              Inserted and updated rows are the collection's usual objects plus their 'rowid'.
+
+    Raises:
+        sqlite3.Error: If the change log cannot be read (for example before migration 0005).
+    """
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        current_id, version, floor = _change_log_position(cur)
+        result = {"database": str(current_id), "version": version, "resync": False, "more": False, "changes": {}}
+        if (since is None or since < floor or since > version
+                or (database_id is not None and database_id != result["database"])):
+            result["resync"] = True
+            conn.commit()
+            return result
+
+        sql = "SELECT version, table_name, row_id, op FROM change_log WHERE version > ? ORDER BY version"
+        params = (since,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit + 1,)
+        cur.execute(sql, params)
+        entries = cur.fetchall()
+        if limit is not None and len(entries) > limit:
+            entries = entries[:limit]
+            result["version"] = entries[-1][0]
+            result["more"] = True
+
+        # Op of each row's first entry: tells an insert from an update of a row the client has.
+        first_ops = {}
+        for _, table, row_id, op in entries:
+            first_ops.setdefault(table, {}).setdefault(row_id, op)
+
+        for table, ops in first_ops.items():
+            name, model = CHANGE_LOG_TABLES[table]
+            rows = {}
+            for row in _select_in(cur, f"SELECT rowid, {', '.join(model._fields)} FROM {table} WHERE rowid IN ({{ids}})", ops):
+                record = dict(zip(model._fields, row[1:]))
+                record["rowid"] = row[0]
+                rows[row[0]] = record
+            inserted, updated, deleted = [], [], []
+            for row_id, op in ops.items():
+                if row_id in rows:
+                    (inserted if op == "insert" else updated).append(rows[row_id])
+                elif op != "insert":
+                    deleted.append(row_id)
+            if inserted or updated or deleted:
+                result["changes"][name] = {"inserted": inserted, "updated": updated, "deleted": deleted}
+        conn.commit()
+        return result
+    except Exception as e:
+        logger.error("Error while reading changes: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+
+def compact_change_log(retain=None):
+    """
+    Remove old entries from 'change_log', keeping the newest `retain` versions.
+
+    Versions at or below the new floor are deleted with one range delete on the primary
+    key, and the floor is recorded in 'change_log_floor', so a client that last synced
+    before it gets 'resync' from `read_changes` instead of an incomplete delta.
+
+    Args:
+        retain (int): Versions to keep; `CHANGE_LOG_RETAIN` (default 100000) if None.
+
+    Returns:
+        int: The number of entries removed.
+    """
+    if retain is None:
+        retain = int(os.environ.get("CHANGE_LOG_RETAIN", 100000))
+    removed = 0
+    conn = connect_to_db()
+    try:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        _, version, floor = _change_log_position(cur)
+        horizon = version - retain
+        if horizon > floor:
+            cur.execute("DELETE FROM change_log WHERE version <= ?", (horizon,))
+            removed = cur.rowcount
+            cur.execute("UPDATE change_log_floor SET floor = ?", (horizon,))
+        conn.commit()
+        if removed:
+            logger.info("Compacted change log", extra={"removed": removed, "floor": horizon})
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error while compacting change log: %s", e)
+    finally:
+        release_db(conn)
+    return removed
+
+def vacuum_database():
+    """
+    Rebuild the database file with VACUUM, then make every client and cache reload.
+
+    'calendar_table', 'blockname_table' and 'furnace_recipe_table' have no INTEGER
+    PRIMARY KEY, so VACUUM may renumber their rowids, which the change log, clients of
+    `read_changes` and the interval index refer rows by. Afterwards the change log is
+    emptied, its floor raised to the current version and the database given a new id,
+    so clients get 'resync' (and new ETags), and the schedule cache and interval index
+    of every process rebuild on their next use. A client that syncs between the VACUUM
+    and the new id is told to resync on its following sync.
+
+    If the database was vacuumed some other way (e.g. from the sqlite3 shell), calling
+    this function afterwards restores consistency the same way.
+
+    Raises:
+        sqlite3.Error: If the database cannot be vacuumed.
+    """
+    conn = connect_to_db()
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("VACUUM")
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        _, version, _ = _change_log_position(cur)
+        cur.execute("DELETE FROM change_log")
+        cur.execute("UPDATE change_log_floor SET floor = ?", (version,))
+        cur.execute("UPDATE table_version SET version = random() & 9223372036854775807 WHERE table_name = '__database__'")
+        conn.commit()
+        logger.info("Vacuumed database, clients will resync", extra={"floor": version})
+    except Exception as e:
+        conn.rollback()
+        logger.error("Error while vacuuming database: %s", e)
+        raise
+    finally:
+        release_db(conn)
+
+_compaction_lock = threading.Lock()
+_next_compaction = 0.0
+
+def maybe_compact_change_log():
+    """
+    Run `compact_change_log` at most once every `CHANGE_LOG_COMPACT_SECONDS` (default 300)
+    per process. Cheap to call on every sync request; concurrent callers never wait.
+    """
+    global _next_compaction
+    now = time.monotonic()
+    if now < _next_compaction or not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        if now >= _next_compaction:
+            _next_compaction = now + float(os.environ.get("CHANGE_LOG_COMPACT_SECONDS", 300))
+            compact_change_log()
+    finally:
+        _compaction_lock.release()
+
+def _changed_schedule_rows(cur, since, version):
+    """
+    Find the runs and calendar entries changed between two change log versions.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the caller's read transaction.
+        since (int): Version the caller is current with.
+        version (int): Current version, from `_change_log_position`.
+
+    Returns:
+        tuple: (run_ids, calendar_rowids, calendar_runs): the rowids of the changed
+        'furnaces_table' and 'calendar_table' rows, and the runs the changed calendar
+        entries that still exist now belong to.
+    """
+    cur.execute("SELECT DISTINCT table_name, row_id FROM change_log WHERE version > ? AND version <= ? "
+                "AND table_name IN ('furnaces_table', 'calendar_table')", (since, version))
+    run_ids, calendar_rowids = set(), set()
+    for table, row_id in cur.fetchall():
+        (run_ids if table == "furnaces_table" else calendar_rowids).add(row_id)
+    calendar_runs = set()
+    for furnace_id, in _select_in(cur, "SELECT furnace_id FROM calendar_table WHERE rowid IN ({ids})", calendar_rowids):
+        if furnace_id is not None and str(furnace_id).isdigit():
+            calendar_runs.add(int(furnace_id))
+    return run_ids, calendar_rowids, calendar_runs
+
+def _recipe_entries(cur, recipe_names):
+    """
+    Read the default blocks of recipes as calendar entries, the way `create_calendar`
+    would insert them for a run.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor to read with.
+        recipe_names (iterable of str): The recipes.
+
+    Returns:
+        dict: recipe_name -> list of (block, sequence, time) ordered by sequence, with the
+        recipe's 'time' as every entry's end_time. Recipes that do not exist are missing.
+    """
+    times = dict(_select_in(cur, "SELECT recipe_name, time FROM recipe_table WHERE recipe_name IN ({ids})",
+                            {name for name in recipe_names if name is not None}))
+    entries = {name: [] for name in times}
+    for recipe_key, block, sequence in _select_in(cur, "SELECT recipe_key, block, sequence FROM blockname_table "
+                                                       "WHERE recipe_key IN ({ids}) ORDER BY sequence", times):
+        entries[recipe_key].append((block, sequence, times[recipe_key]))
+    return entries
+
+def _recipe_runs(cur, since, version):
+    """
+    Find the runs whose days depend on a recipe changed between two change log versions.
+
+    Runs without calendar entries take their blocks and length from their recipe (see
+    `_read_runs`), so any change to 'recipe_table' or 'blockname_table' may move them.
+    Recipe edits are rare, so every such run is returned rather than working out which
+    recipe the changed (possibly deleted) rows belonged to.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the caller's read transaction.
+        since (int): Version the caller is current with.
+        version (int): Current version, from `_change_log_position`.
+
+    Returns:
+        set of int: primary_ids of the runs without calendar entries, or an empty set if
+        no recipe changed.
+    """
+    cur.execute("SELECT 1 FROM change_log WHERE version > ? AND version <= ? "
+                "AND table_name IN ('recipe_table', 'blockname_table') LIMIT 1", (since, version))
+    if cur.fetchone() is None:
+        return set()
+    cur.execute("""SELECT primary_id FROM furnaces_table WHERE NOT EXISTS
+                   (SELECT 1 FROM calendar_table WHERE calendar_table.furnace_id = CAST(furnaces_table.primary_id AS TEXT))""")
+    return {primary_id for primary_id, in cur.fetchall()}
+
+def _read_runs(cur, column=None, values=()):
+    """
+    Read runs with their calendar entries, as `schedule_grid` and `interval_index` take them.
+
+    A run without calendar entries (e.g. one added through '/api/furnaces/addRow') still
+    occupies the furnace: its entries are its recipe's blocks with the recipe's 'time',
+    as `create_calendar` would insert them (see `_recipe_entries`).
+
+    Args:
+        cur (sqlite3.Cursor): Cursor to read with.
+        column (str): 'furnace_name' or 'primary_id' to read only the runs whose column is
+                      in `values`; every run if None.
+        values (iterable): Furnace names or run ids.
+
+    Returns:
+        dict: primary_id -> (furnace_name, start_time, entries, rowids), where `entries` are
+        the run's (block, sequence, end_time) in insertion order and `rowids` their rowids
+        (empty for a run whose entries come from its recipe).
+    """
+    sql = """
+        SELECT furnaces_table.primary_id, furnaces_table.furnace_name, furnaces_table.start_time,
+               furnaces_table.recipe_key,
+               calendar_table.rowid, calendar_table.block, calendar_table.sequence, calendar_table.end_time
+        FROM furnaces_table
+        LEFT JOIN calendar_table ON calendar_table.furnace_id = CAST(furnaces_table.primary_id AS TEXT)
+    """
+    order = " ORDER BY furnaces_table.primary_id, calendar_table.rowid"
+    if column is None:
+        cur.execute(sql + order)
+        rows = cur.fetchall()
+    else:
+        rows = _select_in(cur, sql + f" WHERE furnaces_table.{column} IN ({{ids}})" + order, values)
+    runs = {}
+    recipes = {}
+    for primary_id, furnace_name, start_time, recipe_key, rowid, block, sequence, end_time in rows:
+        run = runs.get(primary_id)
+        if run is None:
+            run = runs[primary_id] = (furnace_name, start_time, [], [])
+            recipes[primary_id] = recipe_key
+        if rowid is not None:
+            run[2].append((block, sequence, end_time))
+            run[3].append(rowid)
+    without_entries = [primary_id for primary_id, run in runs.items() if not run[2] and run[1]]
+    if without_entries:
+        defaults = _recipe_entries(cur, {recipes[primary_id] for primary_id in without_entries})
+        for primary_id in without_entries:
+            runs[primary_id][2].extend(defaults.get(recipes[primary_id], ()))
+    return runs
+
+def _sync_schedule_cache(cur, cache):
+    """
+    Drop the cached timelines of the furnaces changed since the cache was last synced.
+
+    The changed furnaces_table and calendar_table rows are read from the change log; a
+    timeline is dropped if it was built from one of them, or if one of them now belongs
+    to its furnace (a new run, or a run moved from another furnace). After a recipe
+    change, the timelines holding runs that take their blocks from a recipe (see
+    `_read_runs`) are dropped too.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the read transaction of the request.
+        cache (schedule_grid.ScheduleCache): The cache to sync.
+
+    Returns:
+        int: The change log version of the transaction; timelines built in it are cached
+        under that version.
+    """
+    database_id, version, floor = _change_log_position(cur)
+    with cache.lock:
+        known_id, known = cache.position()
+        if known_id != database_id or known is None or known < floor:
+            cache.reset(database_id, version)
+            return version
+        if version <= known:
+            return version
+        run_ids, calendar_rowids, calendar_runs = _changed_schedule_rows(cur, known, version)
+        names = cache.furnaces_of(run_ids, calendar_rowids)
+        names.update(name for name, in _select_in(cur, "SELECT furnace_name FROM furnaces_table WHERE primary_id IN ({ids})",
+                                                   run_ids | calendar_runs | _recipe_runs(cur, known, version)))
+        cache.invalidate(names, version, furnaces_changed=bool(run_ids))
+        return version
+
+def _furnace_names(cur, cache, version):
+    """Names of every furnace in 'furnaces_table', in the order they were first scheduled (cached)."""
+    names = cache.get_names()
+    if names is None:
+        cur.execute("SELECT furnace_name FROM furnaces_table GROUP BY furnace_name ORDER BY MIN(primary_id)")
+        names = [name for name, in cur.fetchall()]
+        cache.put_names(names, version)
+    return names
+
+def _furnace_timelines(cur, cache, version, names):
+    """
+    Return the timelines of the furnaces in `names`, building and caching the missing ones.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor inside the read transaction synced by `_sync_schedule_cache`.
+        cache (schedule_grid.ScheduleCache): The schedule cache.
+        version (int): Change log version returned by `_sync_schedule_cache`.
+        names (list of str): Furnace names.
+
+    Returns:
+        dict: Furnace name -> `schedule_grid.Timeline`.
+    """
+    timelines, missing = cache.get(names)
+    if missing:
+        runs = {name: [] for name in missing}
+        for primary_id, (name, start_time, entries, rowids) in _read_runs(cur, "furnace_name", missing).items():
+            runs[name].append((primary_id, start_time, entries, rowids))
+        for name in missing:
+            timelines[name] = schedule_grid.build_timeline(runs[name])
+            cache.put(name, timelines[name], version)
+    return timelines
+
+def read_schedule_grid(start, end, furnace_name=None):
+    """
+    Retrieve each furnace's state for every day of a date window, run-length encoded.
+
+    A furnace's timeline is worked out from its runs ('furnaces_table' start dates) and
+    their blocks ('calendar_table') by `schedule_grid.build_timeline` and kept in the
+    schedule cache until a write changes one of that furnace's runs (see
+    `_sync_schedule_cache`). The window is then cut out of each timeline with a binary
+    search, so a request costs about one cache lookup per furnace when nothing changed.
+
+    Args:
+        start (str): First day of the window, 'YYYY-MM-DD'.
+        end (str): Last day of the window, 'YYYY-MM-DD'.
+        furnace_name (str): Only this furnace; every furnace in 'furnaces_table' if None.
+
+    Returns:
+        dict:
+            - 'start', 'end' (str): The window.
+            - 'days' (int): Number of days in the window.
+            - 'furnaces' (list of dict): 'furnace_name' and 'timeline', a list of
+              [state, days, primary_id, block_day] covering the window (see
+              `schedule_grid.window_rle`), for each furnace in the order they were
+              first scheduled.
+
+    Raises:
+        sqlite3.Error: If the tables cannot be read.
+    """
+    first_day = date.fromisoformat(start).toordinal()
+    last_day = date.fromisoformat(end).toordinal()
+    cache = schedule_grid.get_cache()
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        version = _sync_schedule_cache(cur, cache)
+        names = [furnace_name] if furnace_name is not None else _furnace_names(cur, cache, version)
+        timelines = _furnace_timelines(cur, cache, version, names)
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while reading schedule grid: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    if furnace_name is not None and not timelines[furnace_name].run_ids:
+        names = []
+    return {
+        "start": start,
+        "end": end,
+        "days": last_day - first_day + 1,
+        "furnaces": [{"furnace_name": name, "timeline": schedule_grid.window_rle(timelines[name], first_day, last_day)}
+                     for name in names],
+    }
+
+def find_free_slots(recipe_name, furnace_names=None, after=None):
+    """
+    Find the earliest day each candidate furnace is free for a whole run of a recipe.
+
+    The run needs the recipe's 'time' (from 'recipe_table', rounded up to whole days) of
+    consecutive idle days. Runs without calendar entries keep their furnace busy for
+    their own recipe's blocks (see `_read_runs`), the same days the conflict check of
+    `create_furnace` counts. Each furnace's busy stretches and the sparse table of the gaps
+    between them come with its cached timeline (see `read_schedule_grid`), so each
+    furnace costs one binary search plus an O(log n) gap search
+    (`schedule_grid.earliest_start`), however many runs it has scheduled.
+
+    Args:
+        recipe_name (str): The recipe to place.
+        furnace_names (list of str): Furnaces to consider. Defaults to the furnaces
+                                     assigned this recipe in 'furnace_recipe_table', or
+                                     every furnace if none is.
+        after (str): Earliest start, 'YYYY-MM-DD'; today if None.
+
+    Returns:
+        dict: 'recipe_name', 'length' (days), 'after', 'blocks' (the recipe's blocks from
+        'blockname_table') and 'slots', a list of 'furnace_name', 'start' and 'end' (last
+        day) per furnace, earliest first, each with 'blocks': the day each block would
+        start on. None if the recipe does not exist.
+
+    Raises:
+        sqlite3.Error: If the tables cannot be read.
+    """
+    after = after or date.today().isoformat()
+    first_day = date.fromisoformat(after).toordinal()
+    cache = schedule_grid.get_cache()
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        cur.execute("SELECT time FROM recipe_table WHERE recipe_name = ?", (recipe_name,))
+        recipe = cur.fetchone()
+        if recipe is None:
+            conn.commit()
+            return None
+        length = max(1, math.ceil(recipe[0] or 0))
+        cur.execute("SELECT block, sequence FROM blockname_table WHERE recipe_key = ? ORDER BY sequence", (recipe_name,))
+        blocks = [{"block": block, "sequence": sequence} for block, sequence in cur.fetchall()]
+        version = _sync_schedule_cache(cur, cache)
+        if not furnace_names:
+            cur.execute("SELECT furnace FROM furnace_recipe_table WHERE recipe = ?", (recipe_name,))
+            furnace_names = [name for name, in cur.fetchall()] or _furnace_names(cur, cache, version)
+        furnace_names = list(dict.fromkeys(furnace_names))
+        timelines = _furnace_timelines(cur, cache, version, furnace_names)
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while finding free slots: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    slots = []
+    for name in furnace_names:
+        start = schedule_grid.earliest_start(timelines[name], first_day, length)
+        slots.append({
+            "furnace_name": name,
+            "start": date.fromordinal(start).isoformat(),
+            "end": date.fromordinal(start + length - 1).isoformat(),
+            "blocks": [{"block": block["block"], "start": date.fromordinal(start + math.floor(block["sequence"] or 0)).isoformat()}
+                       for block in blocks],
+        })
+    slots.sort(key=lambda slot: slot["start"])
+    return {"recipe_name": recipe_name, "length": length, "after": after, "blocks": blocks, "slots": slots}
+
+def _sync_interval_index(cur, index):
+    """
+    Bring the interval index up to the change log version of the current transaction:
+    build it on first use (or for a new database, or after the log was compacted past
+    it), otherwise re-read only the runs changed since it was last synced. Caller holds
+    `index.lock`.
+    """
+    database_id, version, floor = _change_log_position(cur)
+    known_id, known = index.position()
+    if not index.built or known_id != database_id or known < floor:
+        index.load(_read_runs(cur), database_id, version)
+        logger.info("Built interval index", extra={"runs": len(index.run_intervals), "intervals": index.tree.size})
+        return
+    if version <= known:
+        return
+    run_ids, calendar_rowids, calendar_runs = _changed_schedule_rows(cur, known, version)
+    changed = run_ids | calendar_runs | _recipe_runs(cur, known, version)
+    changed.update(index.calendar_runs[rowid] for rowid in calendar_rowids if rowid in index.calendar_runs)
+    index.replace_runs(changed, _read_runs(cur, "primary_id", changed), version)
+
+def _matches_state(interval, state):
+    return state is None or interval.state == state or (state == "Down" and "Down" in interval.state)
+
+def query_intervals(start, end=None, furnace_name=None, state=None):
+    """
+    Find which runs are in which block on a day or during a range of days.
+
+    Answered from the in-memory `interval_index` in O(log n + k); the index is synced
+    with the writes recorded in the change log first (see `_sync_interval_index`).
+
+    Args:
+        start (str): The day, 'YYYY-MM-DD', or the first day of the range.
+        end (str): Last day of the range, 'YYYY-MM-DD'; None for the single day `start`.
+        furnace_name (str): Only intervals of this furnace.
+        state (str): Only intervals of this block, e.g. 'Running'; 'Down' matches every
+                     Down reason.
+
+    Returns:
+        list of dict: 'furnace_name', 'primary_id', 'state', and the interval's 'start'
+        and 'end' (last day, inclusive) as 'YYYY-MM-DD', ordered by furnace and start.
+
+    Raises:
+        sqlite3.Error: If the tables cannot be read.
+    """
+    first_day = date.fromisoformat(start).toordinal()
+    last_day = date.fromisoformat(end).toordinal() if end is not None else first_day
+    index = interval_index.get_index()
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        with index.lock:
+            _sync_interval_index(cur, index)
+            if end is None:
+                found = index.stab(first_day)
+            else:
+                found = index.overlap(first_day, last_day + 1)
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while querying interval index: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    found = [interval for interval in found
+             if (furnace_name is None or interval.furnace_name == furnace_name) and _matches_state(interval, state)]
+    found.sort(key=lambda interval: (interval.furnace_name, interval.start, interval.primary_id))
+    return [{
+        "furnace_name": interval.furnace_name,
+        "primary_id": interval.primary_id,
+        "state": interval.state,
+        "start": date.fromordinal(interval.start).isoformat(),
+        "end": date.fromordinal(interval.end - 1).isoformat(),
+    } for interval in found]
+
+def _conflict_dict(conflict):
+    return {
+        "furnace_name": conflict.furnace_name,
+        "kind": conflict.kind,
+        "first": conflict.first,
+        "second": conflict.second,
+        "start": date.fromordinal(conflict.start).isoformat(),
+        "end": date.fromordinal(conflict.end - 1).isoformat(),
+    }
+
+def find_conflicts(furnace_name=None):
+    """
+    Find every pair of overlapping runs on the same furnace across the whole schedule.
+
+    The runs' intervals come from the in-memory `interval_index` (synced with the change
+    log first), and `conflicts.sweep` checks them with a sweep line in O(n log n). Runs
+    without calendar entries are checked by their recipe's blocks (see `_read_runs`).
+
+    Args:
+        furnace_name (str): Only this furnace; every furnace if None.
+
+    Returns:
+        dict: 'runs' (number of scheduled runs checked) and 'conflicts', a list of
+        'furnace_name', 'kind' ('runs_overlap' or 'down_overlaps_running'), 'first' and
+        'second' (the primary_ids of the runs, the earlier first), and 'start' and 'end'
+        (last day) of the overlap, ordered by furnace and day.
+
+    Raises:
+        sqlite3.Error: If the tables cannot be read.
+    """
+    index = interval_index.get_index()
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        cur = conn.cursor()
+        with index.lock:
+            _sync_interval_index(cur, index)
+            # The interval lists are replaced, never changed, when a run changes.
+            runs = [(run.intervals[0].furnace_name, primary_id, run.intervals)
+                    for primary_id, run in index.run_intervals.items()
+                    if run.intervals and (furnace_name is None or run.intervals[0].furnace_name == furnace_name)]
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while finding schedule conflicts: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    return {"runs": len(runs), "conflicts": [_conflict_dict(conflict) for conflict in conflicts.sweep(runs)]}
+
+def _run_conflicts(cur, furnace):
+    """
+    Find the runs `furnace` would overlap, in the caller's transaction (see
+    `check_run_conflicts`).
+
+    Returns:
+        list of dict: The conflicts as in `find_conflicts`.
+    """
+    start_time = furnace.get('start_time')
+    if not start_time:
+        return []
+    primary_id = furnace.get('primary_id')
+    primary_id = int(primary_id) if primary_id not in (None, "") else None
+    entries = None
+    if primary_id is not None:
+        run = _read_runs(cur, "primary_id", [primary_id]).get(primary_id)
+        # Only the run's own calendar entries; recipe defaults follow the new 'recipe_key'.
+        entries = run[2] if run is not None and run[3] else None
+    if not entries:
+        entries = _recipe_entries(cur, [furnace['recipe_key']]).get(furnace['recipe_key'], [])
+    segments = schedule_grid.run_segments(primary_id, start_time, entries)
+    if not segments:
+        return []
+    index = interval_index.get_index()
+    others = {}
+    with index.lock:
+        _sync_interval_index(cur, index)
+        for interval in index.overlap(segments[0].start, segments[-1].end):
+            if interval.furnace_name == furnace['furnace_name'] and interval.primary_id != primary_id:
+                others[interval.primary_id] = index.run_intervals[interval.primary_id].intervals
+    return [_conflict_dict(conflict) for conflict in conflicts.conflicts_with(furnace['furnace_name'], primary_id, segments, others)]
+
+def check_run_conflicts(furnace):
+    """
+    Find the runs a new or changed furnace run would overlap, without writing anything.
+
+    `create_furnace` and `update_furnace` run the same check inside their write
+    transaction when asked to (see their 'check_conflicts' argument).
+
+    The run's days are worked out as for every other run (see `_read_runs`): from its
+    own calendar entries when 'primary_id' names a run that has some, otherwise from
+    the blocks of its recipe ('blockname_table') and the recipe's 'time'. The other
+    runs of the furnace are then looked up with one range query on the
+    `interval_index`, so the check costs O(log n + k) and is cheap enough for every write.
+
+    Args:
+        furnace (dict): The run as sent to `create_furnace` or `update_furnace`:
+            - 'furnace_name' (str): The name of the furnace.
+            - 'recipe_key' (str): The key representing the associated recipe.
+            - 'start_time' (str): The start date; a run without one conflicts with nothing.
+            - 'primary_id' (int, optional): The run being updated, which is not compared
+              with itself.
+
+    Returns:
+        list of dict: The conflicts as in `find_conflicts`, with 'first' the checked run
+        ('primary_id', or None for a new run); empty if there are none.
+
+    Raises:
+        sqlite3.Error: If the tables cannot be read.
+    """
+    conn = connect_to_db()
+    try:
+        conn.execute("BEGIN")
+        found = _run_conflicts(conn.cursor(), furnace)
+        conn.commit()
+    except Exception as e:
+        logger.error("Error while checking run conflicts: %s", e)
+        conn.rollback()
+        raise
+    finally:
+        release_db(conn)
+    return found
+
+# Shifting one furnace run by `number` for the "addremove" action: every block gets `number`
+# added to its end_time, and every block after the first `state` block (in insertion order)
+# also gets it added to its sequence.
+#
+# When each block name occurs once per run (the normal case) that is two plain UPDATEs.
+SHIFT_END_TIMES_SQL = """
+    UPDATE calendar_table SET end_time = end_time + :number
+    WHERE furnace_id = :furnace_id AND block IS NOT NULL
+"""
+SHIFT_LATER_SEQUENCES_SQL = """
+    UPDATE calendar_table SET sequence = sequence + :number
+    WHERE furnace_id = :furnace_id AND block IS NOT NULL AND rowid > (
+        SELECT MIN(rowid) FROM calendar_table WHERE furnace_id = :furnace_id AND block = :state
+    )
+"""
+COUNT_REPEATED_BLOCKS_SQL = """
+    SELECT COUNT(block) - COUNT(DISTINCT block) FROM calendar_table WHERE furnace_id = :furnace_id
+"""
+# Rows used to be updated by block name, so when a name occurs more than once (e.g. a run
+# downed twice) every row with that name takes the values of its last occurrence. This
+# statement reproduces that in one pass; the snapshot is MATERIALIZED so the UPDATE never
+# reads rows it has already modified.
+SHIFT_CALENDAR_REPEATED_SQL = """
+    WITH ordered AS MATERIALIZED (
+        SELECT rowid AS rid, block, sequence, end_time
+        FROM calendar_table
+        WHERE furnace_id = :furnace_id
+    ),
+    target AS (
+        SELECT MIN(rid) AS rid FROM ordered WHERE block = :state
+    ),
+    last_row AS (
+        SELECT block, MAX(rid) AS rid, end_time FROM ordered GROUP BY block
+    ),
+    last_after_target AS (
+        SELECT ordered.block, MAX(ordered.rid) AS rid, ordered.sequence
+        FROM ordered, target
+        WHERE ordered.rid > target.rid
+        GROUP BY ordered.block
+    )
+    UPDATE calendar_table
+    SET end_time = last_row.end_time + :number,
+        sequence = COALESCE(
+            (SELECT last_after_target.sequence + :number FROM last_after_target
+             WHERE last_after_target.block = calendar_table.block),
+            calendar_table.sequence
+        )
+    FROM last_row
+    WHERE calendar_table.furnace_id = :furnace_id AND calendar_table.block = last_row.block
+"""
+
 def update_calendar(number, state, id, action):
     """
     Update or insert entries in the 'calendar_table' in the SQLite database.
@@ -833,52 +1882,39 @@ def update_calendar(number, state, id, action):
         action (str): The action to perform. Can be "addremove", "Down", or other values like "Aborted".
 
     Behavior:
-        - If `action` is "addremove", the function updates existing rows, modifying the `end_time`
-          and `sequence` based on the provided `number`.
+        - If `action` is "addremove", the whole run is shifted with set-based UPDATEs in one
+          transaction: every block's `end_time` grows by `number`, and the blocks after
+          `state` also have their `sequence` moved by `number`.
         - If `action` contains "Down", a new entry is inserted with the block set to the action name.
         - Otherwise, a new entry is inserted with the block set to "Aborted".
     """
+    conn = connect_to_db()
     try:
-
-        conn = connect_to_db()
         cur = conn.cursor()
-        cur.execute("SELECT * FROM calendar_table WHERE furnace_id = ?", (id,))
-        rows = cur.fetchall()
-        end_time = rows[0][3]
-
-        print("rows: ")
-        print(rows)
-        print(action)
+        logger.debug("Updating calendar", extra={"furnace_id": id, "action": action, "state": state, "number": number})
         if(action == "addremove"):
-            updated = False
-            
-            for index, row in enumerate(rows):
-                print(row)
-                block = row[1]
-                if (updated == False):
-                    if (block == state):
-                        cur.execute("UPDATE calendar_table SET end_time = ? WHERE block = ? AND furnace_id = ?", ( row[3] + int(number), state, id))
-
-                        updated = True
-                    else:
-
-                        print("hasn't reached yet")
-                        print(row[3]+ int(number))
-                        cur.execute("UPDATE calendar_table SET end_time = ? WHERE block = ? AND furnace_id = ?", ( row[3] + int(number), row[1], id))
-
-                else:
-                    cur.execute("UPDATE calendar_table SET sequence = ?,  end_time = ? WHERE block = ? AND furnace_id = ?", (int(number) + row[2] , row[3] + int(number), row[1], id))
-        elif("Down" in action):
-            cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, action, number, end_time))
-
+            params = {"furnace_id": id, "state": state, "number": int(number)}
+            cur.execute(COUNT_REPEATED_BLOCKS_SQL, params)
+            if cur.fetchone()[0]:
+                cur.execute(SHIFT_CALENDAR_REPEATED_SQL, params)
+            else:
+                cur.execute(SHIFT_END_TIMES_SQL, params)
+                cur.execute(SHIFT_LATER_SEQUENCES_SQL, params)
         else:
-            cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, "Aborted", number, end_time))
+            cur.execute("SELECT end_time FROM calendar_table WHERE furnace_id = ? ORDER BY rowid LIMIT 1", (id,))
+            end_time = cur.fetchone()[0]
+            if("Down" in action):
+                cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, action, number, end_time))
+
+            else:
+                cur.execute("INSERT INTO calendar_table (furnace_id, block, sequence, end_time) VALUES (?, ?, ?, ?)", (id, "Aborted", number, end_time))
         conn.commit()
+        events.publish("calendar.changed", {"furnace_id": str(id), "action": action})
     except Exception as e:
-        print(f"failed to update calendar: {e}")
+        logger.error("failed to update calendar: %s", e)
         conn.rollback()
     finally:
-        conn.close()
+        release_db(conn)
 def update_recipe(recipe):
     """
     Update an existing recipe in the 'recipe_table' and associated entries in the 'blockname_table' and 'furnaces_table' in the SQLite database.
@@ -902,8 +1938,8 @@ def update_recipe(recipe):
         dict: A dictionary representing the updated recipe. If an error occurs, an empty dictionary is returned.
     """
     updated_recipe = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
         cur.execute("SELECT recipe_name FROM recipe_table WHERE recipe_id = ?", (recipe['recipe_id'],))
         old_recipe_name = cur.fetchone()[0]  # Fetch the first result
@@ -914,64 +1950,83 @@ def update_recipe(recipe):
         rows = cur.fetchall()
         cur.execute("UPDATE furnaces_table SET recipe_key = ? WHERE recipe_key = ? ", ( recipe['recipe_name'], old_recipe_name))
         conn.commit()
+        reference_cache.invalidate("recipes")
+        events.publish("recipe.updated", {"recipe_id": recipe['recipe_id'], "recipe_name": recipe['recipe_name']})
         updated_recipe = read_recipe_by_id(recipe["recipe_id"])
     except Exception as e:
-        print(f"failed to update recipe: {e}")
+        logger.error("failed to update recipe: %s", e)
         conn.rollback()
         updated_recipe = {}
     finally:
-        conn.close()
+        release_db(conn)
 def update_furnace_recipe(furnaceRecipe, oldName):
-    print(furnaceRecipe)
+    logger.debug("Updating furnace recipe", extra={"furnace_recipe": furnaceRecipe, "old_name": oldName})
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
     
         cur.execute("""UPDATE furnace_recipe_table SET furnace = ?, recipe = ? WHERE furnace = ? """, (furnaceRecipe['furnace'], furnaceRecipe['recipe'], oldName))
 
         conn.commit()
+        reference_cache.invalidate("furnace_recipes")
+        events.publish("furnace_recipe.changed", {"furnace": furnaceRecipe['furnace']})
     except Exception as e:
-        print(f"failed to update furnace_recipe: {e}")
+        logger.error("failed to update furnace_recipe: %s", e)
 
         conn.rollback()
         #updated_furnace = {}
     finally:
-        conn.close()
+        release_db(conn)
 
 
 
-def update_furnace(furnace):
+def update_furnace(furnace, check_conflicts=False):
     """
-    Update an existing entry in the 'furnace_recipe_table' in the SQLite database.
+    Update an existing furnace run in the 'furnaces_table' in the SQLite database.
 
-    This function updates the furnace name and associated recipe in the 'furnace_recipe_table' based on the provided
-    new furnace and recipe details. The update is performed on the entry that matches the old furnace name.
+    This function updates the furnace name, associated recipe and start date of the run
+    that matches the given 'primary_id'.
 
     Args:
-        furnaceRecipe (dict): A dictionary containing the updated furnace recipe details. Expected keys:
-            - 'furnace' (str): The updated name of the furnace.
-            - 'recipe' (str): The updated name of the associated recipe.
-        oldName (str): The old name of the furnace to be updated.
+        furnace (dict): A dictionary containing the updated run. Expected keys:
+            - 'primary_id' (int): The run to update.
+            - 'furnace_name' (str): The updated name of the furnace.
+            - 'recipe_key' (str): The updated key of the associated recipe.
+            - 'start_time' (str): The updated start date; only 'YYYY-MM-DD' is stored.
+        check_conflicts (bool): Refuse the change if the run would then overlap another
+                                run on the same furnace (see `check_run_conflicts`), checked
+                                in the same write transaction as the update.
+
+    Returns:
+        list of dict: The conflicts that kept the run from being updated, when
+        `check_conflicts` is set; None otherwise.
 
     Exceptions:
-        If an error occurs during the update, an error message is printed, the transaction is rolled back, 
+        If an error occurs during the update, an error is logged, the transaction is rolled back, 
         and the database connection is closed after the operation is complete.
     """
-    print(furnace)
+    logger.debug("Updating furnace", extra={"furnace": furnace})
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
+        if check_conflicts:
+            cur.execute("BEGIN IMMEDIATE")
+            found = _run_conflicts(cur, furnace)
+            if found:
+                conn.rollback()
+                return found
     
         cur.execute("""UPDATE furnaces_table SET furnace_name = ?, recipe_key = ?, start_time = ? WHERE primary_id = ? """, (furnace['furnace_name'],furnace['recipe_key'], furnace['start_time'][0:10],   furnace['primary_id']))
 
         conn.commit()
+        events.publish("furnace.updated", _furnace_event(furnace['primary_id'], dict(furnace, start_time=furnace['start_time'][0:10])))
     except Exception as e:
-        print(f"failed to update furnace: {e}")
+        logger.error("failed to update furnace: %s", e)
 
         conn.rollback()
         #updated_furnace = {}
     finally:
-        conn.close()
+        release_db(conn)
     
 def update_blocks(recipe, blocks):
     """
@@ -994,26 +2049,27 @@ def update_blocks(recipe, blocks):
         - The changes are committed to the database.
     """
     updated_furnace = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cur = conn.cursor()
       
         cur.execute("DELETE FROM blockname_table WHERE recipe_key = ?", (recipe['recipe_name'],))
         cur.execute("PRAGMA foreign_keys=ON")
         
         for i in range(len(blocks)):
-            print(blocks[i])
+            logger.debug("Inserting block", extra={"block": blocks[i]})
             cur.execute("INSERT INTO blockname_table (recipe_key, block, sequence) VALUES (?, ?, ?)", (blocks[i]['recipe_key'], blocks[i]['block'], blocks[i]['sequence']))    
         conn.commit()
+        events.publish("recipe.updated", {"recipe_name": recipe['recipe_name']})
         print_database()
        
     except Exception as e:
-        print(f"failed to update blocks: {e}")
+        logger.error("failed to update blocks: %s", e)
 
         conn.rollback()
         #updated_furnace = {}
     finally:
-        conn.close()
+        release_db(conn)
 
 def delete_furnace_recipe(selected):
     """
@@ -1033,33 +2089,35 @@ def delete_furnace_recipe(selected):
         - Changes are committed to the database.
 
     Exceptions:
-        If an error occurs during the deletion, an error message is printed, the transaction is rolled back,
+        If an error occurs during the deletion, an error is logged, the transaction is rolled back,
         and the database connection is closed after the operation is complete.
     """
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cursor = conn.cursor()
      
 
         cursor.execute("DELETE from furnace_recipe_table WHERE furnace = ?", (selected,))
         cursor.execute("SELECT primary_id FROM furnaces_table WHERE furnace_name = ?", (selected,))
         primary_ids = cursor.fetchall()  # Get all primary_ids as a list of tuples
-        print(primary_ids)
         cursor.execute("DELETE from furnaces_table WHERE furnace_name = ?", (selected,))
 
       
         if primary_ids:
             # Convert the list of tuples to a flat list of primary_ids
             primary_ids = [pid[0] for pid in primary_ids]
-            print("primary_ids")
             cursor.executemany("DELETE FROM calendar_table WHERE furnace_id = ?", [(pid,) for pid in primary_ids])
-            print("success")
+            logger.debug("Deleted calendar entries of furnace", extra={"furnace": selected, "primary_ids": primary_ids})
         conn.commit()
+        reference_cache.invalidate("furnace_recipes")
+        events.publish("furnace_recipe.changed", {"furnace": selected})
+        for primary_id in primary_ids:
+            events.publish("furnace.removed", {"primary_id": primary_id})
     except Exception as e:
         conn.rollback()
-        print(f"Error while deleting furnace_recipe: {e}")
+        logger.error("Error while deleting furnace_recipe: %s", e)
     finally:
-        conn.close()
+        release_db(conn)
 
 
 def delete_recipe(recipe_id):
@@ -1083,19 +2141,18 @@ def delete_recipe(recipe_id):
         dict: A dictionary containing the status of the operation.
 
     Exceptions:
-        If an error occurs during the deletion, an error message is printed, the transaction is rolled back,
+        If an error occurs during the deletion, an error is logged, the transaction is rolled back,
         and the database connection is closed after the operation is complete.
     """
     message = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         cursor = conn.cursor()
 
         cursor.execute("SELECT recipe_name FROM recipe_table WHERE recipe_id = ?", (recipe_id,))
         result = cursor.fetchone()
         if result:
             recipe_key = result[0]
-            print(recipe_key)
             # Delete related entries from blockname_table using the fetched recipe_key
             cursor.execute("DELETE FROM blockname_table WHERE recipe_key = ?", (recipe_key,))
             
@@ -1103,15 +2160,17 @@ def delete_recipe(recipe_id):
             conn.execute("DELETE FROM recipe_table WHERE recipe_id = ?", (recipe_id,))
             
             conn.commit()
+            reference_cache.invalidate("recipes")
+            events.publish("recipe.deleted", {"recipe_id": recipe_id, "recipe_name": recipe_key})
             message["status"] = "Recipe and related blocks deleted successfully"
-            print(message["status"])
+            logger.debug(message["status"], extra={"recipe_key": recipe_key})
 
     except Exception as e:
         conn.rollback()
         message["status"] = "Cannot delete recipe"
-        print(f"Error while deleting recipe: {e}")
+        logger.error("Error while deleting recipe: %s", e)
     finally:
-        conn.close()
+        release_db(conn)
 
 def delete_furnace(primary_id):
     """
@@ -1133,37 +2192,46 @@ def delete_furnace(primary_id):
         dict: A dictionary containing the status of the operation.
 
     Exceptions:
-        If an error occurs during the deletion, an error message is printed, the transaction is rolled back,
+        If an error occurs during the deletion, an error is logged, the transaction is rolled back,
         and the database connection is closed after the operation is complete.
     """
     message = {}
+    conn = connect_to_db()
     try:
-        conn = connect_to_db()
         conn.execute("DELETE from furnaces_table WHERE primary_id = ?", (primary_id,))
         conn.execute("DELETE from calendar_table WHERE furnace_id = ?", (str(primary_id),))
 
         conn.commit()
+        events.publish("furnace.removed", {"primary_id": primary_id})
         message["status"] = "Furnace deleted successfully"
     except Exception as e:
         conn.rollback()
         message["status"] = "Cannot delete Furnace"
-        print(f"Error while deleting furnace{e}")
+        logger.error("Error while deleting furnace: %s", e)
     finally:
-        conn.close()
+        release_db(conn)
 
 
 def print_database():
+    """
+    Log every row of 'recipe_table' at DEBUG level, to check the effect of a write.
+
+    Does nothing, not even the query, unless DEBUG logging is enabled (LOG_LEVEL=DEBUG).
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     conn = connect_to_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM recipe_table")
-    items = cur.fetchall()
-    for item in items:
-        print(item)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT * FROM recipe_table")
+        logger.debug("recipe_table contents", extra={"rows": cur.fetchall()})
+    finally:
+        release_db(conn)
 
 
 def main():
-    print("main")
-    create_furnace_recipe_table()
+    logging.basicConfig(level=logging.INFO)
+    logger.info("Applied schema migrations: %s", migrate_database())
 
 if __name__ == "__main__":
     main()
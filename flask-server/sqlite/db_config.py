@@ -0,0 +1,112 @@
+import json
+import os
+
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'config_files', 'database.json')
+
+# PRAGMA name -> (environment variable, allowed values or a type to coerce to)
+PRAGMA_SETTINGS = {
+    "journal_mode": ("DB_JOURNAL_MODE", ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")),
+    "synchronous": ("DB_SYNCHRONOUS", ("OFF", "NORMAL", "FULL", "EXTRA")),
+    "cache_size": ("DB_CACHE_SIZE", int),
+    "mmap_size": ("DB_MMAP_SIZE", int),
+    "temp_store": ("DB_TEMP_STORE", ("DEFAULT", "FILE", "MEMORY")),
+    "busy_timeout": ("DB_BUSY_TIMEOUT", int),
+}
+
+# Order matters: journal_mode has to be switched before synchronous is tuned for it.
+PRAGMA_ORDER = ("journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store", "busy_timeout")
+
+
+def _coerce(name, value):
+    """
+    Validate a PRAGMA value. PRAGMA statements cannot take bound parameters, so only
+    whitelisted keywords and integers are ever interpolated into SQL.
+    """
+    allowed = PRAGMA_SETTINGS[name][1]
+    if allowed is int:
+        return int(value)
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError(f"Invalid value {value!r} for PRAGMA {name}; expected one of {', '.join(allowed)}")
+    return value
+
+
+def load_profiles(path=CONFIG_PATH):
+    """
+    Read the PRAGMA profiles from 'config_files/database.json'.
+
+    Returns:
+        tuple: (default profile name (str), profiles (dict of name -> settings dict)).
+        Both are empty if the config file is missing.
+    """
+    if not os.path.exists(path):
+        return None, {}
+    with open(path, 'r') as file:
+        config = json.load(file)
+    return config.get("profile"), config.get("profiles", {})
+
+
+def load_settings(profile=None, path=CONFIG_PATH, environ=None):
+    """
+    Resolve the PRAGMA settings for the database connections.
+
+    The profile is taken from the `profile` argument, then the `DB_PROFILE` environment
+    variable, then the config file's default. Individual settings can be overridden
+    with environment variables (`DB_JOURNAL_MODE`, `DB_SYNCHRONOUS`, `DB_CACHE_SIZE`,
+    `DB_MMAP_SIZE`, `DB_TEMP_STORE`, `DB_BUSY_TIMEOUT`).
+
+    Args:
+        profile (str): Optional profile name overriding the environment and config file.
+        path (str): Path to the JSON config file.
+        environ (dict): Environment to read overrides from, defaults to `os.environ`.
+
+    Returns:
+        dict: PRAGMA name -> validated value. PRAGMAs not mentioned anywhere are left out,
+        so SQLite keeps its own default for them.
+
+    Raises:
+        ValueError: If the profile does not exist or a value is invalid.
+    """
+    environ = os.environ if environ is None else environ
+    default_profile, profiles = load_profiles(path)
+    name = profile or environ.get("DB_PROFILE") or default_profile
+    settings = {}
+    if name:
+        if name not in profiles:
+            raise ValueError(f"Unknown database profile {name!r}; available: {', '.join(profiles)}")
+        settings.update(profiles[name])
+    for pragma, (env_var, _) in PRAGMA_SETTINGS.items():
+        if env_var in environ:
+            settings[pragma] = environ[env_var]
+    unknown = set(settings) - set(PRAGMA_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unsupported PRAGMA setting(s): {', '.join(sorted(unknown))}")
+    return {pragma: _coerce(pragma, settings[pragma]) for pragma in PRAGMA_ORDER if pragma in settings}
+
+
+def apply_pragmas(conn, settings):
+    """
+    Apply PRAGMA settings to an open connection.
+
+    Args:
+        conn (sqlite3.Connection): The connection to configure.
+        settings (dict): Output of `load_settings`.
+
+    Returns:
+        dict: The values SQLite reports back for each PRAGMA after applying it.
+    """
+    applied = {}
+    for pragma in PRAGMA_ORDER:
+        if pragma in settings:
+            row = conn.execute(f"PRAGMA {pragma}={settings[pragma]}").fetchone()
+            applied[pragma] = row[0] if row else settings[pragma]
+    return applied
+
+
+def read_pragmas(conn):
+    """
+    Returns:
+        dict: The current value of every tunable PRAGMA on the connection.
+    """
+    return {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in PRAGMA_ORDER}
@@ -0,0 +1,197 @@
+import collections
+import os
+import threading
+import time
+
+
+# Types of the events database.py publishes after committing a write, and their data:
+#   calendar.changed        'furnace_id', 'action' ('addremove', a down reason, 'abort' or 'created')
+#   furnace.added           'primary_id', 'furnace_name', 'recipe_key', 'start_time'
+#   furnace.updated         'primary_id', 'furnace_name', 'recipe_key', 'start_time'
+#   furnace.removed         'primary_id'
+#   recipe.created          'recipe_id', 'recipe_name'
+#   recipe.updated          'recipe_name' and, when the recipe row itself changed, 'recipe_id'
+#   recipe.deleted          'recipe_id', 'recipe_name'
+#   furnace_recipe.changed  'furnace'
+#   color.created           'block_name'
+#   down_reason.created     'down_name'
+# A subscriber that missed events gets one 'resync' event instead and should reload everything.
+RESYNC = "resync"
+
+Event = collections.namedtuple("Event", ["id", "type", "data", "time"])
+
+
+class Subscription:
+    """Events published since a subscriber connected, waiting to be sent to it."""
+
+    def __init__(self, bus, max_queue):
+        self.bus = bus
+        self.max_queue = max_queue
+        self.pending = collections.deque()
+        self.lagging = False
+
+    def push(self, event):
+        """Queue an event; past `max_queue` the backlog is replaced by one resync. Caller holds the bus lock."""
+        if self.lagging:
+            return
+        if len(self.pending) >= self.max_queue:
+            self.pending.clear()
+            self.pending.append(Event(event.id, RESYNC, {"reason": "subscriber fell behind"}, event.time))
+            self.lagging = True
+            return
+        self.pending.append(event)
+
+    def get(self, timeout):
+        """
+        Wait up to `timeout` seconds for events.
+
+        Returns:
+            list of Event: The queued events, oldest first; empty after a timeout.
+        """
+        with self.bus._cond:
+            if not self.pending:
+                self.bus._cond.wait_for(lambda: self.pending or self.bus._closed, timeout)
+            events = list(self.pending)
+            self.pending.clear()
+            self.lagging = False
+            return events
+
+    @property
+    def closed(self):
+        """True once the bus has been closed; `get` then returns right away."""
+        return self.bus._closed
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe for change events.
+
+    `publish` numbers events with an increasing id and keeps the last `history` of them,
+    so a subscriber that reconnects with the id of the last event it saw (the SSE
+    Last-Event-ID header) gets what it missed. Ids sent to clients are prefixed with the
+    bus' creation time (see `format_id`), so an id from before a server restart is
+    recognised and answered with a 'resync'. Each subscriber has its own queue of at
+    most `max_queue` events; one that does not keep up gets a single 'resync' event
+    instead of an unbounded backlog. Publishing never blocks on subscribers.
+
+    Events only reach subscribers of the same process: with several server processes,
+    each one only sees the writes it handled itself.
+    """
+
+    def __init__(self, history=1000, max_queue=1000):
+        self._cond = threading.Condition()
+        self._history = collections.deque(maxlen=history)
+        self._subscribers = set()
+        self._next_id = 1
+        self._closed = False
+        self.epoch = int(time.time() * 1000)
+        self.max_queue = max_queue
+        self.published = 0
+
+    def publish(self, type, data):
+        """
+        Publish an event to every subscriber.
+
+        Args:
+            type (str): Event type, e.g. 'calendar.changed'.
+            data (dict): JSON-serializable details of the change.
+
+        Returns:
+            Event: The published event.
+        """
+        with self._cond:
+            event = Event(self._next_id, type, data, time.time())
+            self._next_id += 1
+            self.published += 1
+            self._history.append(event)
+            for subscriber in self._subscribers:
+                subscriber.push(event)
+            self._cond.notify_all()
+        return event
+
+    def format_id(self, event):
+        """Return the id of `event` as sent to clients: '<epoch>-<id>'."""
+        return f"{self.epoch}-{event.id}"
+
+    def subscribe(self, last_event_id=None):
+        """
+        Start receiving events.
+
+        Args:
+            last_event_id (str): Id (from `format_id`) of the last event the client has
+                                 seen. Retained events after it are queued right away; if
+                                 some were already dropped from the history, or the id is
+                                 from another bus (a server restart), a 'resync' is queued.
+
+        Returns:
+            Subscription: Call `get` to receive events and `close` when done.
+        """
+        subscription = Subscription(self, self.max_queue)
+        with self._cond:
+            if last_event_id is not None:
+                epoch, _, number = last_event_id.partition("-")
+                last = int(number) if epoch == str(self.epoch) and number.isdigit() else None
+                oldest = self._history[0].id if self._history else self._next_id
+                if last is None or last >= self._next_id or last + 1 < oldest:
+                    subscription.push(Event(self._next_id - 1, RESYNC, {"reason": "missed events are no longer available"}, time.time()))
+                else:
+                    for event in self._history:
+                        if event.id > last:
+                            subscription.push(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._cond:
+            self._subscribers.discard(subscription)
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'subscribers', 'published' and 'last_event_id'.
+        """
+        with self._cond:
+            return {"subscribers": len(self._subscribers), "published": self.published, "last_event_id": self._next_id - 1}
+
+    def close(self):
+        """Wake every waiting subscriber so streams can end."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """
+    Return the process-wide event bus, creating it on first use. `EVENTS_HISTORY` and
+    `EVENTS_MAX_QUEUE` set the retained history and the per-subscriber queue length.
+    """
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                _bus = EventBus(
+                    history=int(os.environ.get("EVENTS_HISTORY", 1000)),
+                    max_queue=int(os.environ.get("EVENTS_MAX_QUEUE", 1000)),
+                )
+    return _bus
+
+
+def reset_bus():
+    """Close the process-wide bus so the next `get_bus` call builds a fresh one."""
+    global _bus
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+        _bus = None
+
+
+def publish(type, data):
+    """Publish a change event after a commit; see `EventBus.publish`."""
+    return get_bus().publish(type, data)
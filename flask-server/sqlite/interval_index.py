@@ -0,0 +1,272 @@
+"""
+In-memory interval index of the schedule: which run is in which block on which day.
+
+Every block of every run (and the day an 'Aborted' or Down entry stops a run) is an
+interval of days, worked out from 'furnaces_table' and 'calendar_table' (or the run's
+recipe when it has no calendar entries) exactly as for the schedule grid (see
+`schedule_grid.run_segments` and `database._read_runs`). `IntervalTree` is a centered
+interval tree over them, answering "what contains day D" (point stabbing) and "what
+overlaps days A to B" (range stabbing) in O(log n + k) for k results.
+
+The tree itself is static. `IntervalIndex` keeps it up to date by replacing whole runs:
+the intervals of a changed run are marked stale and its new intervals go to a small
+list that queries scan as well, and the tree is rebuilt once those make up a fraction
+of it. database.py tells the index which runs changed from the change log, so writes
+from every process are seen.
+"""
+import collections
+import os
+import threading
+
+import schedule_grid
+
+
+# Days [start, end) as day numbers (`date.toordinal()`) spent by run `primary_id` of
+# `furnace_name` in block `state`. `token` tells current intervals of a run from
+# replaced ones.
+Interval = collections.namedtuple("Interval", ["start", "end", "state", "primary_id", "furnace_name", "token"])
+
+
+class IntervalTree:
+    """
+    Static centered interval tree over half-open intervals.
+
+    Each node holds the intervals containing its center, sorted by start and by end;
+    intervals entirely before the center go to the left subtree, entirely after it to
+    the right one. Centers are medians of the interval starts, so every node holds at
+    least one interval and the depth is O(log n).
+    """
+
+    def __init__(self, intervals):
+        self.size = len(intervals)
+        self.root = self._build(sorted(intervals, key=lambda interval: interval.start))
+
+    def _build(self, intervals):
+        # Nodes are lists: [center, by_start, by_end, left, right].
+        if not intervals:
+            return None
+        center = intervals[len(intervals) // 2].start
+        left, here, right = [], [], []
+        for interval in intervals:
+            if interval.end <= center:
+                left.append(interval)
+            elif interval.start > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        by_end = sorted(here, key=lambda interval: interval.end, reverse=True)
+        # `intervals` is sorted by start, so are `left`, `here` and `right`.
+        return [center, here, by_end, self._build(left), self._build(right)]
+
+    def stab(self, day):
+        """Yield the intervals containing `day`."""
+        node = self.root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if day < center:
+                for interval in by_start:
+                    if interval.start > day:
+                        break
+                    yield interval
+                node = left
+            elif day > center:
+                for interval in by_end:
+                    if interval.end <= day:
+                        break
+                    yield interval
+                node = right
+            else:
+                yield from by_start
+                return
+
+    def overlap(self, start, end):
+        """Yield the intervals overlapping days [start, end)."""
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+            if end <= center:
+                for interval in by_start:
+                    if interval.start >= end:
+                        break
+                    yield interval
+                stack.append(left)
+            elif start > center:
+                for interval in by_end:
+                    if interval.end <= start:
+                        break
+                    yield interval
+                stack.append(right)
+            else:
+                yield from by_start
+                stack.append(left)
+                stack.append(right)
+
+
+class IntervalIndex:
+    """
+    An `IntervalTree` of every run's intervals, updated a run at a time.
+
+    `replace_runs` retires a run's intervals by giving the run a new token, and keeps
+    its new intervals in a pending list until the next rebuild. Queries search the tree
+    and the pending list and drop intervals whose token is no longer current. The tree
+    is rebuilt when pending and retired intervals exceed `rebuild_fraction` of it (at
+    least `min_rebuild`), which keeps both the scan and the rebuild cost amortized.
+
+    Like `schedule_grid.ScheduleCache`, the index records the change log version it is
+    current with; callers hold `lock` while syncing and querying.
+    """
+
+    def __init__(self, rebuild_fraction=0.1, min_rebuild=512):
+        self.lock = threading.Lock()
+        self.rebuild_fraction = rebuild_fraction
+        self.min_rebuild = min_rebuild
+        self.tree = IntervalTree([])
+        self.pending = []
+        self.stale = 0
+        self.tokens = {}
+        self.run_intervals = {}
+        self.calendar_runs = {}
+        self.database_id = None
+        self.version = None
+        self.built = False
+        self.rebuilds = 0
+        self.queries = 0
+        self._next_token = 1
+
+    def position(self):
+        """Return (database id, change log version) the index is current with."""
+        return self.database_id, self.version
+
+    def load(self, runs, database_id, version):
+        """
+        Replace the whole index.
+
+        Args:
+            runs (dict): primary_id -> (furnace_name, start_time, entries, rowids), with
+                         `entries` as in `schedule_grid.run_segments`.
+            database_id (int): Id of the database the runs were read from.
+            version (int): Change log version the runs were read at.
+        """
+        self.tokens.clear()
+        self.run_intervals.clear()
+        self.calendar_runs.clear()
+        self.pending = []
+        self.stale = 0
+        for primary_id, run in runs.items():
+            self._add_run(primary_id, run)
+        self.database_id = database_id
+        self.version = version
+        self.built = True
+        self._rebuild()
+
+    def replace_runs(self, run_ids, runs, version):
+        """
+        Replace the intervals of the runs in `run_ids` with those in `runs`.
+
+        Args:
+            run_ids (iterable of int): Runs that changed; those missing from `runs` were deleted.
+            runs (dict): The current state of the changed runs, as in `load`.
+            version (int): Change log version the runs were read at.
+        """
+        for primary_id in run_ids:
+            old = self.run_intervals.pop(primary_id, None)
+            if old is not None:
+                self.stale += len(old.intervals)
+                for rowid in old.rowids:
+                    self.calendar_runs.pop(rowid, None)
+            self.tokens.pop(primary_id, None)
+            if primary_id in runs:
+                self.pending.extend(self._add_run(primary_id, runs[primary_id]))
+        self.version = version
+        if len(self.pending) + self.stale > max(self.min_rebuild, self.rebuild_fraction * self.tree.size):
+            self._rebuild()
+
+    def _add_run(self, primary_id, run):
+        furnace_name, start_time, entries, rowids = run
+        token = self._next_token
+        self._next_token += 1
+        self.tokens[primary_id] = token
+        intervals = [Interval(segment.start, segment.end, segment.state, primary_id, furnace_name, token)
+                     for segment in schedule_grid.run_segments(primary_id, start_time, entries)]
+        self.run_intervals[primary_id] = _Run(intervals, rowids)
+        for rowid in rowids:
+            self.calendar_runs[rowid] = primary_id
+        return intervals
+
+    def _rebuild(self):
+        self.tree = IntervalTree([interval for run in self.run_intervals.values() for interval in run.intervals])
+        self.pending = []
+        self.stale = 0
+        self.rebuilds += 1
+
+    def _current(self, interval):
+        return self.tokens.get(interval.primary_id) == interval.token
+
+    def stab(self, day):
+        """
+        Returns:
+            list of Interval: Current intervals containing `day`.
+        """
+        self.queries += 1
+        found = [interval for interval in self.tree.stab(day) if self._current(interval)]
+        found.extend(interval for interval in self.pending
+                     if interval.start <= day < interval.end and self._current(interval))
+        return found
+
+    def overlap(self, start, end):
+        """
+        Returns:
+            list of Interval: Current intervals overlapping days [start, end).
+        """
+        self.queries += 1
+        found = [interval for interval in self.tree.overlap(start, end) if self._current(interval)]
+        found.extend(interval for interval in self.pending
+                     if interval.start < end and interval.end > start and self._current(interval))
+        return found
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'built', 'runs', 'intervals' (in the tree), 'pending', 'stale',
+            'version', 'rebuilds' and 'queries'.
+        """
+        with self.lock:
+            return {
+                "built": self.built,
+                "runs": len(self.run_intervals),
+                "intervals": self.tree.size,
+                "pending": len(self.pending),
+                "stale": self.stale,
+                "version": self.version,
+                "rebuilds": self.rebuilds,
+                "queries": self.queries,
+            }
+
+
+_Run = collections.namedtuple("_Run", ["intervals", "rowids"])
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return the process-wide interval index, creating it (empty) on first use; it is
+    filled on the first query. `INTERVAL_REBUILD_FRACTION` sets `rebuild_fraction`.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = IntervalIndex(rebuild_fraction=float(os.environ.get("INTERVAL_REBUILD_FRACTION", 0.1)))
+    return _index
+
+
+def reset_index():
+    """Drop the process-wide index so the next `get_index` call starts a fresh one."""
+    global _index
+    with _index_lock:
+        _index = None
@@ -0,0 +1,162 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+Migrations are the numbered '.sql' files in 'sqlite/migrations' (for example
+'0002_lookup_indexes.sql') and are applied in order. The versions that have been
+applied are recorded in the 'schema_version' table, so each script runs exactly once
+per database.
+
+Usage:
+    python sqlite/migrate.py [--db path/to/recipe_table.db] [--status]
+"""
+import argparse
+import os
+import re
+import sqlite3
+
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """
+    Find the migration scripts in a directory.
+
+    Returns:
+        list of tuple: (version (int), name (str), path (str)) sorted by version.
+
+    Raises:
+        ValueError: If two scripts share a version number.
+    """
+    migrations = {}
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {filename} and {os.path.basename(migrations[version][2])}")
+        migrations[version] = (version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def split_statements(sql):
+    """
+    Split a migration script into single statements.
+
+    `sqlite3.Connection.executescript` always commits first, which would break applying
+    a migration and its 'schema_version' row in one transaction, so statements are run
+    one at a time instead. `sqlite3.complete_statement` keeps CREATE TRIGGER bodies intact.
+    """
+    statements = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statement = buffer.strip()
+            if statement.strip(";").strip():
+                statements.append(statement)
+            buffer = ""
+    leftover = "\n".join(line for line in buffer.splitlines() if not line.strip().startswith("--"))
+    if leftover.strip():
+        raise ValueError(f"Incomplete SQL statement at end of migration: {buffer.strip()[:80]}")
+    return statements
+
+
+def applied_versions(conn):
+    """
+    Returns:
+        set of int: Versions recorded in 'schema_version' (empty if the table is missing).
+    """
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return set()
+    return {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+
+
+def migrate(conn, directory=MIGRATIONS_DIR):
+    """
+    Apply every pending migration.
+
+    All pending scripts run inside one BEGIN IMMEDIATE transaction, so several server
+    processes starting at the same time cannot apply the same script twice, and a failing
+    script leaves the schema untouched.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database to migrate.
+        directory (str): Folder containing the migration scripts.
+
+    Returns:
+        list of int: The versions applied by this call.
+    """
+    migrations = list_migrations(directory)
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # manage the transaction explicitly
+    applied = []
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY NOT NULL,
+                    name text NOT NULL,
+                    applied_at text NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            done = applied_versions(conn)
+            for version, name, path in migrations:
+                if version in done:
+                    continue
+                with open(path, 'r') as file:
+                    statements = split_statements(file.read())
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+                applied.append(version)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    """
+    Returns:
+        list of dict: One entry per migration script with 'version', 'name' and 'applied' keys.
+    """
+    done = applied_versions(conn)
+    return [
+        {"version": version, "name": name, "applied": version in done}
+        for version, name, _ in list_migrations(directory)
+    ]
+
+
+def main():
+    import connection_pool
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=connection_pool.default_database_path(), help="database file to migrate")
+    parser.add_argument("--status", action="store_true", help="only list migrations and whether they are applied")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        if not args.status:
+            applied = migrate(conn)
+            print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+        for entry in status(conn):
+            print(f"{entry['version']:04d} {entry['name']:<32} {'applied' if entry['applied'] else 'pending'}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+-- Baseline schema. Every statement is IF NOT EXISTS so databases created before
+-- migrations existed (by the old create_*_table functions) are adopted as-is.
+
+-- Recipes, their names and their lengths.
+--   recipe_id: unique identifier for each recipe.
+--   recipe_name: name of the recipe, must be unique.
+--   time: length of the recipe.
+CREATE TABLE IF NOT EXISTS recipe_table (
+    recipe_id INTEGER PRIMARY KEY NOT NULL,
+    recipe_name text UNIQUE,
+    time real
+);
+
+-- Colors for each block (Starting, Preparing, etc.). Currently not used by the client.
+CREATE TABLE IF NOT EXISTS color_table (
+    block_name text UNIQUE,
+    color text
+);
+
+-- The blocks of each recipe before any in-row modifications are made to it.
+--   recipe_key: references recipe_table.recipe_name.
+--   block: references color_table.block_name.
+--   sequence: sequence number of this block in the recipe.
+CREATE TABLE IF NOT EXISTS blockname_table (
+    recipe_key text,
+    block text,
+    sequence real,
+    FOREIGN KEY (recipe_key) REFERENCES recipe_table (recipe_name),
+    FOREIGN KEY (block) REFERENCES color_table (block_name)
+);
+
+-- Down reasons, each corresponding to a color in color_table.
+CREATE TABLE IF NOT EXISTS down_table (
+    down_name text,
+    FOREIGN KEY (down_name) REFERENCES color_table (block_name)
+);
+
+-- Lookup table with a one to one connection between furnace and recipe.
+CREATE TABLE IF NOT EXISTS furnace_recipe_table (
+    furnace text UNIQUE,
+    recipe text,
+    FOREIGN KEY (recipe) REFERENCES recipe_table (recipe_name)
+);
+
+-- Scheduled furnace runs.
+--   primary_id: unique identifier for each furnace entry.
+--   furnace_name: name of the furnace.
+--   start_time: start date of the run.
+--   recipe_key: references recipe_table.recipe_name.
+CREATE TABLE IF NOT EXISTS furnaces_table (
+    primary_id INTEGER PRIMARY KEY NOT NULL,
+    furnace_name text,
+    start_time DATE,
+    recipe_key text,
+    FOREIGN KEY (recipe_key) REFERENCES recipe_table (recipe_name)
+);
+
+-- The blocks shown on the calendar. Adding/removing, aborting and downing processes
+-- all reflect here, linked to the run through furnace_id.
+--   furnace_id: references furnaces_table.primary_id.
+--   block: references color_table.block_name.
+--   sequence: sequence index for scheduling.
+--   end_time: length of the recipe.
+CREATE TABLE IF NOT EXISTS calendar_table (
+    furnace_id text,
+    block text,
+    sequence real,
+    end_time real,
+    FOREIGN KEY (furnace_id) REFERENCES furnaces_table (primary_id),
+    FOREIGN KEY (block) REFERENCES color_table (block_name)
+);
@@ -0,0 +1,15 @@
+-- Indexes for the lookups database.py runs on every write.
+
+-- update_calendar: WHERE furnace_id = ? and WHERE block = ? AND furnace_id = ?
+-- delete_furnace / delete_furnace_recipe: DELETE ... WHERE furnace_id = ?
+CREATE INDEX IF NOT EXISTS idx_calendar_furnace_block ON calendar_table (furnace_id, block);
+
+-- update_recipe / update_blocks / delete_recipe: WHERE recipe_key = ?
+CREATE INDEX IF NOT EXISTS idx_blockname_recipe_sequence ON blockname_table (recipe_key, sequence);
+
+-- create_calendar: WHERE start_time = ? AND furnace_name = ?
+-- create_empty_calendar / delete_furnace_recipe: WHERE furnace_name = ?
+CREATE INDEX IF NOT EXISTS idx_furnaces_name_start ON furnaces_table (furnace_name, start_time);
+
+-- update_recipe: UPDATE furnaces_table ... WHERE recipe_key = ?
+CREATE INDEX IF NOT EXISTS idx_furnaces_recipe ON furnaces_table (recipe_key);
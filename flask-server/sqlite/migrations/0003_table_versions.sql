@@ -0,0 +1,125 @@
+-- Change counters for cheap cache validation (HTTP ETags).
+--
+-- table_version holds one row per table whose version is bumped by triggers on every
+-- INSERT, UPDATE and DELETE, no matter which process or connection made the change.
+-- The '__database__' row holds a random id chosen when the counters were created, so
+-- ETags from a replaced or recreated database never match the old ones.
+CREATE TABLE IF NOT EXISTS table_version (
+    table_name text PRIMARY KEY NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('__database__', random() & 9223372036854775807);
+
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('recipe_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('color_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('blockname_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('down_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('furnace_recipe_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('furnaces_table', 0);
+INSERT OR IGNORE INTO table_version (table_name, version) VALUES ('calendar_table', 0);
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_version_insert AFTER INSERT ON recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_version_update AFTER UPDATE ON recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_version_delete AFTER DELETE ON recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS color_table_version_insert AFTER INSERT ON color_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'color_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS color_table_version_update AFTER UPDATE ON color_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'color_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS color_table_version_delete AFTER DELETE ON color_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'color_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_version_insert AFTER INSERT ON blockname_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'blockname_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_version_update AFTER UPDATE ON blockname_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'blockname_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_version_delete AFTER DELETE ON blockname_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'blockname_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS down_table_version_insert AFTER INSERT ON down_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'down_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS down_table_version_update AFTER UPDATE ON down_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'down_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS down_table_version_delete AFTER DELETE ON down_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'down_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_version_insert AFTER INSERT ON furnace_recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnace_recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_version_update AFTER UPDATE ON furnace_recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnace_recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_version_delete AFTER DELETE ON furnace_recipe_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnace_recipe_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_version_insert AFTER INSERT ON furnaces_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnaces_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_version_update AFTER UPDATE ON furnaces_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnaces_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_version_delete AFTER DELETE ON furnaces_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'furnaces_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_version_insert AFTER INSERT ON calendar_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'calendar_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_version_update AFTER UPDATE ON calendar_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'calendar_table';
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_version_delete AFTER DELETE ON calendar_table
+BEGIN
+    UPDATE table_version SET version = version + 1 WHERE table_name = 'calendar_table';
+END;
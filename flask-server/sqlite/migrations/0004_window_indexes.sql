@@ -0,0 +1,7 @@
+-- Indexes for date-window queries (read_calendar_window / read_furnaces_window).
+
+-- Runs overlapping a window are found by a range scan on their start date.
+CREATE INDEX IF NOT EXISTS idx_furnaces_start ON furnaces_table (start_time);
+
+-- MAX(end_time) bounds how far before the window a run can start and still overlap it.
+CREATE INDEX IF NOT EXISTS idx_calendar_end_time ON calendar_table (end_time);
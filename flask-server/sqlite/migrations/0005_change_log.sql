@@ -0,0 +1,105 @@
+-- Row-level change log for incremental sync ('/api/changes').
+--
+-- Triggers append one entry per inserted, updated or deleted row of the tables the
+-- scheduler keeps locally. 'version' is AUTOINCREMENT, so it only ever grows, even after
+-- old entries are removed. Rows are identified by their rowid, which is the primary key
+-- of furnaces_table and recipe_table. An UPDATE that changes a rowid also logs a
+-- 'delete' of the old one. The other tables have no INTEGER PRIMARY KEY, so VACUUM may
+-- renumber their rowids: vacuum through database.vacuum_database(), which empties the
+-- log, raises the floor and gives the database a new id so every client resyncs.
+--   table_name: table of the changed row.
+--   row_id: rowid of the changed row.
+--   op: 'insert', 'update' or 'delete'.
+CREATE TABLE IF NOT EXISTS change_log (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name text NOT NULL,
+    row_id INTEGER NOT NULL,
+    op text NOT NULL
+);
+
+-- Highest version removed by compaction; clients that synced before it must reload.
+CREATE TABLE IF NOT EXISTS change_log_floor (
+    floor INTEGER NOT NULL
+);
+
+INSERT INTO change_log_floor (floor) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM change_log_floor);
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_change_insert AFTER INSERT ON recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('recipe_table', NEW.rowid, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_change_update AFTER UPDATE ON recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) SELECT 'recipe_table', OLD.rowid, 'delete' WHERE OLD.rowid <> NEW.rowid;
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('recipe_table', NEW.rowid, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS recipe_table_change_delete AFTER DELETE ON recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('recipe_table', OLD.rowid, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_change_insert AFTER INSERT ON blockname_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('blockname_table', NEW.rowid, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_change_update AFTER UPDATE ON blockname_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) SELECT 'blockname_table', OLD.rowid, 'delete' WHERE OLD.rowid <> NEW.rowid;
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('blockname_table', NEW.rowid, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS blockname_table_change_delete AFTER DELETE ON blockname_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('blockname_table', OLD.rowid, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_change_insert AFTER INSERT ON furnace_recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnace_recipe_table', NEW.rowid, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_change_update AFTER UPDATE ON furnace_recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) SELECT 'furnace_recipe_table', OLD.rowid, 'delete' WHERE OLD.rowid <> NEW.rowid;
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnace_recipe_table', NEW.rowid, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnace_recipe_table_change_delete AFTER DELETE ON furnace_recipe_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnace_recipe_table', OLD.rowid, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_change_insert AFTER INSERT ON furnaces_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnaces_table', NEW.rowid, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_change_update AFTER UPDATE ON furnaces_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) SELECT 'furnaces_table', OLD.rowid, 'delete' WHERE OLD.rowid <> NEW.rowid;
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnaces_table', NEW.rowid, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS furnaces_table_change_delete AFTER DELETE ON furnaces_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('furnaces_table', OLD.rowid, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_change_insert AFTER INSERT ON calendar_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('calendar_table', NEW.rowid, 'insert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_change_update AFTER UPDATE ON calendar_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) SELECT 'calendar_table', OLD.rowid, 'delete' WHERE OLD.rowid <> NEW.rowid;
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('calendar_table', NEW.rowid, 'update');
+END;
+
+CREATE TRIGGER IF NOT EXISTS calendar_table_change_delete AFTER DELETE ON calendar_table
+BEGIN
+    INSERT INTO change_log (table_name, row_id, op) VALUES ('calendar_table', OLD.rowid, 'delete');
+END;
@@ -0,0 +1,134 @@
+"""
+Typed row models for the read_* functions in database.py.
+
+Each model is a namedtuple whose fields are the JSON keys the API has always sent, in
+the order of the matching `SELECT` in `QUERIES`. Rows are turned into models straight
+from the tuples sqlite3 returns (see `fetch_all`), which is one small allocation per row
+instead of a `sqlite3.Row` plus a hand-filled dict. Records are immutable, so lists of
+them can be shared safely by the reference cache.
+
+`jsonify` would encode a namedtuple as a JSON array, so responses go through `to_json`
+first to get the usual list of objects, or through `to_columns` for the compact
+columnar format.
+"""
+import functools
+from collections import namedtuple
+from operator import itemgetter
+
+
+Recipe = namedtuple("Recipe", ("recipe_id", "recipe_name", "time"))
+Block = namedtuple("Block", ("recipe_key", "block", "sequence"))
+Color = namedtuple("Color", ("block_name", "color"))
+DownReason = namedtuple("DownReason", ("down_name",))
+FurnaceRecipe = namedtuple("FurnaceRecipe", ("furnace", "recipe"))
+Furnace = namedtuple("Furnace", ("primary_id", "furnace_name", "recipe_key", "start_time"))
+CalendarEntry = namedtuple("CalendarEntry", ("furnace_id", "block", "sequence", "end_time"))
+
+# Full-table query of each model, selecting its fields in order.
+QUERIES = {
+    Recipe: "SELECT recipe_id, recipe_name, time FROM recipe_table",
+    Block: "SELECT recipe_key, block, sequence FROM blockname_table",
+    Color: "SELECT block_name, color FROM color_table",
+    DownReason: "SELECT down_name FROM down_table",
+    FurnaceRecipe: "SELECT furnace, recipe FROM furnace_recipe_table",
+    Furnace: "SELECT primary_id, furnace_name, recipe_key, start_time FROM furnaces_table",
+    CalendarEntry: "SELECT furnace_id, block, sequence, end_time FROM calendar_table",
+}
+
+MODELS = tuple(QUERIES)
+
+
+def row_builder(model):
+    """
+    Return a function turning one plain row tuple into a `model` record.
+
+    The builder is `tuple.__new__` bound to the model, so mapping it over fetched rows
+    runs entirely in C with no Python frame per row. It skips namedtuple's length check;
+    the queries in `QUERIES` select exactly the model's fields.
+    """
+    return functools.partial(tuple.__new__, model)
+
+
+def fetch_all(cur, model, sql=None, params=()):
+    """
+    Run a query and return every row as a `model` record.
+
+    Args:
+        cur (sqlite3.Cursor): Cursor without a row_factory.
+        model (type): One of the models above.
+        sql (str): Query selecting the model's fields in order; `QUERIES[model]` if None.
+        params (tuple): Query parameters.
+
+    Returns:
+        list: The records, in query order.
+    """
+    cur.execute(QUERIES[model] if sql is None else sql, params)
+    return list(map(row_builder(model), cur.fetchall()))
+
+
+def to_json(value):
+    """
+    Convert records (and lists or dicts holding them) into JSON-serializable dicts.
+    Anything else is returned unchanged. Lists are expected to hold items of one kind,
+    so only the first item is inspected.
+    """
+    if isinstance(value, list):
+        if not value:
+            return value
+        if isinstance(value[0], MODELS):
+            fields = value[0]._fields
+            return [dict(zip(fields, record)) for record in value]
+        if isinstance(value[0], (list, dict)):
+            return [to_json(item) for item in value]
+        return value
+    if isinstance(value, dict):
+        return {key: to_json(item) for key, item in value.items()}
+    if isinstance(value, MODELS):
+        return dict(zip(value._fields, value))
+    return value
+
+
+def dictionary_encode(values):
+    """
+    Replace each value by its index in a table of the distinct values.
+
+    Returns:
+        tuple: (codes, table) with `table[codes[i]] == values[i]`; the table is in order
+        of first appearance.
+    """
+    index = {}
+    codes = [index.setdefault(value, len(index)) for value in values]
+    return codes, list(index)
+
+
+def to_columns(chunks, model, dictionary=()):
+    """
+    Convert records to the columnar wire format: one array per field instead of one
+    object per row, so field names are sent once rather than once per row.
+
+    Records are consumed a chunk at a time and only their values are kept, so a whole
+    table can be converted straight from `database.iter_table` without first holding
+    every record in memory.
+
+    Args:
+        chunks (iterable of list): Lists of `model` records, e.g. `[records]` or the
+                                   chunks of `database.iter_table`.
+        model (type): The records' model, which gives the column names.
+        dictionary (tuple of str): Fields with few distinct values (such as block names)
+                                   to send as indexes into a table of those values.
+
+    Returns:
+        dict: {'length': number of rows,
+               'columns': field -> list of values (indexes for dictionary-encoded fields),
+               'dictionaries': field -> list of distinct values}.
+    """
+    getters = [itemgetter(i) for i in range(len(model._fields))]
+    columns = [[] for _ in getters]
+    for chunk in chunks:
+        for column, getter in zip(columns, getters):
+            column.extend(map(getter, chunk))
+    columns = dict(zip(model._fields, columns))
+    dictionaries = {}
+    for field in dictionary:
+        columns[field], dictionaries[field] = dictionary_encode(columns[field])
+    return {"length": len(columns[model._fields[0]]), "columns": columns, "dictionaries": dictionaries}
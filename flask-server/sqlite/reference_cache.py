@@ -0,0 +1,158 @@
+import functools
+import os
+import sqlite3
+import threading
+
+import connection_pool
+
+
+class ReferenceCache:
+    """
+    In-process cache for the small reference tables (recipes, colors, down reasons,
+    furnace recipes) that the client reloads on every page but that almost never change.
+
+    Entries are dropped in two ways:
+        - Explicitly, by the create_*/update_*/delete_* functions in database.py right
+          after they commit a change to the cached table.
+        - Implicitly, when another connection (another worker process, or another pooled
+          connection in this one) commits anything. Before each lookup the cache asks a
+          dedicated watcher connection for `PRAGMA data_version`, which SQLite bumps
+          whenever a different connection has committed to the database file. The watcher
+          never writes, so every commit by anyone else is seen.
+
+    Cached values are shared between callers and must not be modified.
+    """
+
+    def __init__(self, database, enabled=True):
+        """
+        Args:
+            database (str): Path to the SQLite database file to watch.
+            enabled (bool): When False every lookup goes straight to the loader.
+        """
+        self.database = database
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        self._watch_conn = None
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_external_writes(self):
+        """Clear every entry if the database changed since the last check. Caller holds the lock."""
+        if self._watch_conn is None:
+            self._watch_conn = sqlite3.connect(self.database, check_same_thread=False)
+        data_version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._data_version:
+            self._data_version = data_version
+            self._entries.clear()
+            self._generation += 1
+
+    def get(self, key, loader):
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+
+        Empty results are not cached: the read_* functions return an empty list when a
+        query fails, and such an error must not stick until the next write.
+
+        Args:
+            key (str): Name of the cached collection, e.g. 'recipes'.
+            loader (callable): Zero-argument function that reads the collection.
+        """
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            self._check_external_writes()
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+        value = loader()
+        with self._lock:
+            # Only store if nothing was invalidated while the loader ran; otherwise the
+            # value may predate that write.
+            if value and generation == self._generation:
+                self._entries[key] = value
+        return value
+
+    def invalidate(self, *keys):
+        """Drop the given entries (all entries if no key is given)."""
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'enabled', 'entries' (cached keys), 'hits' and 'misses'.
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": sorted(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def close(self):
+        with self._lock:
+            self._entries.clear()
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+            self._data_version = None
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide reference cache for the app's database, creating it on
+    first use. Set `REFERENCE_CACHE=0` to disable caching.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ReferenceCache(
+                    connection_pool.default_database_path(),
+                    enabled=os.environ.get("REFERENCE_CACHE", "1") != "0",
+                )
+    return _cache
+
+
+def reset_cache():
+    """Close the process-wide cache so the next `get_cache` call builds a fresh one."""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = None
+
+
+def cached(key):
+    """
+    Decorator caching a zero-argument read function under `key`.
+
+    The undecorated function stays available as `function.__wrapped__` for callers that
+    must read the database directly.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper():
+            return get_cache().get(key, function)
+        return wrapper
+    return decorator
+
+
+def invalidate(*keys):
+    """Drop cached entries after a write; see `ReferenceCache.invalidate`."""
+    get_cache().invalidate(*keys)
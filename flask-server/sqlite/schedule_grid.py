@@ -0,0 +1,380 @@
+"""
+Day-by-day schedule grid of the furnaces, as run-length-encoded timelines.
+
+The scheduler shows one row per furnace and one cell per day, each cell holding the
+state of the run on that furnace that day. This module works those states out once per
+furnace on the server, from the runs' start dates ('furnaces_table') and their blocks
+('calendar_table'):
+    - A run starts on the date of its 'start_time' and lasts 'end_time' days.
+    - Its blocks, in sequence order, split it into states: a block starting on day
+      'sequence' lasts until the next block starts, the last one until the run ends.
+    - An 'Aborted' or Down entry ends the run: the run shows its blocks until the day of
+      the entry's 'sequence', then the entry's state for that one day. The earliest such
+      entry counts.
+    - Where runs on the same furnace overlap, the run that started first keeps the days.
+A furnace's timeline is a sorted list of `Segment`s over absolute day numbers
+(`date.toordinal()`), so any date window is cut out of it with a binary search, and the
+result is sent as runs of equal cells instead of one cell per day.
+
+Each timeline also lists the furnace's busy stretches (touching segments joined) with a
+sparse table of the idle gaps between them, so `earliest_start` finds the first gap long
+enough for a new run in O(log n) rather than walking every gap.
+
+`ScheduleCache` keeps the timeline of each furnace until a write touches one of that
+furnace's runs or calendar entries; database.py finds those writes in the change log.
+"""
+import bisect
+import collections
+import math
+import os
+import threading
+from datetime import date
+
+
+# One stretch of days in a single state of a single run: days [start, end) as day
+# numbers, the block name, the run's primary_id and how many days of the block had
+# already passed on day `start`.
+Segment = collections.namedtuple("Segment", ["start", "end", "state", "primary_id", "block_day"])
+
+# Timeline of one furnace: its segments, their start days (for bisect), and the runs and
+# calendar rowids it was built from (to find it again when one of them changes). The busy
+# stretches are days [busy_starts[i], busy_ends[i]); `gaps` is the sparse table of
+# `gap_table` over the idle days after each stretch but the last.
+Timeline = collections.namedtuple("Timeline", ["segments", "starts", "run_ids", "calendar_rowids",
+                                               "busy_starts", "busy_ends", "gaps"])
+
+
+def is_stop(block):
+    """True for calendar entries that end a run early: 'Aborted' and the Down reasons."""
+    return block == "Aborted" or "Down" in block
+
+
+def run_segments(primary_id, start_time, entries):
+    """
+    Work out the states of one run.
+
+    Args:
+        primary_id (int): The run's id.
+        start_time (str): The run's 'start_time'; only the 'YYYY-MM-DD' part is used.
+        entries (list of tuple): The run's calendar entries as (block, sequence, end_time),
+                                 in insertion order.
+
+    Returns:
+        list of Segment: The run's segments in day order; empty if the run has no start
+        date, no length or no blocks.
+    """
+    if not start_time or not entries:
+        return []
+    try:
+        first_day = date.fromisoformat(start_time[:10]).toordinal()
+    except ValueError:
+        return []
+    length = entries[0][2]
+    blocks = sorted((sequence or 0, block) for block, sequence, _ in entries if block and not is_stop(block))
+    stops = sorted((sequence or 0, block) for block, sequence, _ in entries if block and is_stop(block))
+    if not length or not blocks:
+        return []
+    end = math.ceil(length)
+    stop = None
+    if stops and stops[0][0] < length:
+        stop = stops[0]
+        end = math.floor(stop[0])
+
+    segments = []
+    for i, (sequence, block) in enumerate(blocks):
+        block_start = 0 if i == 0 else math.ceil(sequence)
+        block_end = math.ceil(blocks[i + 1][0]) if i + 1 < len(blocks) else end
+        block_end = min(block_end, end)
+        if block_end > block_start:
+            segments.append(Segment(first_day + block_start, first_day + block_end, block, primary_id, 0))
+    if stop is not None:
+        segments.append(Segment(first_day + end, first_day + end + 1, stop[1], primary_id, 0))
+    return segments
+
+
+def build_timeline(runs):
+    """
+    Build the timeline of one furnace.
+
+    Args:
+        runs (list of tuple): The furnace's runs as (primary_id, start_time, entries,
+                              rowids): `entries` as in `run_segments`, `rowids` the
+                              calendar rowids they were read from.
+
+    Returns:
+        Timeline: Non-overlapping segments sorted by day.
+    """
+    run_list = []
+    calendar_rowids = set()
+    for primary_id, start_time, entries, rowids in runs:
+        calendar_rowids.update(rowids)
+        segments = run_segments(primary_id, start_time, entries)
+        if segments:
+            run_list.append((segments[0].start, primary_id, segments))
+    run_list.sort(key=lambda run: run[:2])
+
+    merged = []
+    covered = None
+    for _, _, segments in run_list:
+        for segment in segments:
+            if covered is not None and segment.start < covered:
+                # Overlaps an earlier run: keep only the days after it.
+                if segment.end <= covered:
+                    continue
+                segment = segment._replace(start=covered, block_day=segment.block_day + covered - segment.start)
+            merged.append(segment)
+            covered = segment.end if covered is None else max(covered, segment.end)
+    busy_starts, busy_ends = [], []
+    for segment in merged:
+        if busy_ends and busy_ends[-1] == segment.start:
+            busy_ends[-1] = segment.end
+        else:
+            busy_starts.append(segment.start)
+            busy_ends.append(segment.end)
+    gaps = gap_table([busy_starts[i + 1] - busy_ends[i] for i in range(len(busy_starts) - 1)])
+    return Timeline(merged, [segment.start for segment in merged],
+                    frozenset(primary_id for primary_id, _, _, _ in runs), frozenset(calendar_rowids),
+                    busy_starts, busy_ends, gaps)
+
+
+def gap_table(lengths):
+    """
+    Build a sparse table of range maxima: level p holds max(lengths[i:i + 2**p]) at i.
+
+    Args:
+        lengths (list of int): Gap lengths in day order.
+
+    Returns:
+        list of list: The levels, level 0 being `lengths` itself.
+    """
+    table = [lengths]
+    width = 1
+    while 2 * width <= len(lengths):
+        previous = table[-1]
+        table.append([max(previous[i], previous[i + width]) for i in range(len(previous) - width)])
+        width *= 2
+    return table
+
+
+def first_fit(table, i, length):
+    """
+    Find the first gap at or after index `i` at least `length` long, in O(log n).
+
+    From the highest level down, every stretch of 2**p gaps that is too short as a whole
+    is skipped, so the skips add up to the distance to the answer.
+
+    Returns:
+        int: Index of the gap, or None if there is none.
+    """
+    lengths = table[0]
+    for level in range(len(table) - 1, -1, -1):
+        if i < len(table[level]) and table[level][i] < length:
+            i += 1 << level
+    return i if i < len(lengths) and lengths[i] >= length else None
+
+
+def earliest_start(timeline, after, length):
+    """
+    Find the first day from `after` on where a run of `length` days fits on the furnace.
+
+    Args:
+        timeline (Timeline): From `build_timeline`.
+        after (int): Earliest day number the run may start.
+        length (int): Days the run needs.
+
+    Returns:
+        int: The day number the run can start.
+    """
+    busy_starts, busy_ends = timeline.busy_starts, timeline.busy_ends
+    # First busy stretch still going on `after` or starting later.
+    i = bisect.bisect_right(busy_ends, after)
+    if i == len(busy_ends) or busy_starts[i] - after >= length:
+        return after
+    gap = first_fit(timeline.gaps, i, length)
+    return busy_ends[gap if gap is not None else -1]
+
+
+def window_rle(timeline, first_day, last_day):
+    """
+    Cut a date window out of a timeline as runs of equal days.
+
+    Args:
+        timeline (Timeline): From `build_timeline`.
+        first_day (int): First day of the window (day number).
+        last_day (int): Last day of the window (day number), inclusive.
+
+    Returns:
+        list of list: [state, days, primary_id, block_day] items covering the window in
+        order, where `block_day` is the number of days of the block before the item's
+        first day. Days without a run are [None, days, None, None].
+    """
+    rle = []
+    day = first_day
+    end = last_day + 1
+    # The segment before the first one starting after `first_day` may still reach into the window.
+    i = max(0, bisect.bisect_right(timeline.starts, first_day) - 1)
+    segments = timeline.segments
+    while i < len(segments) and segments[i].start < end:
+        segment = segments[i]
+        i += 1
+        if segment.end <= day:
+            continue
+        if segment.start > day:
+            rle.append([None, segment.start - day, None, None])
+            day = segment.start
+        stop = min(segment.end, end)
+        rle.append([segment.state, stop - day, segment.primary_id, segment.block_day + day - segment.start])
+        day = stop
+    if day < end:
+        rle.append([None, end - day, None, None])
+    return rle
+
+
+class ScheduleCache:
+    """
+    Timelines of the furnaces, kept until a write changes one of their runs.
+
+    The cache remembers up to which change log version (see migration 0005) it is
+    current. Before each read, database.py looks up the furnaces_table and
+    calendar_table rows changed after that version and `invalidate` drops only the
+    timelines built from them, or of the furnaces the changed rows now belong to. Writes from other processes are in the
+    change log too, so they are seen the same way. A new database id, or a version
+    before the log's compaction floor, clears everything.
+
+    Timelines are shared between callers and must not be modified.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self._timelines = {}
+        self._names = None
+        self._run_furnaces = {}
+        self._calendar_furnaces = {}
+        self.database_id = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def position(self):
+        """Return (database id, change log version) the cache is current with, or (None, None)."""
+        return self.database_id, self.version
+
+    def reset(self, database_id, version):
+        """Drop everything and start over at `version`. Caller holds `lock`."""
+        self._timelines.clear()
+        self._names = None
+        self._run_furnaces.clear()
+        self._calendar_furnaces.clear()
+        self.database_id = database_id
+        self.version = version
+
+    def furnaces_of(self, run_ids=(), calendar_rowids=()):
+        """Names of the cached furnaces built from any of the given runs or calendar rows. Caller holds `lock`."""
+        names = {self._run_furnaces.get(run_id) for run_id in run_ids}
+        names.update(self._calendar_furnaces.get(rowid) for rowid in calendar_rowids)
+        names.discard(None)
+        return names
+
+    def invalidate(self, names, version, furnaces_changed):
+        """
+        Drop the timelines of `names` and move on to `version`. Caller holds `lock`.
+
+        Args:
+            names (iterable of str): Furnaces whose timeline may have changed.
+            version (int): Change log version the cache is now current with.
+            furnaces_changed (bool): True if furnaces_table changed, so the list of
+                                     furnace names may have too.
+        """
+        for name in names:
+            timeline = self._timelines.pop(name, None)
+            if timeline is None:
+                continue
+            self.invalidations += 1
+            for run_id in timeline.run_ids:
+                self._run_furnaces.pop(run_id, None)
+            for rowid in timeline.calendar_rowids:
+                self._calendar_furnaces.pop(rowid, None)
+        if furnaces_changed:
+            self._names = None
+        self.version = version
+
+    def get(self, names):
+        """
+        Look up timelines.
+
+        Returns:
+            tuple: (dict of name -> Timeline for the cached ones, list of the missing names).
+        """
+        found = {}
+        missing = []
+        with self.lock:
+            for name in names:
+                timeline = self._timelines.get(name) if self.enabled else None
+                if timeline is None:
+                    missing.append(name)
+                else:
+                    found[name] = timeline
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, name, timeline, version):
+        """Cache a timeline built from the database as of change log `version`, unless the cache has moved on since."""
+        with self.lock:
+            if not self.enabled or version != self.version:
+                return
+            self._timelines[name] = timeline
+            for run_id in timeline.run_ids:
+                self._run_furnaces[run_id] = name
+            for rowid in timeline.calendar_rowids:
+                self._calendar_furnaces[rowid] = name
+
+    def get_names(self):
+        with self.lock:
+            return self._names if self.enabled else None
+
+    def put_names(self, names, version):
+        with self.lock:
+            if self.enabled and version == self.version:
+                self._names = names
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'enabled', 'furnaces' (number cached), 'version', 'hits', 'misses' and 'invalidations'.
+        """
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "furnaces": len(self._timelines),
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide schedule cache, creating it on first use. Set
+    `SCHEDULE_CACHE=0` to build every timeline on each request.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScheduleCache(enabled=os.environ.get("SCHEDULE_CACHE", "1") != "0")
+    return _cache
+
+
+def reset_cache():
+    """Drop the process-wide cache so the next `get_cache` call builds a fresh one."""
+    global _cache
+    with _cache_lock:
+        _cache = None
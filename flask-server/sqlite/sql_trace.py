@@ -0,0 +1,209 @@
+"""
+Opt-in SQL tracing per Flask request.
+
+With `SQL_TRACE=1` the connection pool opens `TracingConnection`s, and every request
+records:
+    - the number of statements SQLite ran (counted by `set_trace_callback`, so statements
+      inside triggers, implicit BEGINs and every row of an executemany are included),
+    - the number of execute calls and the time spent in them (timed by `TracingCursor`),
+    - the slowest execute calls,
+    - statements executed again and again with the same SQL text, the usual sign of an
+      N+1 query pattern that should be one set-based statement or an executemany.
+
+The totals are sent back in 'X-SQL-*' response headers and the full trace is logged when
+the request ends (at WARNING when repeated statements were found, DEBUG otherwise).
+
+Environment variables:
+    SQL_TRACE                   '1' to enable tracing (off by default).
+    SQL_TRACE_REPEAT_THRESHOLD  Executions of one statement in a request that count as
+                                repeated (default 5).
+    SQL_TRACE_SLOWEST           Number of slowest statements kept per request (default 5).
+"""
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from flask import request
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def enabled():
+    return os.environ.get("SQL_TRACE", "0") == "1"
+
+
+class RequestTrace:
+    """SQL activity of one request."""
+
+    def __init__(self, repeat_threshold=5, slowest=5):
+        self.repeat_threshold = repeat_threshold
+        self.slowest_count = slowest
+        self.statements = 0
+        self.executes = 0
+        self.seconds = 0.0
+        self.slowest = []        # min-heap of (seconds, sql)
+        self.counts = Counter()  # sql text -> execute calls
+
+    def traced(self, statement):
+        self.statements += 1
+
+    def timed(self, sql, seconds):
+        self.executes += 1
+        self.seconds += seconds
+        self.counts[sql] += 1
+        if len(self.slowest) < self.slowest_count:
+            heapq.heappush(self.slowest, (seconds, sql))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, sql))
+
+    def repeated(self):
+        """
+        Returns:
+            list of tuple: (sql, execute calls) for statements run at least
+            `repeat_threshold` times, most repeated first.
+        """
+        return [(sql, count) for sql, count in self.counts.most_common() if count >= self.repeat_threshold]
+
+    def summary(self):
+        return {
+            "statements": self.statements,
+            "executes": self.executes,
+            "sql_ms": round(self.seconds * 1000, 3),
+            "slowest": [{"sql": sql, "ms": round(seconds * 1000, 3)} for seconds, sql in sorted(self.slowest, reverse=True)],
+            "repeated": [{"sql": sql, "count": count} for sql, count in self.repeated()],
+        }
+
+
+def current():
+    """Return the trace of the request being handled by this thread, or None."""
+    return getattr(_local, "trace", None)
+
+
+def _trace_callback(statement):
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.traced(statement)
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor timing execute, executemany and executescript for the current trace."""
+
+    def execute(self, sql, parameters=()):
+        trace = getattr(_local, "trace", None)
+        if trace is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            trace.timed(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        trace = getattr(_local, "trace", None)
+        if trace is None:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            trace.timed(sql, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        trace = getattr(_local, "trace", None)
+        if trace is None:
+            return super().executescript(sql_script)
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            trace.timed(sql_script, time.perf_counter() - start)
+
+
+class TracingConnection(sqlite3.Connection):
+    """
+    Connection whose cursors are `TracingCursor`s and whose statements are counted
+    through the trace callback. Outside a traced request both add only an attribute
+    lookup per call.
+
+    `Connection.execute`, `executemany` and `executescript` run on an internal cursor
+    that does not go through `cursor()`, so they are overridden to run on a
+    `TracingCursor` and be timed like any other call.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trace_callback)
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def begin():
+    """Start tracing the current thread's request."""
+    _local.trace = RequestTrace(
+        repeat_threshold=int(os.environ.get("SQL_TRACE_REPEAT_THRESHOLD", 5)),
+        slowest=int(os.environ.get("SQL_TRACE_SLOWEST", 5)),
+    )
+
+
+def end():
+    """Stop tracing and return the finished trace (None if none was running)."""
+    trace = current()
+    _local.trace = None
+    return trace
+
+
+def init_app(app):
+    """
+    Trace every request of a Flask app when SQL_TRACE=1; does nothing otherwise.
+
+    Responses get 'X-SQL-Count' (statements run), 'X-SQL-Executes', 'X-SQL-Time-Ms' and,
+    when some statement was repeated, 'X-SQL-Repeated' (number of such statements).
+    Statements run while a streamed body is being sent are only in the log entry.
+    """
+    if not enabled():
+        return
+
+    @app.before_request
+    def start_sql_trace():
+        begin()
+
+    @app.after_request
+    def add_sql_trace_headers(response):
+        trace = current()
+        if trace is not None:
+            response.headers["X-SQL-Count"] = str(trace.statements)
+            response.headers["X-SQL-Executes"] = str(trace.executes)
+            response.headers["X-SQL-Time-Ms"] = f"{trace.seconds * 1000:.3f}"
+            repeated = trace.repeated()
+            if repeated:
+                response.headers["X-SQL-Repeated"] = str(len(repeated))
+        return response
+
+    @app.teardown_request
+    def log_sql_trace(exc):
+        trace = end()
+        if trace is None:
+            return
+        summary = trace.summary()
+        summary["endpoint"] = request.endpoint
+        summary["path"] = request.path
+        if summary["repeated"]:
+            logger.warning("Repeated SQL statements in one request", extra=summary)
+        else:
+            logger.debug("SQL trace", extra=summary)
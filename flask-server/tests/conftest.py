@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The app imports its modules flat, from flask-server/ and flask-server/sqlite/.
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(HERE), os.path.join(os.path.dirname(HERE), "sqlite")]
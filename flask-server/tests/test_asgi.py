@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+from flask import Flask, Response, request, stream_with_context
+
+import asgi
+
+
+def make_app(closed):
+    app = Flask(__name__)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return request.get_data()
+
+    @app.route("/stream")
+    def stream():
+        def chunks():
+            try:
+                for number in range(3):
+                    yield f"chunk {number}\n"
+            finally:
+                closed.append(threading.current_thread().name)
+        return Response(stream_with_context(chunks()), mimetype="text/plain")
+
+    @app.route("/forever")
+    def forever():
+        def chunks():
+            try:
+                while True:
+                    yield "tick\n"
+            finally:
+                closed.append(threading.current_thread().name)
+        return Response(chunks(), mimetype="text/plain")
+
+    return app
+
+
+def scope(method, path, body_length=0):
+    return {"type": "http", "method": method, "path": path, "root_path": "", "query_string": b"",
+            "http_version": "1.1", "scheme": "http", "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+            "headers": [(b"host", b"testserver"), (b"content-length", str(body_length).encode())]}
+
+
+def call(adapter, method, path, body_parts=(b"",), disconnect_after=None):
+    """Run one request through the adapter, returning the messages it sent."""
+    sent = []
+
+    async def run():
+        incoming = asyncio.Queue()
+        for index, part in enumerate(body_parts):
+            incoming.put_nowait({"type": "http.request", "body": part, "more_body": index < len(body_parts) - 1})
+
+        async def receive():
+            return await incoming.get()
+
+        async def send(message):
+            sent.append(message)
+            if disconnect_after is not None and len(sent) == disconnect_after:
+                incoming.put_nowait({"type": "http.disconnect"})
+            await asyncio.sleep(0)
+
+        await asyncio.wait_for(adapter(scope(method, path, sum(map(len, body_parts))), receive, send), 10)
+
+    asyncio.run(run())
+    return sent
+
+
+def body_of(sent):
+    return b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+
+
+def test_request_body_sent_in_parts_reaches_the_app():
+    adapter = asgi.AsgiAdapter(make_app([]).wsgi_app, read_threads=1, write_threads=1)
+    sent = call(adapter, "POST", "/echo", body_parts=(b"first,", b"second,", b"third"))
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == 200
+    assert body_of(sent) == b"first,second,third"
+    assert sent[-1].get("more_body", False) is False
+    adapter.close()
+
+
+def test_streamed_response_is_sent_chunk_by_chunk_on_the_read_pool():
+    closed = []
+    adapter = asgi.AsgiAdapter(make_app(closed).wsgi_app, read_threads=1, write_threads=1)
+    sent = call(adapter, "GET", "/stream")
+    chunks = [message["body"] for message in sent[1:] if message.get("more_body")]
+    assert chunks == [b"chunk 0\n", b"chunk 1\n", b"chunk 2\n"]
+    assert body_of(sent) == b"chunk 0\nchunk 1\nchunk 2\n"
+    assert closed and closed[0].startswith("asgi-read")
+    assert adapter.stats()["read"]["pending"] == 0
+    adapter.close()
+
+
+def test_disconnect_stops_and_closes_an_endless_stream():
+    closed = []
+    adapter = asgi.AsgiAdapter(make_app(closed).wsgi_app, read_threads=1, write_threads=1)
+    call(adapter, "GET", "/forever", disconnect_after=3)
+    adapter.close()  # waits for the producing thread
+    assert len(closed) == 1
+
+
+def test_full_executor_answers_503():
+    adapter = asgi.AsgiAdapter(make_app([]).wsgi_app, read_threads=1, write_threads=1, max_pending=0)
+    sent = call(adapter, "POST", "/echo", body_parts=(b"data",))
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"1") in sent[0]["headers"]
+    assert adapter.stats()["write"]["rejected"] == 1
+    adapter.close()
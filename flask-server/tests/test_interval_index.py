@@ -0,0 +1,103 @@
+import random
+from datetime import date
+
+import pytest
+
+import schedule_grid
+from interval_index import Interval, IntervalIndex, IntervalTree
+
+
+FIRST_DAY = date(2030, 1, 1).toordinal()
+
+
+def random_intervals(rng, count, days=60):
+    intervals = []
+    for number in range(count):
+        start = rng.randrange(days)
+        intervals.append(Interval(start, start + rng.randint(1, 15), "Running", number, "Furnace 01", 1))
+    return intervals
+
+
+def random_run(rng):
+    length = rng.randint(1, 20)
+    entries = [("Heat", 0, length)]
+    if length > 2:
+        entries.append(("Cool", rng.randint(1, length - 1), length))
+    if rng.random() < 0.2:
+        entries.append(("Aborted", rng.randint(0, length), length))
+    start_time = date.fromordinal(FIRST_DAY + rng.randrange(60)).isoformat()
+    return (f"Furnace {rng.randint(1, 3):02d}", start_time, entries, [])
+
+
+def brute_force(runs, start, end):
+    """Current intervals overlapping days [start, end), worked out run by run."""
+    return sorted((segment.start, segment.end, segment.state, primary_id)
+                  for primary_id, (_, start_time, entries, _) in runs.items()
+                  for segment in schedule_grid.run_segments(primary_id, start_time, entries)
+                  if segment.start < end and segment.end > start)
+
+
+def keys(intervals):
+    return sorted((interval.start, interval.end, interval.state, interval.primary_id) for interval in intervals)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 100])
+def test_tree_stab_matches_brute_force(count):
+    rng = random.Random(count)
+    intervals = random_intervals(rng, count)
+    tree = IntervalTree(intervals)
+    for day in range(-2, 80):
+        assert sorted(tree.stab(day)) == sorted(interval for interval in intervals if interval.start <= day < interval.end)
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 7, 100])
+def test_tree_overlap_matches_brute_force(count):
+    rng = random.Random(count)
+    intervals = random_intervals(rng, count)
+    tree = IntervalTree(intervals)
+    for start in range(-2, 80, 3):
+        for end in range(start + 1, 82, 5):
+            assert sorted(tree.overlap(start, end)) == sorted(interval for interval in intervals
+                                                              if interval.start < end and interval.end > start)
+
+
+def check_index(index, runs):
+    for day in range(FIRST_DAY - 1, FIRST_DAY + 85):
+        assert keys(index.stab(day)) == brute_force(runs, day, day + 1)
+    for start in range(FIRST_DAY - 1, FIRST_DAY + 85, 7):
+        for length in (1, 5, 30):
+            assert keys(index.overlap(start, start + length)) == brute_force(runs, start, start + length)
+
+
+@pytest.mark.parametrize("min_rebuild", [1, 10, 10 ** 6])
+def test_replace_runs_then_rebuild_matches_brute_force(min_rebuild):
+    rng = random.Random(min_rebuild)
+    runs = {primary_id: random_run(rng) for primary_id in range(1, 41)}
+    index = IntervalIndex(rebuild_fraction=0.1, min_rebuild=min_rebuild)
+    index.load(runs, database_id=1, version=0)
+    check_index(index, runs)
+
+    next_id = 41
+    for version in range(1, 16):
+        changed = set(rng.sample(sorted(runs), 5))
+        for primary_id in changed:
+            if rng.random() < 0.3:
+                del runs[primary_id]
+            else:
+                runs[primary_id] = random_run(rng)
+        for _ in range(rng.randint(0, 3)):
+            runs[next_id] = random_run(rng)
+            changed.add(next_id)
+            next_id += 1
+        index.replace_runs(changed, {primary_id: runs[primary_id] for primary_id in changed if primary_id in runs}, version)
+        assert index.position() == (1, version)
+        check_index(index, runs)
+
+    if min_rebuild == 10 ** 6:
+        # Nothing was rebuilt yet: every change is still in the pending list.
+        assert index.rebuilds == 1 and index.pending
+    else:
+        assert index.rebuilds > 1
+    index._rebuild()
+    assert not index.pending and index.stale == 0
+    check_index(index, runs)
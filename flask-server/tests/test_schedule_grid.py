@@ -0,0 +1,81 @@
+import random
+
+import pytest
+
+import schedule_grid
+from schedule_grid import Timeline, earliest_start, first_fit, gap_table
+
+
+def first_fit_oracle(lengths, i, length):
+    return next((j for j in range(i, len(lengths)) if lengths[j] >= length), None)
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 4, 5, 7, 8, 9, 16, 17, 33])
+def test_first_fit_matches_brute_force(size):
+    rng = random.Random(size)
+    for _ in range(20):
+        lengths = [rng.randint(0, 10) for _ in range(size)]
+        table = gap_table(lengths)
+        for i in range(size + 2):
+            for length in range(0, 12):
+                assert first_fit(table, i, length) == first_fit_oracle(lengths, i, length), (lengths, i, length)
+
+
+@pytest.mark.parametrize("size", [1, 2, 8, 9, 31, 32, 33])
+def test_first_fit_finds_the_only_fitting_gap_at_either_end(size):
+    for position in (0, size - 1):
+        lengths = [1] * size
+        lengths[position] = 5
+        table = gap_table(lengths)
+        assert first_fit(table, 0, 5) == position
+        assert first_fit(table, position, 5) == position
+        assert first_fit(table, position + 1, 5) is None
+        assert first_fit(table, 0, 6) is None
+
+
+def timeline(busy):
+    """A Timeline with only the busy stretches set, as `build_timeline` merges them."""
+    starts = [start for start, _ in busy]
+    ends = [end for _, end in busy]
+    gaps = gap_table([starts[i + 1] - ends[i] for i in range(len(busy) - 1)])
+    return Timeline([], [], frozenset(), frozenset(), starts, ends, gaps)
+
+
+def random_busy(rng, count):
+    busy = []
+    day = rng.randint(0, 5)
+    for _ in range(count):
+        start = day + rng.randint(1, 6)
+        day = start + rng.randint(1, 6)
+        busy.append((start, day))
+    return busy
+
+
+def earliest_start_oracle(busy, after, length):
+    day = after
+    while any(start < day + length and end > day for start, end in busy):
+        day += 1
+    return day
+
+
+@pytest.mark.parametrize("count", [0, 1, 2, 3, 8, 17])
+def test_earliest_start_matches_brute_force(count):
+    rng = random.Random(count)
+    for _ in range(20):
+        busy = random_busy(rng, count)
+        last = busy[-1][1] if busy else 0
+        line = timeline(busy)
+        for after in range(-1, last + 3):
+            for length in range(1, 9):
+                assert earliest_start(line, after, length) == earliest_start_oracle(busy, after, length), (busy, after, length)
+
+
+def test_earliest_start_on_a_built_timeline():
+    # Runs of 3 days starting on days 10 and 15 of the same furnace, as read from the database.
+    runs = [(1, "2030-01-11", [("Heat", 0, 3)], []), (2, "2030-01-16", [("Heat", 0, 3)], [])]
+    line = schedule_grid.build_timeline(runs)
+    day = line.busy_starts[0]
+    assert earliest_start(line, day - 3, 3) == day - 3
+    assert earliest_start(line, day - 3, 4) == day + 8
+    assert earliest_start(line, day, 2) == day + 3
+    assert earliest_start(line, day, 3) == day + 8